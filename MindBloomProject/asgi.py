@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'MindBloomProject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.chat_ws import chat_socket  # imported after setup: it needs the app registry
+
+
+async def application(scope, receive, send):
+    # Django's handler only speaks HTTP; chat WebSockets are served alongside it
+    if scope['type'] == 'websocket':
+        return await chat_socket(scope, receive, send)
+    return await django_application(scope, receive, send)
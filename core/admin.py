@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MoodEntry, JournalEntry, UserProfile, Task, TherapistConnection, Category, Resource, CrisisAlert
+from .models import MoodEntry, JournalEntry, UserProfile, Task, TherapistConnection, Category, Resource, CrisisAlert, DashboardInsight, CrisisTerm, AlertDelivery, DailyMetrics, UserStats, Conversation
 
 admin.site.register(UserProfile)
 admin.site.register(MoodEntry)
@@ -9,3 +9,9 @@ admin.site.register(TherapistConnection)
 admin.site.register(Category)
 admin.site.register(Resource)
 admin.site.register(CrisisAlert)
+admin.site.register(DashboardInsight)
+admin.site.register(CrisisTerm)
+admin.site.register(AlertDelivery)
+admin.site.register(DailyMetrics)
+admin.site.register(UserStats)
+admin.site.register(Conversation)
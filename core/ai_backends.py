@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from google import genai
+
+from .prompt_builder import estimate_tokens
+
+
+class FakeBackendError(Exception):
+    """Injected failure from the fake backend (stands in for a Gemini 5xx)."""
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+FAKE_REFLECTIONS = [
+    "You are noticing your patterns with more honesty than before, and that awareness is already a form of growth.",
+    "There is strength in how you keep showing up for yourself, even on the heavier days.",
+    "It sounds like you are carrying a lot right now; naming it is the first step to setting some of it down.",
+    "Your words show a steady shift toward self-compassion. Let yourself rest in that progress today.",
+    "Small, consistent steps are adding up for you. Keep protecting your energy where you can.",
+]
+
+FAKE_BREAKTHROUGHS = [
+    "BREAKTHROUGH: You increasingly reframe setbacks as information rather than failure.\nMILESTONE: You have built a habit of reflecting before reacting.",
+    "BREAKTHROUGH: Rest is appearing in your entries as a choice rather than a collapse.\nMILESTONE: You are learning to pace your energy.",
+]
+
+FAKE_SUGGESTIONS = [
+    "A gentle focus day: pick one meaningful task and let the rest wait.",
+    "Keep today light. Ground yourself with a short walk before anything demanding.",
+    "Your energy supports steady work today. Take short breaks to stay balanced.",
+]
+
+
+class FakeModels:
+    """
+    Deterministic local stand-in for genai.Client().models. The reply text depends only on the
+    prompt; latency and injected errors come from a seeded RNG so a benchmark run is repeatable.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, seed=0, stream_chunk_words=4):
+        self.latency = latency or {'DISTRIBUTION': 'fixed', 'MS': 0}
+        self.error_rate = error_rate
+        self.stream_chunk_words = stream_chunk_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self):
+        config = self.latency
+        with self._lock:
+            if config.get('DISTRIBUTION') == 'lognormal':
+                ms = config.get('MEDIAN_MS', 800) * math.exp(self._rng.gauss(0, config.get('SIGMA', 0.5)))
+            elif config.get('DISTRIBUTION') == 'uniform':
+                ms = self._rng.uniform(config.get('MIN_MS', 200), config.get('MAX_MS', 2000))
+            else:
+                ms = config.get('MS', 0)
+            fail = self._rng.random() < self.error_rate
+        return ms / 1000, fail
+
+    def _reply(self, contents):
+        digest = int(hashlib.sha256(contents.encode('utf-8')).hexdigest(), 16)
+        if 'RUNNING SUMMARY' in contents:
+            return "Recurring themes: workload stress, sleep and self-compassion. Growing habit of journaling to decompress."
+        if 'BREAKTHROUGH:' in contents:
+            pool = FAKE_BREAKTHROUGHS
+        elif 'Mind Check-in' in contents:
+            pool = FAKE_SUGGESTIONS
+        else:
+            pool = FAKE_REFLECTIONS
+        return pool[digest % len(pool)]
+
+    def _timeout(self, config):
+        http_options = getattr(config, 'http_options', None)
+        timeout_ms = getattr(http_options, 'timeout', None)
+        return timeout_ms / 1000 if timeout_ms else None
+
+    def _plan(self, contents, config):
+        delay, fail = self._sample_latency()
+        timeout = self._timeout(config)
+        if timeout is not None and delay > timeout:
+            return timeout, TimeoutError(f"Fake backend timed out after {timeout}s")
+        if fail:
+            return delay, FakeBackendError("Injected fake backend failure")
+        return delay, None
+
+    def _response(self, contents):
+        text = self._reply(contents)
+        return FakeResponse(text, FakeUsage(estimate_tokens(contents), estimate_tokens(text)))
+
+    def _chunks(self, text):
+        words = text.split(' ')
+        size = self.stream_chunk_words
+        return [' '.join(words[i:i + size]) + ' ' for i in range(0, len(words), size)]
+
+    def generate_content(self, model, contents, config=None):
+        delay, error = self._plan(contents, config)
+        time.sleep(delay)
+        if error:
+            raise error
+        return self._response(contents)
+
+    def generate_content_stream(self, model, contents, config=None):
+        delay, error = self._plan(contents, config)
+        response = self._response(contents)
+        chunks = self._chunks(response.text)
+
+        def stream():
+            time.sleep(delay / 2)
+            if error:
+                raise error
+            for index, chunk in enumerate(chunks):
+                time.sleep(delay / 2 / len(chunks))
+                last = index == len(chunks) - 1
+                yield FakeResponse(chunk, response.usage_metadata if last else None)
+        return stream()
+
+
+class FakeAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model, contents, config=None):
+        delay, error = self._models._plan(contents, config)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return self._models._response(contents)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        delay, error = self._models._plan(contents, config)
+        response = self._models._response(contents)
+        chunks = self._models._chunks(response.text)
+
+        async def stream():
+            # First-token latency takes half the sampled delay; the rest is spread over the chunks.
+            await asyncio.sleep(delay / 2)
+            if error:
+                raise error
+            for index, chunk in enumerate(chunks):
+                await asyncio.sleep(delay / 2 / len(chunks))
+                last = index == len(chunks) - 1
+                yield FakeResponse(chunk, response.usage_metadata if last else None)
+        return stream()
+
+
+class FakeClient:
+    """Mirrors the parts of genai.Client that AIService uses: .models and .aio.models."""
+
+    def __init__(self, **options):
+        self.models = FakeModels(**options)
+        self.aio = type('FakeAio', (), {})()
+        self.aio.models = FakeAsyncModels(self.models)
+
+
+def build_client(api_key=None):
+    """
+    Returns the LLM client selected by settings.AI_BACKEND:
+    'gemini' (default) needs GEMINI_API_KEY and otherwise yields None (static fallback text);
+    'fake' returns the deterministic local stand-in configured by settings.AI_FAKE_BACKEND.
+    """
+    backend = getattr(settings, 'AI_BACKEND', 'gemini')
+    if backend == 'fake':
+        config = getattr(settings, 'AI_FAKE_BACKEND', {})
+        return FakeClient(
+            latency=config.get('LATENCY'),
+            error_rate=config.get('ERROR_RATE', 0.0),
+            seed=config.get('SEED', 0),
+            stream_chunk_words=config.get('STREAM_CHUNK_WORDS', 4),
+        )
+    if api_key:
+        return genai.Client(api_key=api_key)
+    return None
@@ -0,0 +1,126 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+def normalize_prompt(prompt):
+    """Collapses whitespace so re-indented f-string prompts hash identically."""
+    return re.sub(r'\s+', ' ', prompt or '').strip()
+
+
+def make_key(method, model, persona, prompt):
+    """Content-addressed key for a Gemini call."""
+    raw = "\x1f".join([method, model or '', persona or '', normalize_prompt(prompt)])
+    return "ai:" + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LocMemBackend:
+    """In-process LRU cache with per-entry TTL. One instance per worker."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """Shared backend on top of a configured Django cache (e.g. DatabaseCache), so all workers see the same entries."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResponseCache:
+    """Caches successful AI responses and keeps per-method hit/miss counters."""
+
+    def __init__(self, backend, ttl=3600, enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._lock = threading.Lock()
+
+    def get(self, method, model, persona, prompt):
+        if not self.enabled:
+            return None
+        value = self.backend.get(make_key(method, model, persona, prompt))
+        with self._lock:
+            self._stats[method]['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, method, model, persona, prompt, value):
+        if not self.enabled or value is None:
+            return
+        self.backend.set(make_key(method, model, persona, prompt), value, self.ttl)
+
+    async def aget(self, method, model, persona, prompt):
+        if isinstance(self.backend, LocMemBackend):
+            return self.get(method, model, persona, prompt)
+        return await sync_to_async(self.get, thread_sensitive=False)(method, model, persona, prompt)
+
+    async def aset(self, method, model, persona, prompt, value):
+        if isinstance(self.backend, LocMemBackend):
+            return self.set(method, model, persona, prompt, value)
+        await sync_to_async(self.set, thread_sensitive=False)(method, model, persona, prompt, value)
+
+    def stats(self):
+        with self._lock:
+            return {method: dict(counts) for method, counts in self._stats.items()}
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._stats.clear()
+
+
+def build_response_cache():
+    """Builds the cache described by settings.AI_CACHE."""
+    config = getattr(settings, 'AI_CACHE', {})
+    backend_name = config.get('BACKEND', 'locmem')
+    if backend_name == 'django':
+        backend = DjangoCacheBackend(alias=config.get('CACHE_ALIAS', 'default'))
+    else:
+        backend = LocMemBackend(max_entries=config.get('MAX_ENTRIES', 512))
+    return ResponseCache(backend, ttl=config.get('TTL', 3600), enabled=config.get('ENABLED', True))
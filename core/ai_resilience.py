@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+
+class AIUnavailable(Exception):
+    """Raised instead of calling Gemini when the breaker is open or too many calls are in flight."""
+
+
+class CircuitBreaker:
+    """
+    CLOSED: calls flow, consecutive failures are counted.
+    OPEN: calls fail fast until reset_timeout has passed.
+    HALF_OPEN: a single trial call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'CLOSED'
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = ''
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'OPEN' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'HALF_OPEN'
+                self._trial_in_flight = False
+            if self.state == 'CLOSED':
+                return True
+            if self.state == 'HALF_OPEN' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'CLOSED'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error or '')[:200]
+            if self.state == 'HALF_OPEN' or self.failures >= self.failure_threshold:
+                self.state = 'OPEN'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Gives back a half-open trial slot that was granted but never used."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_in(self):
+        if self.state != 'OPEN':
+            return 0
+        return max(0, round(self.reset_timeout - (time.monotonic() - self.opened_at)))
+
+
+class Resilience:
+    """Timeouts, a bounded in-flight limit and a circuit breaker shared by every AIService call."""
+
+    def __init__(self, max_concurrency=8, acquire_timeout=2, failure_threshold=5, reset_timeout=30,
+                 default_timeout=15, timeouts=None):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._rejected = 0
+        self._count_lock = threading.Lock()
+
+    def timeout_for(self, method):
+        return self.timeouts.get(method, self.default_timeout)
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._reject()
+            raise AIUnavailable(f"Circuit open, retrying in {self.breaker.retry_in()}s")
+
+    def _reject(self):
+        with self._count_lock:
+            self._rejected += 1
+
+    def _enter(self):
+        with self._count_lock:
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._count_lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    @contextmanager
+    def guard(self):
+        self._admit()
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            self._reject()
+            self.breaker.release_trial()
+            raise AIUnavailable("Too many AI calls in flight")
+        self._enter()
+        try:
+            yield
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled by a deadline or closed with the client's stream: no outcome, but free a half-open trial
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def aguard(self):
+        self._admit()
+        # Event loops differ between requests, so poll the thread semaphore instead of binding an asyncio one
+        waited = 0
+        while not self._semaphore.acquire(blocking=False):
+            if waited >= self.acquire_timeout:
+                self._reject()
+                self.breaker.release_trial()
+                raise AIUnavailable("Too many AI calls in flight")
+            await asyncio.sleep(0.05)
+            waited += 0.05
+        self._enter()
+        try:
+            yield
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled by a deadline or closed with the client's stream: no outcome, but free a half-open trial
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._exit()
+
+    def snapshot(self):
+        """Per-process state for the admin AI monitor."""
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'failure_threshold': self.breaker.failure_threshold,
+            'retry_in': self.breaker.retry_in(),
+            'last_error': self.breaker.last_error,
+            'in_flight': self._in_flight,
+            'max_concurrency': self.max_concurrency,
+            'rejected': self._rejected,
+            'default_timeout': self.default_timeout,
+        }
+
+
+def build_resilience():
+    """Builds the resilience layer described by settings.AI_RESILIENCE."""
+    config = getattr(settings, 'AI_RESILIENCE', {})
+    return Resilience(
+        max_concurrency=config.get('MAX_CONCURRENCY', 8),
+        acquire_timeout=config.get('ACQUIRE_TIMEOUT', 2),
+        failure_threshold=config.get('FAILURE_THRESHOLD', 5),
+        reset_timeout=config.get('RESET_TIMEOUT', 30),
+        default_timeout=config.get('DEFAULT_TIMEOUT', 15),
+        timeouts=config.get('TIMEOUTS', {}),
+    )
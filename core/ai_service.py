@@ -1,27 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor, wait
 from google import genai
+from google.genai import types
 from django.conf import settings
+from django.db import connections
+from .ai_backends import build_client
+from .ai_cache import build_response_cache
+from .ai_resilience import build_resilience
+from .ai_telemetry import build_telemetry
+from .prompt_builder import budget, fit_history, truncate_to_tokens
+import asyncio
 import logging
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+REFLECTION_UNAVAILABLE = "AI service is currently unavailable. Reflect on your thoughts and breathe deeply."
+REFLECTION_FALLBACK = "I'm here for you. Take your time to process these thoughts."
+MOOD_UNAVAILABLE = "Listen to your body today. You know best what you need."
+MOOD_FALLBACK = "Take it one step at a time today."
+
 class AIService:
     def __init__(self):
         self.api_key = getattr(settings, 'GEMINI_API_KEY', None)
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-        else:
-            self.client = None
+        self.model = getattr(settings, 'GEMINI_MODEL', 'gemini-flash-lite-latest')
+        self.cache = build_response_cache()
+        self.resilience = build_resilience()
+        self.telemetry = build_telemetry()
+        self.client = build_client(self.api_key)
+        self._loop_clients = weakref.WeakKeyDictionary()
 
-    def get_reflection(self, journal_content, user=None, history=None, mood_context=None):
+    def _aio(self):
         """
-        Generates a calm AI reflection based on journal content, with historical context and persona.
+        The async client for the running event loop. A genai client's async HTTP session is bound to
+        the loop that first used it, and sync callers (async views under WSGI) start a new loop per
+        request, so each loop gets its own client. The fake backend holds no connections and is shared.
         """
-        if not self.client:
-            return "AI service is currently unavailable. Reflect on your thoughts and breathe deeply."
+        if not isinstance(self.client, genai.Client):
+            return self.client.aio
+        loop = asyncio.get_running_loop()
+        client = self._loop_clients.get(loop)
+        if client is None:
+            client = self._loop_clients[loop] = genai.Client(api_key=self.api_key)
+        return client.aio
+
+    def _call_config(self, method):
+        """Per-method HTTP timeout for the google-genai client (milliseconds)."""
+        timeout_ms = int(self.resilience.timeout_for(method) * 1000)
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout_ms))
+
+    def _record(self, method, persona, prompt, text, started, usage=None, error=False, cache_hit=False):
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.telemetry.record(method, persona, len(prompt), len(text or ''), latency_ms,
+                              usage=usage, error=error, cache_hit=cache_hit)
+
+    def _generate(self, method, prompt, persona=None):
+        """
+        Sends a prompt to Gemini, serving byte-identical prompts from the response cache.
+        Calls pass through the resilience guard (timeout, in-flight limit, circuit breaker)
+        and are recorded in telemetry. Exceptions propagate so each caller keeps its own fallback text.
+        """
+        started = time.perf_counter()
+        cached = self.cache.get(method, self.model, persona, prompt)
+        if cached is not None:
+            self._record(method, persona, prompt, cached, started, cache_hit=True)
+            return cached
+
+        try:
+            with self.resilience.guard():
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._call_config(method)
+                )
+            text = response.text.strip()
+        except Exception:
+            self._record(method, persona, prompt, None, started, error=True)
+            raise
+        self._record(method, persona, prompt, text, started, usage=getattr(response, 'usage_metadata', None))
+        self.cache.set(method, self.model, persona, prompt, text)
+        return text
+
+    async def _agenerate(self, method, prompt, persona=None):
+        """Async twin of _generate using the google-genai async client."""
+        started = time.perf_counter()
+        cached = await self.cache.aget(method, self.model, persona, prompt)
+        if cached is not None:
+            self._record(method, persona, prompt, cached, started, cache_hit=True)
+            return cached
+
+        try:
+            async with self.resilience.aguard():
+                response = await asyncio.wait_for(
+                    self._aio().models.generate_content(
+                        model=self.model,
+                        contents=prompt,
+                        config=self._call_config(method)
+                    ),
+                    timeout=self.resilience.timeout_for(method)
+                )
+            text = response.text.strip()
+        except Exception:
+            self._record(method, persona, prompt, None, started, error=True)
+            raise
+        self._record(method, persona, prompt, text, started, usage=getattr(response, 'usage_metadata', None))
+        await self.cache.aset(method, self.model, persona, prompt, text)
+        return text
+
+    # ===== PROMPTS =====
 
+    def _reflection_prompt(self, journal_content, user=None, history=None, mood_context=None, summary=None):
+        journal_content = truncate_to_tokens(journal_content, budget('get_reflection', 'CONTENT'))
+        history = fit_history(history or [], budget('get_reflection', 'HISTORY'), budget('get_reflection', 'PER_ENTRY'))
         history_str = ""
+        if summary:
+            history_str = "LONG-TERM SUMMARY:\n" + truncate_to_tokens(summary, budget('get_reflection', 'SUMMARY')) + "\n"
         if history:
-            history_str = "USER RECENT HISTORY (Memory):\n" + "\n".join([f"- {h}" for h in history])
+            history_str += "USER RECENT HISTORY (Memory):\n" + "\n".join([f"- {h}" for h in history])
 
         mood_str = f"CURRENT MOOD PROFILE: {mood_context}" if mood_context else ""
 
@@ -32,91 +127,276 @@ class AIService:
             'LISTENER': "EMPATHETIC LISTENER: Focus on validation, emotional resonance, and kindness.",
             'CATALYST': "GROWTH CATALYST: Focus on long-term patterns, breakthroughs, and cognitive reframing."
         }
-        
+
         persona_code = user.profile.ai_persona if user and hasattr(user, 'profile') else 'ZEN'
         active_mode = persona_map.get(persona_code, persona_map['ZEN'])
 
         prompt = f"""
-        Identity: MindBloom's AI Companion (Growth Mentor). 
+        Identity: MindBloom's AI Companion (Growth Mentor).
         Mode: {active_mode}
         Context: {history_str} | {mood_str}
-        
+
         Recent Thought: "{journal_content}"
-        
+
         Response: Provide a warm, high-insight reflection (2-3 sentences). Acknowledge patterns or growth. Avoid generic talk.
         """
-        try:
-            response = self.client.models.generate_content(
-                model='gemini-flash-lite-latest',
-                contents=prompt
-            )
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"Gemini API Error: {str(e)}")
-            return "I'm here for you. Take your time to process these thoughts."
+        return prompt, persona_code
 
-    def get_breakthrough_analysis(self, journal_history):
-        """
-        Analyzes a list of journal entries to identify recurring patterns and growth.
-        """
-        if not self.client or not journal_history:
-            return None
+    def _breakthrough_prompt(self, journal_history, summary=None):
+        entries = fit_history(
+            [j.content for j in journal_history],
+            budget('get_breakthrough_analysis', 'HISTORY'),
+            budget('get_breakthrough_analysis', 'PER_ENTRY')
+        )
+        history_text = "\n".join([f"- {entry}" for entry in entries])
+        summary_text = ""
+        if summary:
+            summary_text = "EARLIER JOURNEY (summary):\n        " + truncate_to_tokens(summary, budget('get_breakthrough_analysis', 'SUMMARY'))
 
-        history_text = "\n".join([f"- {j.content}" for j in journal_history])
-        
-        prompt = f"""
+        return f"""
         Analyze the following journal entries for a mental health breakthrough or significant growth pattern.
-        
+
+        {summary_text}
+
         JOURNAL ENTRIES:
         {history_text}
-        
+
         Task:
         1. Identify ONE major recurring theme or positive breakthrough.
         2. Provide a 1-sentence "Growth Milestone" for the user.
         3. If no significant breakthrough is found, provide a gentle encouragement for continued reflection.
-        
+
         Format: Return a JSON-friendly response (string only) with:
         BREAKTHROUGH: [Insight]
         MILESTONE: [Milestone]
         """
-        try:
-            response = self.client.models.generate_content(
-                model='gemini-flash-lite-latest',
-                contents=prompt
-            )
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"Gemini API Error in Breakthrough: {str(e)}")
-            return None
 
-    def get_mood_suggestion(self, mood, energy, stress, history_trends=None):
-        """
-        Suggests focus levels based on daily check-in and recent trends.
+    def _summary_prompt(self, previous_summary, new_entries):
+        entries = "\n".join([f"- {truncate_to_tokens(e, budget('update_summary', 'PER_ENTRY'))}" for e in new_entries])
+        words = budget('update_summary', 'SUMMARY') * 3 // 4
+
+        return f"""
+        You maintain a private RUNNING SUMMARY of a student's journal for their wellbeing companion.
+
+        RUNNING SUMMARY SO FAR:
+        {previous_summary or "(empty)"}
+
+        NEW JOURNAL ENTRIES:
+        {entries}
+
+        Task: Return the updated running summary in at most {words} words. Keep recurring themes, stressors,
+        coping strategies and signs of growth; drop one-off details. Plain text only.
         """
-        if not self.client:
-            return "Listen to your body today. You know best what you need."
 
+    def _mood_prompt(self, mood, energy, stress, history_trends=None):
         trend_str = f"RECENT TRENDS: {history_trends}" if history_trends else ""
 
-        prompt = f"""
+        return f"""
         User Mind Check-in:
         Mood: {mood}/10
         Energy: {energy}/10
         Stress: {stress}/10
         {trend_str}
-        
-        Suggest a gentle focus level for the day and one piece of advice that acknowledges their current state. 
+
+        Suggest a gentle focus level for the day and one piece of advice that acknowledges their current state.
         If energy is low, be protective. If stress is high, be grounding.
         Keep it brief and calm.
         """
+
+    # ===== SYNC API =====
+
+    def get_reflection(self, journal_content, user=None, history=None, mood_context=None, summary=None):
+        """
+        Generates a calm AI reflection based on journal content, with historical context and persona.
+        """
+        if not self.client:
+            return REFLECTION_UNAVAILABLE
+
+        prompt, persona_code = self._reflection_prompt(journal_content, user, history, mood_context, summary)
         try:
-            response = self.client.models.generate_content(
-                model='gemini-flash-lite-latest',
-                contents=prompt
-            )
-            return response.text.strip()
+            return self._generate('get_reflection', prompt, persona=persona_code)
         except Exception as e:
             logger.error(f"Gemini API Error: {str(e)}")
-            return "Take it one step at a time today."
+            return REFLECTION_FALLBACK
+
+    def get_breakthrough_analysis(self, journal_history, summary=None):
+        """
+        Analyzes a list of journal entries to identify recurring patterns and growth.
+        """
+        if not self.client or not journal_history:
+            return None
+
+        prompt = self._breakthrough_prompt(journal_history, summary)
+        try:
+            return self._generate('get_breakthrough_analysis', prompt)
+        except Exception as e:
+            logger.error(f"Gemini API Error in Breakthrough: {str(e)}")
+            return None
+
+    def get_mood_suggestion(self, mood, energy, stress, history_trends=None):
+        """
+        Suggests focus levels based on daily check-in and recent trends.
+        """
+        if not self.client:
+            return MOOD_UNAVAILABLE
+
+        prompt = self._mood_prompt(mood, energy, stress, history_trends)
+        try:
+            return self._generate('get_mood_suggestion', prompt)
+        except Exception as e:
+            logger.error(f"Gemini API Error: {str(e)}")
+            return MOOD_FALLBACK
+
+    def update_summary(self, previous_summary, new_entries):
+        """
+        Folds new journal entries into a user's rolling summary. Returns None when the model is
+        unavailable so the caller can fall back to an extractive summary.
+        """
+        if not self.client or not new_entries:
+            return None
+
+        prompt = self._summary_prompt(previous_summary, new_entries)
+        try:
+            return self._generate('update_summary', prompt)
+        except Exception as e:
+            logger.error(f"Gemini API Error in Summary: {str(e)}")
+            return None
+
+    def stream_reflection(self, journal_content, user=None, history=None, mood_context=None, summary=None):
+        """
+        Sync twin of astream_reflection for WSGI workers, which buffer an async iterator to the end.
+        The client's HTTP timeout applies to each read, so it bounds the wait per chunk.
+        """
+        if not self.client:
+            yield REFLECTION_UNAVAILABLE
+            return
+
+        prompt, persona_code = self._reflection_prompt(journal_content, user, history, mood_context, summary)
+        started = time.perf_counter()
+        cached = self.cache.get('get_reflection', self.model, persona_code, prompt)
+        if cached is not None:
+            self._record('get_reflection', persona_code, prompt, cached, started, cache_hit=True)
+            yield cached
+            return
+
+        parts = []
+        usage = None
+        try:
+            with self.resilience.guard():
+                for chunk in self.client.models.generate_content_stream(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._call_config('get_reflection')
+                ):
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini API Error (stream): {str(e)}")
+            self._record('get_reflection', persona_code, prompt, "".join(parts), started, error=True)
+            if not parts:
+                yield REFLECTION_FALLBACK
+            return
+
+        text = "".join(parts).strip()
+        self._record('get_reflection', persona_code, prompt, text, started, usage=usage)
+        self.cache.set('get_reflection', self.model, persona_code, prompt, text)
+
+    # ===== ASYNC API =====
+    # Prompts are built before the first await, so any ORM objects passed in
+    # (user.profile, journal entries) must already be loaded by the caller.
+
+    async def aget_reflection(self, journal_content, user=None, history=None, mood_context=None, summary=None):
+        if not self.client:
+            return REFLECTION_UNAVAILABLE
+
+        prompt, persona_code = self._reflection_prompt(journal_content, user, history, mood_context, summary)
+        try:
+            return await self._agenerate('get_reflection', prompt, persona=persona_code)
+        except Exception as e:
+            logger.error(f"Gemini API Error: {str(e)}")
+            return REFLECTION_FALLBACK
+
+    async def astream_reflection(self, journal_content, user=None, history=None, mood_context=None, summary=None):
+        """
+        Yields the reflection text chunk by chunk as Gemini generates it.
+        The timeout applies to the wait for each chunk rather than the whole answer.
+        """
+        if not self.client:
+            yield REFLECTION_UNAVAILABLE
+            return
+
+        prompt, persona_code = self._reflection_prompt(journal_content, user, history, mood_context, summary)
+        started = time.perf_counter()
+        cached = await self.cache.aget('get_reflection', self.model, persona_code, prompt)
+        if cached is not None:
+            self._record('get_reflection', persona_code, prompt, cached, started, cache_hit=True)
+            yield cached
+            return
+
+        timeout = self.resilience.timeout_for('get_reflection')
+        parts = []
+        usage = None
+        try:
+            async with self.resilience.aguard():
+                stream = await asyncio.wait_for(
+                    self._aio().models.generate_content_stream(
+                        model=self.model,
+                        contents=prompt,
+                        config=self._call_config('get_reflection')
+                    ),
+                    timeout=timeout
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini API Error (stream): {str(e)}")
+            self._record('get_reflection', persona_code, prompt, "".join(parts), started, error=True)
+            if not parts:
+                yield REFLECTION_FALLBACK
+            return
+
+        text = "".join(parts).strip()
+        self._record('get_reflection', persona_code, prompt, text, started, usage=usage)
+        await self.cache.aset('get_reflection', self.model, persona_code, prompt, text)
+
+    def gather_sync(self, calls, deadline=None):
+        """
+        Runs independent AI calls concurrently on a thread pool under one deadline, using the sync
+        client. `calls` maps a name to (function, fallback); a call still running at the deadline is
+        abandoned and replaced by its fallback.
+        """
+        if deadline is None:
+            deadline = getattr(settings, 'AI_REQUEST_DEADLINE', 10)
+        names = list(calls)
+        executor = ThreadPoolExecutor(max_workers=max(len(names), 1), thread_name_prefix='ai-gather')
+        futures = {name: executor.submit(_run_in_thread, calls[name][0]) for name in names}
+        done, pending = wait(futures.values(), timeout=deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if pending:
+            logger.warning(f"AI deadline of {deadline}s hit, {len(pending)} call(s) fell back")
+
+        results = {}
+        for name in names:
+            future = futures[name]
+            results[name] = future.result() if future in done and not future.exception() else calls[name][1]
+        return results
+
+def _run_in_thread(func):
+    try:
+        return func()
+    finally:
+        # A pool thread that touched the database (e.g. a DB-backed response cache) must not leak its connection
+        connections.close_all()
+
 
 ai_service = AIService()
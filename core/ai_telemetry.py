@@ -0,0 +1,227 @@
+import atexit
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Upper bound (ms) of each latency histogram bin; the last bin catches everything slower.
+LATENCY_BOUNDS_MS = [25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000]
+
+COUNTER_FIELDS = ['calls', 'errors', 'cache_hits', 'prompt_chars', 'response_chars', 'prompt_tokens', 'response_tokens']
+
+
+def latency_bin(latency_ms):
+    for index, bound in enumerate(LATENCY_BOUNDS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BOUNDS_MS)
+
+
+def empty_histogram():
+    return [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+
+def merge_histograms(target, source):
+    for index, count in enumerate(source or []):
+        if index < len(target):
+            target[index] += count
+    return target
+
+
+def percentile(histogram, q):
+    """Approximate percentile (ms) from a histogram, reported as the upper bound of its bin."""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = q * total
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            return LATENCY_BOUNDS_MS[index] if index < len(LATENCY_BOUNDS_MS) else LATENCY_BOUNDS_MS[-1]
+    return LATENCY_BOUNDS_MS[-1]
+
+
+def usage_tokens(usage):
+    """Reads prompt/response token counts from google-genai usage_metadata (if present)."""
+    if usage is None:
+        return 0, 0
+    return (getattr(usage, 'prompt_token_count', 0) or 0, getattr(usage, 'candidates_token_count', 0) or 0)
+
+
+class TelemetryRecorder:
+    """
+    Aggregates call records in memory per (bucket, method, persona) and flushes them from a
+    background thread, so recording a call never adds a database write to the request.
+    """
+
+    def __init__(self, enabled=True, bucket_seconds=300, flush_interval=10):
+        self.enabled = enabled
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _bucket_start(self, now=None):
+        ts = int((now or time.time()) // self.bucket_seconds * self.bucket_seconds)
+        return datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc)
+
+    def record(self, method, persona, prompt_chars, response_chars, latency_ms, usage=None, error=False, cache_hit=False):
+        if not self.enabled:
+            return
+        prompt_tokens, response_tokens = usage_tokens(usage)
+        key = (self._bucket_start(), method, persona or '')
+        with self._lock:
+            slot = self._pending.get(key)
+            if slot is None:
+                slot = {field: 0 for field in COUNTER_FIELDS}
+                slot['latency_ms_total'] = 0.0
+                slot['latency_histogram'] = empty_histogram()
+                self._pending[key] = slot
+            slot['calls'] += 1
+            slot['errors'] += 1 if error else 0
+            slot['cache_hits'] += 1 if cache_hit else 0
+            slot['prompt_chars'] += prompt_chars
+            slot['response_chars'] += response_chars
+            slot['prompt_tokens'] += prompt_tokens
+            slot['response_tokens'] += response_tokens
+            if not cache_hit:
+                # Hits answer in ~0ms; keeping them out leaves the latency figures about Gemini itself
+                slot['latency_ms_total'] += latency_ms
+                slot['latency_histogram'][latency_bin(latency_ms)] += 1
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._flush_loop, name='ai-telemetry', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"AI telemetry flush failed: {str(e)}")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Writes pending aggregates as one upsert per bucket slot."""
+        from .models import AICallBucket
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                for (bucket_start, method, persona), slot in pending.items():
+                    row, _ = AICallBucket.objects.select_for_update().get_or_create(
+                        bucket_start=bucket_start, method=method, persona=persona,
+                        defaults={'latency_histogram': empty_histogram()}
+                    )
+                    for field in COUNTER_FIELDS:
+                        setattr(row, field, getattr(row, field) + slot[field])
+                    row.latency_ms_total += slot['latency_ms_total']
+                    row.latency_histogram = merge_histograms(row.latency_histogram or empty_histogram(), slot['latency_histogram'])
+                    row.save()
+        except Exception:
+            # Nothing was written, so put the interval back for the next flush
+            self._restore(pending)
+            raise
+        return len(pending)
+
+    def _restore(self, pending):
+        with self._lock:
+            for key, slot in pending.items():
+                current = self._pending.setdefault(key, slot)
+                if current is slot:
+                    continue
+                for field in COUNTER_FIELDS:
+                    current[field] += slot[field]
+                current['latency_ms_total'] += slot['latency_ms_total']
+                merge_histograms(current['latency_histogram'], slot['latency_histogram'])
+
+
+def build_telemetry():
+    """Builds the recorder described by settings.AI_TELEMETRY."""
+    config = getattr(settings, 'AI_TELEMETRY', {})
+    recorder = TelemetryRecorder(
+        enabled=config.get('ENABLED', True),
+        bucket_seconds=config.get('BUCKET_SECONDS', 300),
+        flush_interval=config.get('FLUSH_INTERVAL', 10),
+    )
+    atexit.register(_flush_at_exit, recorder)
+    return recorder
+
+
+def _flush_at_exit(recorder):
+    if not recorder._pending:
+        return
+    try:
+        recorder.flush()
+    except Exception as e:
+        logger.error(f"AI telemetry flush at exit failed: {str(e)}")
+
+
+def summarize(hours=24):
+    """
+    Rolls stored buckets up into what the admin AI monitor shows: overall and per-persona
+    latency percentiles, error rate and token spend, plus an hourly series.
+    """
+    from .models import AICallBucket
+
+    since = timezone.now() - datetime.timedelta(hours=hours)
+    rows = AICallBucket.objects.filter(bucket_start__gte=since).order_by('bucket_start')
+
+    def blank():
+        totals = {field: 0 for field in COUNTER_FIELDS}
+        totals['latency_ms_total'] = 0.0
+        totals['latency_histogram'] = empty_histogram()
+        return totals
+
+    def add(totals, row):
+        for field in COUNTER_FIELDS:
+            totals[field] += getattr(row, field)
+        totals['latency_ms_total'] += row.latency_ms_total
+        merge_histograms(totals['latency_histogram'], row.latency_histogram)
+
+    def finish(totals):
+        calls = totals['calls']
+        hist = totals.pop('latency_histogram')
+        totals['p50'] = percentile(hist, 0.50)
+        totals['p95'] = percentile(hist, 0.95)
+        totals['p99'] = percentile(hist, 0.99)
+        model_calls = calls - totals['cache_hits']
+        totals['avg_latency'] = round(totals['latency_ms_total'] / model_calls) if model_calls else None
+        totals['error_rate'] = round(totals['errors'] / calls * 100, 1) if calls else 0
+        totals['total_tokens'] = totals['prompt_tokens'] + totals['response_tokens']
+        return totals
+
+    overall = blank()
+    by_persona = {}
+    by_hour = {}
+    for row in rows:
+        add(overall, row)
+        add(by_persona.setdefault(row.persona or 'NONE', blank()), row)
+        hour = row.bucket_start.replace(minute=0, second=0, microsecond=0)
+        add(by_hour.setdefault(hour, blank()), row)
+
+    return {
+        'overall': finish(overall),
+        'by_persona': {persona: finish(totals) for persona, totals in sorted(by_persona.items())},
+        'by_hour': [dict(finish(totals), hour=hour) for hour, totals in sorted(by_hour.items())],
+    }
@@ -0,0 +1,136 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+
+from .crisis import scan_text
+from .models import ChatMessage, Conversation, CrisisAlert
+from .pagination import keyset_filter, keyset_page
+
+
+def thread(user_id, other_id):
+    """Both directions of a conversation; each side is a (sender, receiver) lookup on the thread index."""
+    return ChatMessage.objects.filter(
+        Q(sender_id=user_id, receiver_id=other_id) | Q(sender_id=other_id, receiver_id=user_id)
+    )
+
+
+def window(user_id, other_id, cursor=None, size=50):
+    """
+    The newest `size` messages of a conversation before the cursor, newest first. Each direction
+    is read in index order and merged here, so a page never sorts the whole thread.
+    """
+    rows = []
+    for sender_id, receiver_id in ((user_id, other_id), (other_id, user_id)):
+        direction = ChatMessage.objects.filter(sender_id=sender_id, receiver_id=receiver_id)
+        rows += keyset_filter(direction, cursor)[:size + 1]
+    rows.sort(key=lambda message: (message.created_at, message.id), reverse=True)
+    return keyset_page(rows[:size + 1], size)
+
+
+def serialize(message):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'time': format_date(timezone.localtime(message.created_at), 'g:i A'),
+    }
+
+
+def send_message(sender, receiver, content):
+    """
+    Saves a message with everything that hangs off it (the conversation row via post_save, and a crisis
+    alert for student messages) in one transaction, so a failure part-way can't leave a message
+    without its alert or an inbox that disagrees with the thread.
+    """
+    crisis = scan_text(content) if sender.profile.role == 'STUDENT' else None
+    with transaction.atomic():
+        message = ChatMessage.objects.create(sender=sender, receiver=receiver, content=content)
+        if crisis is not None and crisis.is_crisis:
+            CrisisAlert.objects.create(
+                student=sender,
+                message=f"Crisis language detected in chat message (score {crisis.score}: {', '.join(crisis.phrases)}): {content[:100]}..."
+            )
+    return message
+
+
+def _pair(user_id, other_id):
+    return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+
+def _unread_field(reader_id, other_id):
+    return 'low_unread' if reader_id < other_id else 'high_unread'
+
+
+def conversation_for(user_id, other_id):
+    low, high = _pair(user_id, other_id)
+    try:
+        with transaction.atomic():
+            conversation, _ = Conversation.objects.get_or_create(user_low_id=low, user_high_id=high)
+    except IntegrityError:
+        # Created concurrently by the other side
+        conversation = Conversation.objects.get(user_low_id=low, user_high_id=high)
+    return conversation
+
+
+def message_created(message):
+    """post_save hook: moves the conversation to the top of both inboxes and counts it unread for the receiver."""
+    low, high = _pair(message.sender_id, message.receiver_id)
+    unread = _unread_field(message.receiver_id, message.sender_id)
+    with transaction.atomic():
+        conversations = Conversation.objects.filter(user_low_id=low, user_high_id=high)
+        updates = {
+            'last_message': message,
+            'last_message_at': Greatest(F('last_message_at'), Value(message.created_at)),
+            unread: F(unread) + 1,
+        }
+        if not conversations.update(**updates):
+            conversation_for(low, high)
+            conversations.update(**updates)
+
+
+def mark_read(reader_id, other_id, message_ids=None):
+    """
+    Marks messages from other_id to the reader as read (all of them, or just message_ids) and
+    takes them off the reader's unread count in the same transaction.
+    """
+    if message_ids is not None and not message_ids:
+        return 0
+    messages = ChatMessage.objects.filter(sender_id=other_id, receiver_id=reader_id, is_read=False)
+    if message_ids is not None:
+        messages = messages.filter(id__in=message_ids)
+    field = _unread_field(reader_id, other_id)
+    low, high = _pair(reader_id, other_id)
+    with transaction.atomic():
+        count = messages.update(is_read=True)
+        if count:
+            Conversation.objects.filter(user_low_id=low, user_high_id=high).update(
+                **{field: Value(0) if message_ids is None else Greatest(F(field) - count, Value(0))}
+            )
+    return count
+
+
+def inbox(user):
+    """The user's conversations, most recent first, each with `contact` and `unread` set for this user."""
+    conversations = list(
+        Conversation.objects.filter(Q(user_low=user) | Q(user_high=user))
+        .select_related('user_low__profile', 'user_high__profile', 'last_message')
+        .order_by('-last_message_at', '-id')
+    )
+    for conversation in conversations:
+        conversation.contact = conversation.other(user)
+        conversation.unread = conversation.unread_for(user)
+    return conversations
+
+
+def messages_since(user_id, other_id, after_id=0, limit=50):
+    """
+    The delta for a live client: messages newer than after_id, oldest first. Incoming ones are
+    marked read as they are handed over, so the cost follows the delta, not the thread length.
+    """
+    rows = list(thread(user_id, other_id).filter(id__gt=after_id).order_by('id')[:limit])
+    unread = [row.id for row in rows if row.receiver_id == user_id and not row.is_read]
+    if unread:
+        mark_read(user_id, other_id, unread)
+    return [serialize(row) for row in rows]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+
+from .chat import messages_since, send_message
+
+CHAT_PATH = re.compile(r'^/ws/chat/(\d+)/$')
+CLOSE_FORBIDDEN = 4403
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _session_user(headers):
+    """The logged-in user behind the session cookie, resolved the way AuthenticationMiddleware does."""
+    morsel = SimpleCookie(headers.get('cookie', '')).get(settings.SESSION_COOKIE_NAME)
+    session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value if morsel else None)
+    return get_user(SimpleNamespace(session=session))
+
+
+def _origin_allowed(headers):
+    # Browsers always send Origin on WebSockets; refusing foreign origins stops cross-site socket hijacking
+    origin = headers.get('origin')
+    if origin is None:
+        return True
+    return urlsplit(origin).netloc == headers.get('host') or origin in getattr(settings, 'CSRF_TRUSTED_ORIGINS', [])
+
+
+def _incoming_text(event):
+    try:
+        payload = json.loads(event.get('text') or '{}')
+    except ValueError:
+        return ''
+    return str(payload.get('content') or '').strip() if isinstance(payload, dict) else ''
+
+
+async def chat_socket(scope, receive, send):
+    """
+    WebSocket mode for chat_session under an ASGI server: the same deltas as the SSE stream,
+    and sends go over the socket instead of a POST.
+    """
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    headers = _headers(scope)
+    match = CHAT_PATH.match(scope['path'])
+    user = await sync_to_async(_session_user)(headers) if match and _origin_allowed(headers) else None
+    other = await User.objects.filter(id=int(match.group(1))).select_related('profile').afirst() if match else None
+    if user is None or not user.is_authenticated or other is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    await send({'type': 'websocket.accept'})
+
+    poll_interval = getattr(settings, 'CHAT', {}).get('POLL_INTERVAL', 1)
+    try:
+        last_id = int(parse_qs(scope.get('query_string', b'').decode()).get('since', ['0'])[0])
+    except ValueError:
+        last_id = 0
+
+    incoming = asyncio.ensure_future(receive())
+    try:
+        while True:
+            for message in await sync_to_async(messages_since)(user.id, other.id, last_id):
+                last_id = message['id']
+                await send({'type': 'websocket.send', 'text': json.dumps(message)})
+            done, _ = await asyncio.wait({incoming}, timeout=poll_interval)
+            if not done:
+                continue
+            event = incoming.result()
+            if event['type'] == 'websocket.disconnect':
+                return
+            content = _incoming_text(event)
+            if content:
+                # Comes back to this client (and the other side) through messages_since
+                await sync_to_async(send_message)(user, other, content)
+            incoming = asyncio.ensure_future(receive())
+    finally:
+        incoming.cancel()
+        await sync_to_async(close_old_connections)()
@@ -0,0 +1,182 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+# Seed lexicon (also used if the CrisisTerm table is empty). Severity is a 1-10 weight. With the default
+# THRESHOLD of 6, phrases weighted 6+ alert on their own, while everyday words ("die", "kill", "hopeless",
+# "depressed") only alert in combination.
+# Matches are word-bounded, so inflections the old substring check caught are listed explicitly.
+DEFAULT_TERMS = {
+    'suicide': 10,
+    'suicidal': 10,
+    'kill myself': 10,
+    'killing myself': 10,
+    'killed myself': 10,
+    'end my life': 10,
+    'ending my life': 10,
+    'take my own life': 10,
+    'taking my own life': 10,
+    'want to die': 10,
+    'wanna die': 10,
+    'wanted to die': 9,
+    'wish i was dead': 10,
+    'self-harm': 8,
+    'self-harming': 8,
+    'hurt myself': 8,
+    'hurting myself': 8,
+    'cut myself': 8,
+    'cutting myself': 8,
+    "can't go on": 6,
+    'no reason to live': 9,
+    'die': 5,
+    'dies': 5,
+    'died': 5,
+    'dying': 5,
+    'kill': 5,
+    'kills': 5,
+    'killed': 5,
+    'killing': 5,
+    'hopeless': 4,
+    'hopelessness': 4,
+    'depressed': 3,
+    'depression': 3,
+}
+
+NEGATORS = {'not', 'no', 'never', 'dont', 'didnt', 'wont', 'wouldnt', 'isnt', 'wasnt', 'cant', 'nor'}
+# Words that can sit between a negator and the phrase it governs: "not going to kill myself", "never felt suicidal".
+# Dwelling on a phrase ("thinking about", "without", "of") is never treated as negating it.
+NEGATION_LINKS = {
+    'going', 'gonna', 'to', 'be', 'being', 'feel', 'feeling', 'felt', 'want', 'wanna', 'try', 'trying',
+    'planning', 'really', 'ever', 'even', 'actually',
+}
+NEGATION_WINDOW = 3  # linking words allowed between the negator and the match
+
+
+def normalize(phrase):
+    """Canonical form shared by lexicon keys and matched text."""
+    return re.sub(r"[\s\-]+", " ", phrase.lower().replace("'", "").replace("’", "")).strip()
+
+
+def _char_pattern(ch):
+    if ch in ' -':
+        return r"[\s\-]+"
+    if ch in "'’":
+        return "['’]?"
+    return re.escape(ch)
+
+
+def _trie_regex(node):
+    """Turns a character trie into a prefix-factored regex so shared prefixes are only scanned once."""
+    ends_here = '' in node
+    branches = [_char_pattern(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if ends_here else body
+
+
+def compile_lexicon(terms):
+    """Compiles {phrase: severity} into one word-bounded, case-insensitive matcher."""
+    trie = {}
+    for phrase in terms:
+        node = trie
+        for ch in phrase.lower().strip():
+            node = node.setdefault(ch, {})
+        node[''] = True
+    if not trie:
+        return None
+    return re.compile(r'(?<!\w)' + _trie_regex(trie) + r'(?!\w)', re.IGNORECASE)
+
+
+class CrisisScan:
+    def __init__(self, score, matches, threshold):
+        self.score = score
+        self.matches = matches  # list of (phrase, severity, negated)
+        self.is_crisis = score >= threshold
+
+    @property
+    def phrases(self):
+        return [phrase for phrase, _, negated in self.matches if not negated]
+
+
+class CrisisDetector:
+    """
+    Compiled matcher over the DB-managed lexicon, cached per process. The lexicon version
+    (row count + latest update) is re-checked at most every RELOAD_INTERVAL seconds, and
+    edits made in this process invalidate it immediately.
+    """
+
+    def __init__(self):
+        self._pattern = None
+        self._weights = {}
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._checked_at = 0
+        self._version = None
+
+    def _load(self):
+        from .models import CrisisTerm
+
+        interval = getattr(settings, 'CRISIS_LEXICON', {}).get('RELOAD_INTERVAL', 30)
+        if self._version is not None and time.monotonic() - self._checked_at < interval:
+            return
+        with self._lock:
+            active = CrisisTerm.objects.filter(is_active=True)
+            stats = active.aggregate(count=Count('id'), latest=Max('updated_at'))
+            version = (stats['count'], stats['latest'])
+            if version != self._version:
+                terms = dict(active.values_list('phrase', 'severity')) if stats['count'] else DEFAULT_TERMS
+                self._weights = {normalize(phrase): severity for phrase, severity in terms.items()}
+                self._pattern = compile_lexicon(terms)
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def _is_negated(self, text, start):
+        """
+        True only when a negator governs the match: directly before it, or separated by linking
+        words alone. A negator on another predicate ("I can't sleep I want to die") doesn't count.
+        """
+        clause = re.split(r"[.,;:!?\n]", text[max(0, start - 80):start])[-1]
+        preceding = [normalize(word) for word in re.findall(r"[\w'’]+", clause)]
+        for word in reversed(preceding[-(NEGATION_WINDOW + 1):]):
+            if word in NEGATORS:
+                return True
+            if word not in NEGATION_LINKS:
+                return False
+        return False
+
+    def scan(self, text):
+        threshold = getattr(settings, 'CRISIS_LEXICON', {}).get('THRESHOLD', 6)
+        if not text:
+            return CrisisScan(0, [], threshold)
+        self._load()
+        if self._pattern is None:
+            return CrisisScan(0, [], threshold)
+
+        score = 0
+        matches = []
+        seen = set()
+        for match in self._pattern.finditer(text):
+            phrase = normalize(match.group(0))
+            severity = self._weights.get(phrase, 0)
+            negated = self._is_negated(text, match.start())
+            matches.append((phrase, severity, negated))
+            # Each phrase counts once, so repetition doesn't inflate the score
+            if not negated and phrase not in seen:
+                score += severity
+                seen.add(phrase)
+        return CrisisScan(score, matches, threshold)
+
+
+detector = CrisisDetector()
+
+
+def scan_text(text):
+    """Scores free text (journal entries, chat messages, mood notes) against the crisis lexicon."""
+    return detector.scan(text)
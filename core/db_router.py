@@ -0,0 +1,124 @@
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Request-scoped routing state. Context variables follow the request into sync_to_async threads.
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+_pinned_to_primary = contextvars.ContextVar('pinned_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to 'default'. Reads go to the 'replica' alias only inside replica_reads()
+    (or a @use_replica view), and never while the request is pinned to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and not _pinned_to_primary.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so objects read from either may be related
+        return True
+
+
+@contextmanager
+def replica_reads():
+    """Routes the reads in this block to the replica (analytics that can tolerate a little lag)."""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Routes the reads in this block to the primary, even inside replica_reads(). For code that
+    rebuilds rows from what it reads, so lagging replica data is never written back as the truth.
+    Also usable as a decorator.
+    """
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def use_replica(view):
+    """Read-only analytics view decorator: GET/HEAD requests read from the replica."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    """
+    Read-your-writes: a request that writes (any non-safe method) reads from the primary, and so
+    does the same client for DATABASE_REPLICA_PIN_SECONDS afterwards (e.g. the redirect after a POST).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _pinned(self, request):
+        return request.method not in SAFE_METHODS or bool(request.COOKIES.get(PIN_COOKIE))
+
+    def _finish(self, request, response):
+        if request.method not in SAFE_METHODS and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned_to_primary.set(self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned_to_primary.set(self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        return self._finish(request, response)
@@ -0,0 +1,157 @@
+import datetime
+from functools import partial
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .ai_service import REFLECTION_FALLBACK, ai_service
+from .models import DashboardInsight, JournalEntry, MoodEntry
+from .prompt_builder import budget, extractive_summary
+
+SUMMARY_BATCH = 20
+
+
+def _signature(count, latest_id, last_edit):
+    return f"{count}:{latest_id or 0}:{int(last_edit.timestamp() * 1_000_000) if last_edit else 0}"
+
+
+def journal_signature(user):
+    """Cheap fingerprint of a user's journal set (count, newest id, last edit)."""
+    stats = JournalEntry.objects.filter(user=user).aggregate(count=Count('id'), latest=Max('id'), edited=Max('updated_at'))
+    return _signature(stats['count'], stats['latest'], stats['edited'])
+
+
+def _store_breakthrough(insight, breakthrough, signature):
+    """
+    Writes the breakthrough columns alone with update(), so the nightly batch and a dashboard
+    refresh of the same row can't overwrite each other's fields.
+    """
+    if breakthrough is None:
+        # Only a real answer replaces the last analysis and counts as analysed; fallbacks are retried on the next run.
+        return False
+    insight.breakthrough = breakthrough
+    insight.breakthrough_signature = signature
+    insight.breakthrough_at = insight.updated_at = timezone.now()
+    DashboardInsight.objects.filter(pk=insight.pk).update(
+        breakthrough=breakthrough, breakthrough_signature=signature,
+        breakthrough_at=insight.breakthrough_at, updated_at=insight.updated_at,
+    )
+    return True
+
+
+def refresh_dashboard_insight(user):
+    """
+    Regenerates the stored dashboard reflection and breakthrough for a user.
+    Mirrors what the dashboard used to compute on every page view.
+    """
+    insight, _ = DashboardInsight.objects.get_or_create(user=user)
+    signature = journal_signature(user)
+    recent_journals = list(JournalEntry.objects.filter(user=user).order_by('-created_at')[:10])
+
+    calls = {}
+    if recent_journals:
+        latest_mood = MoodEntry.objects.filter(user=user).order_by('-created_at').first()
+        history = [j.content for j in recent_journals[1:3]]
+        mood_ctx = f"Mood: {latest_mood.mood_score}, Energy: {latest_mood.energy_score}" if latest_mood else "None"
+        getattr(user, 'profile', None)  # load the persona here rather than in a pool thread
+        calls['reflection'] = (
+            partial(ai_service.get_reflection, recent_journals[0].content, user=user, history=history,
+                    mood_context=mood_ctx, summary=insight.rolling_summary),
+            REFLECTION_FALLBACK,
+        )
+
+    # Phase 9: Breakthrough Pattern Recognition (Analyzing last 10 entries).
+    # Reused as-is when the nightly bulk run already analysed this exact journal set.
+    if len(recent_journals) >= 3 and insight.breakthrough_signature != signature:
+        calls['breakthrough'] = (partial(ai_service.get_breakthrough_analysis, recent_journals, summary=insight.rolling_summary), None)
+
+    # Both prompts are independent, so they go out concurrently on the sync client
+    results = ai_service.gather_sync(calls) if calls else {}
+    reflection = results.get('reflection', "")
+    # A fallback keeps the last real reflection and leaves the row stale, so the next read retries
+    fell_back = reflection == REFLECTION_FALLBACK
+    if not fell_back:
+        insight.reflection = reflection
+    if 'breakthrough' in results:
+        _store_breakthrough(insight, results['breakthrough'], signature)
+    elif len(recent_journals) < 3 and insight.breakthrough is not None:
+        insight.breakthrough = None
+        DashboardInsight.objects.filter(pk=insight.pk).update(breakthrough=None)
+
+    insight.journal_signature = signature
+    # A journal written while Gemini was answering leaves the row stale for the next read.
+    insight.is_stale = fell_back or journal_signature(user) != signature
+    # Explicit fields: the rolling summary and the breakthrough columns are written separately and must not be overwritten here
+    insight.save(update_fields=['reflection', 'journal_signature', 'is_stale', 'updated_at'])
+    return insight
+
+
+def get_dashboard_insight(user):
+    """
+    Returns the stored insight without waiting on Gemini. A missing or stale row
+    queues a background refresh; the caller renders whatever is stored meanwhile.
+    """
+    from .jobs import enqueue
+
+    insight = DashboardInsight.objects.filter(user=user).first()
+    if insight is None or insight.is_stale:
+        enqueue('dashboard_insight', {'user_id': user.id}, dedupe_key=f"user:{user.id}")
+    return insight
+
+
+def refresh_breakthrough(user_id, signature):
+    """Runs breakthrough analysis alone for one user; used by the nightly bulk command."""
+    recent_journals = list(JournalEntry.objects.filter(user_id=user_id).order_by('-created_at')[:10])
+    insight, _ = DashboardInsight.objects.get_or_create(user_id=user_id)
+    breakthrough = ai_service.get_breakthrough_analysis(recent_journals, summary=insight.rolling_summary)
+    return _store_breakthrough(insight, breakthrough, signature)
+
+
+def students_needing_breakthrough(active_days=30):
+    """
+    Returns {user_id: signature} for active students whose journal set changed since their
+    last breakthrough analysis. Three queries regardless of the number of students.
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=active_days)
+    active_ids = JournalEntry.objects.filter(
+        created_at__gte=cutoff, user__profile__role='STUDENT'
+    ).values_list('user_id', flat=True).distinct()
+
+    signatures = {
+        row['user_id']: _signature(row['count'], row['latest'], row['edited'])
+        for row in JournalEntry.objects.filter(user_id__in=active_ids)
+        .values('user_id').annotate(count=Count('id'), latest=Max('id'), edited=Max('updated_at'))
+        if row['count'] >= 3
+    }
+    analysed = dict(
+        DashboardInsight.objects.filter(user_id__in=signatures.keys())
+        .values_list('user_id', 'breakthrough_signature')
+    )
+    return {user_id: sig for user_id, sig in signatures.items() if analysed.get(user_id) != sig}
+
+
+def update_rolling_summary(user_id):
+    """
+    Folds journals written since the last update into the user's rolling summary.
+    Each call only sends the previous summary plus the new entries, so its cost does
+    not grow with the size of the user's history.
+    """
+    insight, _ = DashboardInsight.objects.get_or_create(user_id=user_id)
+    new_entries = list(
+        JournalEntry.objects.filter(user_id=user_id, id__gt=insight.summary_through_id)
+        .order_by('id').values_list('id', 'content')[:SUMMARY_BATCH]
+    )
+    if not new_entries:
+        return insight
+
+    contents = [content for _, content in new_entries]
+    summary = ai_service.update_summary(insight.rolling_summary, contents)
+    if summary is None:
+        summary = extractive_summary(insight.rolling_summary, contents, budget('update_summary', 'SUMMARY'))
+
+    insight.rolling_summary = summary
+    insight.summary_through_id = new_entries[-1][0]
+    insight.save(update_fields=['rolling_summary', 'summary_through_id', 'updated_at'])
+    if len(new_entries) == SUMMARY_BATCH:
+        return update_rolling_summary(user_id)
+    return insight
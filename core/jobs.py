@@ -0,0 +1,204 @@
+import datetime
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIJob
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Registers a function as the handler for a job kind. It receives the job's payload dict."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def get_config():
+    config = {
+        'EAGER': False,
+        'MAX_ATTEMPTS': 5,
+        'BACKOFF_BASE': 5,
+        'BACKOFF_MAX': 600,
+        'LOCK_TIMEOUT': 300,
+        'KIND_CONCURRENCY': {},
+        'PRIORITY_KINDS': ['crisis_alert_fanout'],
+    }
+    config.update(getattr(settings, 'AI_JOBS', {}))
+    return config
+
+
+def enqueue(kind, payload=None, dedupe_key='', delay=0, max_attempts=None):
+    """
+    Adds a job to the queue. With a dedupe_key, a job that is already pending for
+    the same key is reused instead of stacking duplicates.
+    """
+    config = get_config()
+    if dedupe_key:
+        existing = AIJob.objects.filter(kind=kind, dedupe_key=dedupe_key, status='PENDING').first()
+        if existing:
+            return existing
+    job = AIJob.objects.create(
+        kind=kind,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or config['MAX_ATTEMPTS'],
+        run_after=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+    if config['EAGER']:
+        # Development / test mode: run inline once the surrounding transaction commits.
+        transaction.on_commit(lambda: claim_and_run(job.id, 'eager'))
+    return job
+
+
+def backoff_seconds(attempts):
+    config = get_config()
+    return min(config['BACKOFF_BASE'] * (2 ** (attempts - 1)), config['BACKOFF_MAX'])
+
+
+def release_stale_locks():
+    """
+    Puts RUNNING jobs whose worker died back into the queue. The lost run counts as an attempt,
+    so a job that keeps crashing its worker ends in the dead letter instead of looping forever.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=get_config()['LOCK_TIMEOUT'])
+    stale = AIJob.objects.filter(status='RUNNING', locked_at__lt=cutoff)
+    released = {'attempts': F('attempts') + 1, 'locked_at': None, 'locked_by': '', 'last_error': 'Worker lock expired'}
+    dead = stale.filter(attempts__gte=F('max_attempts') - 1).update(status='DEAD', **released)
+    if dead:
+        logger.error(f"{dead} AI job(s) moved to dead letter after their worker died")
+    return stale.update(status='PENDING', **released)
+
+
+def _kinds_at_capacity():
+    limits = get_config()['KIND_CONCURRENCY']
+    if not limits:
+        return []
+    running = AIJob.objects.filter(status='RUNNING', kind__in=limits.keys()).values_list('kind', flat=True)
+    counts = {}
+    for kind in running:
+        counts[kind] = counts.get(kind, 0) + 1
+    return [kind for kind, limit in limits.items() if counts.get(kind, 0) >= limit]
+
+
+def claim_next(worker_id):
+    """
+    Atomically claims the next due job. The conditional UPDATE means two workers
+    racing for the same row cannot both win, without needing SELECT ... FOR UPDATE.
+    """
+    now = timezone.now()
+    candidates = AIJob.objects.filter(status='PENDING', run_after__lte=now)
+    blocked = _kinds_at_capacity()
+    if blocked:
+        candidates = candidates.exclude(kind__in=blocked)
+    ordered = candidates.order_by('run_after', 'id').values_list('id', flat=True)
+    # Priority kinds (crisis notifications) jump ahead of slow AI jobs that are already waiting
+    priority = get_config()['PRIORITY_KINDS']
+    job_ids = list(ordered.filter(kind__in=priority)[:10]) if priority else []
+    for job_id in job_ids + list(ordered[:10]):
+        claimed = AIJob.objects.filter(id=job_id, status='PENDING').update(
+            status='RUNNING', locked_at=now, locked_by=worker_id
+        )
+        if claimed:
+            return AIJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Executes a claimed job and records success, a retry with backoff, or the dead-letter state."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler(job.payload)
+    except Exception as e:
+        job.attempts += 1
+        job.last_error = f"{e}\n{traceback.format_exc()}"[-4000:]
+        job.locked_at = None
+        job.locked_by = ''
+        if job.attempts >= job.max_attempts:
+            job.status = 'DEAD'
+            logger.error(f"AI job #{job.id} ({job.kind}) moved to dead letter: {e}")
+        else:
+            job.status = 'PENDING'
+            job.run_after = timezone.now() + datetime.timedelta(seconds=backoff_seconds(job.attempts))
+            logger.warning(f"AI job #{job.id} ({job.kind}) failed, retry {job.attempts}/{job.max_attempts}: {e}")
+        job.save()
+        return False
+
+    job.attempts += 1
+    job.status = 'DONE'
+    job.locked_at = None
+    job.save(update_fields=['attempts', 'status', 'locked_at', 'updated_at'])
+    return True
+
+
+def claim_and_run(job_id, worker_id):
+    claimed = AIJob.objects.filter(id=job_id, status='PENDING').update(
+        status='RUNNING', locked_at=timezone.now(), locked_by=worker_id
+    )
+    if claimed:
+        return run_job(AIJob.objects.get(id=job_id))
+    return False
+
+
+# ===== HANDLERS =====
+
+@job_handler('journal_reflection')
+def journal_reflection_job(payload):
+    from .ai_resilience import AIUnavailable
+    from .ai_service import REFLECTION_FALLBACK, ai_service
+    from .models import DashboardInsight, JournalEntry, MoodEntry
+    from .stats import reflection_added
+
+    entry = JournalEntry.objects.select_related('user__profile').filter(id=payload['entry_id']).first()
+    if entry is None:
+        return
+    past_journals = JournalEntry.objects.filter(user=entry.user, created_at__lt=entry.created_at).order_by('-created_at')[:3]
+    history = [j.content for j in past_journals]
+    latest_mood = MoodEntry.objects.filter(user=entry.user).order_by('-created_at').first()
+    mood_ctx = f"Mood: {latest_mood.mood_score}, Energy: {latest_mood.energy_score}" if latest_mood else "Unknown"
+
+    summary = DashboardInsight.objects.filter(user=entry.user).values_list('rolling_summary', flat=True).first()
+
+    reflection = ai_service.get_reflection(entry.content, user=entry.user, history=history, mood_context=mood_ctx, summary=summary)
+    if reflection == REFLECTION_FALLBACK:
+        # Gemini was reachable but the call failed: fail the job so the queue retries it with backoff
+        raise AIUnavailable("No reflection from Gemini")
+    # REFLECTION_UNAVAILABLE means no client is configured, which no retry fixes: store it and finish
+    # update() skips post_save, so filling in the reflection doesn't invalidate the dashboard insight again
+    JournalEntry.objects.filter(id=entry.id).update(ai_reflection=reflection)
+    if not entry.ai_reflection and reflection:
+        reflection_added(entry.user_id)
+
+
+@job_handler('dashboard_insight')
+def dashboard_insight_job(payload):
+    from django.contrib.auth.models import User
+    from .insights import refresh_dashboard_insight
+
+    user = User.objects.select_related('profile').filter(id=payload['user_id']).first()
+    if user is not None:
+        refresh_dashboard_insight(user)
+
+
+@job_handler('journal_summary')
+def journal_summary_job(payload):
+    from .insights import update_rolling_summary
+
+    update_rolling_summary(payload['user_id'])
+
+
+@job_handler('crisis_alert_fanout')
+def crisis_alert_fanout_job(payload):
+    from .notifications import fan_out_alert
+
+    fan_out_alert(payload['alert_id'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.query_plans import EXPLAINERS, check_query_plans
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN on the app's hot queries and fails if any of them falls back to a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help="Print the plan of every query, not just failures.")
+
+    def handle(self, *args, **options):
+        results = check_query_plans()
+        if results is None:
+            raise CommandError(
+                f"No plan checker for database vendor '{connection.vendor}' (supported: {', '.join(EXPLAINERS)})."
+            )
+        failures = []
+        for name, full_scans, plan in results:
+            if full_scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(full_scans)}"))
+            else:
+                self.stdout.write(f"ok         {name}")
+            if full_scans or options['show_plans']:
+                self.stdout.write(f"    {plan}".replace('\n', '\n    '))
+        if failures:
+            raise CommandError(f"{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} use a full table scan: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Recounts the denormalized per-user stats rows from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        rebuilt = 0
+        for user_id in users.iterator():
+            rebuild_user_stats(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} user(s)."))
@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.metrics import rebuild_day
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the admin dashboard's daily metrics rows exactly from the source tables (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help="How many days back to rebuild, including today.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        # Oldest first, so each day's running totals are settled before the next
+        for offset in range(options['days'] - 1, -1, -1):
+            row = rebuild_day(today - datetime.timedelta(days=offset))
+            self.stdout.write(
+                f"{row.date}: {row.student_signups} student signups, {row.journal_entries} journals, "
+                f"{row.mood_entries} moods, {row.total_students} students total"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {options['days']} day(s) of metrics."))
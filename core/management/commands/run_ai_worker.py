@@ -0,0 +1,53 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_next, release_stale_locks, run_job
+
+
+class Command(BaseCommand):
+    help = "Processes queued AI jobs (journal reflections, dashboard insights) from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Jobs processed in parallel by this worker.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain currently due jobs and exit.")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"AI worker {worker_id} started (concurrency={concurrency})")
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    in_flight = {f for f in in_flight if not f.done()}
+                    release_stale_locks()
+
+                    claimed_any = False
+                    while len(in_flight) < concurrency:
+                        job = claim_next(worker_id)
+                        if job is None:
+                            break
+                        claimed_any = True
+                        in_flight.add(pool.submit(self._run, job))
+
+                    if options['once'] and not claimed_any and not in_flight:
+                        break
+                    if not claimed_any:
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write("Shutting down, waiting for in-flight jobs...")
+
+    def _run(self, job):
+        try:
+            ok = run_job(job)
+            status = "done" if ok else "failed"
+            self.stdout.write(f"Job #{job.id} {job.kind}: {status}")
+        finally:
+            close_old_connections()
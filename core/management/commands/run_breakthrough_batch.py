@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.ai_service import ai_service
+from core.insights import refresh_breakthrough, students_needing_breakthrough
+
+
+class RateLimiter:
+    """Spaces calls evenly so the batch stays under a requests-per-minute quota."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+
+class Command(BaseCommand):
+    help = "Nightly bulk breakthrough analysis for active students whose journals changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent Gemini calls.")
+        parser.add_argument('--rpm', type=int, default=60, help="Max breakthrough requests per minute (0 = unlimited).")
+        parser.add_argument('--active-days', type=int, default=30, help="Only students who journaled within this many days.")
+        parser.add_argument('--dry-run', action='store_true', help="List how many students would be analysed and exit.")
+
+    def handle(self, *args, **options):
+        pending = students_needing_breakthrough(options['active_days'])
+        self.stdout.write(f"{len(pending)} student(s) with changed journals")
+        if options['dry_run'] or not pending:
+            return
+
+        limiter = RateLimiter(options['rpm'])
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = [pool.submit(self._analyse, limiter, user_id, signature) for user_id, signature in pending.items()]
+            for future in as_completed(futures):
+                if future.result():
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Breakthroughs updated: {done}, skipped/failed: {failed}"))
+
+    def _analyse(self, limiter, user_id, signature):
+        try:
+            # Back off while the circuit breaker is open instead of burning the quota on fast failures
+            breaker = ai_service.resilience.breaker
+            while breaker.state == 'OPEN' and breaker.retry_in() > 0:
+                time.sleep(breaker.retry_in())
+            limiter.wait()
+            return refresh_breakthrough(user_id, signature)
+        except Exception as e:
+            self.stderr.write(f"User {user_id}: {e}")
+            return False
+        finally:
+            close_old_connections()
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Checkpoints the SQLite WAL and refreshes planner statistics. Run periodically (e.g. hourly from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', default='TRUNCATE', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            help="wal_checkpoint mode; TRUNCATE also shrinks the -wal file back to zero bytes.",
+        )
+        parser.add_argument('--vacuum', action='store_true', help="Also VACUUM to reclaim free pages (takes an exclusive lock).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f"Database is {connection.vendor}, nothing to do.")
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            if journal_mode.lower() == 'wal':
+                cursor.execute(f"PRAGMA wal_checkpoint({options['mode']})")
+                busy, log_frames, checkpointed = cursor.fetchone()
+                if busy:
+                    self.stdout.write(self.style.WARNING(
+                        f"Checkpoint could not finish: a reader or writer was active ({checkpointed}/{log_frames} frames copied)."
+                    ))
+                else:
+                    self.stdout.write(f"Checkpointed {checkpointed}/{log_frames} WAL frames ({options['mode']}).")
+            else:
+                self.stdout.write(f"journal_mode is {journal_mode}, skipping WAL checkpoint.")
+
+            # Lets SQLite re-run ANALYZE on tables whose statistics have drifted, so the planner keeps using the indexes
+            cursor.execute('PRAGMA optimize')
+            self.stdout.write("Ran PRAGMA optimize.")
+
+            if options['vacuum']:
+                cursor.execute('VACUUM')
+                self.stdout.write("Vacuumed database.")
+
+        self.stdout.write(self.style.SUCCESS("SQLite maintenance complete."))
@@ -0,0 +1,184 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .db_router import primary_reads
+from .models import ChatMessage, DailyMetrics, JournalEntry, MoodEntry, Task, UserProfile, UserStats
+
+# Day counter -> running total it also feeds
+TOTALS = {
+    'student_signups': 'total_students',
+    'therapist_signups': 'total_therapists',
+    'journal_entries': 'total_journal_entries',
+    'mood_entries': 'total_mood_entries',
+    'tasks_created': 'total_tasks',
+    'chat_messages': 'total_chat_messages',
+    'mood_sum': 'total_mood_sum',
+    'energy_sum': 'total_energy_sum',
+}
+CARRIED_FIELDS = list(TOTALS.values()) + ['inactive_students']
+
+# The day whose row this process already knows exists, so a bump doesn't re-check it on every create
+_known_day = {'date': None}
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+@primary_reads()
+def _ensure_today(trust_memo=True):
+    """
+    Makes sure today's row exists, carrying the running totals forward from the latest day.
+    Returns True when the row had to be counted from the source tables (first use on this database).
+    Reads the primary, since what it reads is written back.
+    """
+    today = timezone.localdate()
+    if (trust_memo and _known_day['date'] == today) or DailyMetrics.objects.filter(date=today).exists():
+        _known_day['date'] = today
+        return False
+    previous = DailyMetrics.objects.filter(date__lt=today).order_by('-date').values(*CARRIED_FIELDS).first()
+    if previous is None:
+        rebuild_day(today)
+        _known_day['date'] = today
+        return True
+    try:
+        with transaction.atomic():
+            DailyMetrics.objects.create(date=today, **previous)
+    except IntegrityError:
+        pass  # another request created it first
+    _known_day['date'] = today
+    return False
+
+
+def _bump(deltas, inactive_delta=0):
+    """One UPDATE of today's row; the row's existence is checked once per process per day."""
+    if _ensure_today():
+        return  # the rebuild already counted the row that triggered this
+    updates = {}
+    for field, amount in deltas.items():
+        updates[field] = F(field) + amount
+        updates[TOTALS[field]] = F(TOTALS[field]) + amount
+    if inactive_delta:
+        updates['inactive_students'] = Greatest(F('inactive_students') + inactive_delta, Value(0))
+    if not DailyMetrics.objects.filter(date=timezone.localdate()).update(**updates):
+        # The remembered row is gone (deleted, or a fresh database): check again and recount
+        if _ensure_today(trust_memo=False):
+            return
+        DailyMetrics.objects.filter(date=timezone.localdate()).update(**updates)
+
+
+def _first_activity(instance):
+    """
+    True when a new mood/journal entry is the student's first, i.e. they stop counting as inactive.
+    Reads the UserStats counters, which don't include the new entry yet: this handler is connected
+    before count_user_entry, and receivers run in connection order.
+    """
+    counts = UserStats.objects.filter(user_id=instance.user_id).values_list('journal_count', 'mood_count').first()
+    if counts is None:
+        # No counters yet for this user; count from the source tables
+        journals = JournalEntry.objects.filter(user_id=instance.user_id)
+        moods = MoodEntry.objects.filter(user_id=instance.user_id)
+        if isinstance(instance, JournalEntry):
+            journals = journals.exclude(id=instance.id)
+        else:
+            moods = moods.exclude(id=instance.id)
+        counts = (journals.exists(), moods.exists())
+    return not any(counts) and UserProfile.objects.filter(user_id=instance.user_id, role='STUDENT').exists()
+
+
+def record_activity(instance):
+    """Counts a newly created journal entry, mood entry, task or chat message against today."""
+    if isinstance(instance, JournalEntry):
+        _bump({'journal_entries': 1}, inactive_delta=-1 if _first_activity(instance) else 0)
+    elif isinstance(instance, MoodEntry):
+        _bump(
+            {'mood_entries': 1, 'mood_sum': instance.mood_score, 'energy_sum': instance.energy_score},
+            inactive_delta=-1 if _first_activity(instance) else 0,
+        )
+    elif isinstance(instance, Task):
+        _bump({'tasks_created': 1})
+    elif isinstance(instance, ChatMessage):
+        _bump({'chat_messages': 1})
+
+
+def record_signup(role):
+    if role == 'STUDENT':
+        _bump({'student_signups': 1}, inactive_delta=1)
+    elif role == 'THERAPIST':
+        _bump({'therapist_signups': 1})
+
+
+@primary_reads()
+def rebuild_day(day):
+    """Recomputes one day's row exactly from the source tables (used by rollup_daily_metrics), read on the primary."""
+    start, end = _day_bounds(day)
+    joined = User.objects.filter(date_joined__gte=start, date_joined__lt=end)
+    moods_today = MoodEntry.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        count=Count('id'), mood=Sum('mood_score'), energy=Sum('energy_score')
+    )
+    moods_total = MoodEntry.objects.filter(created_at__lt=end).aggregate(
+        count=Count('id'), mood=Sum('mood_score'), energy=Sum('energy_score')
+    )
+    roles = UserProfile.objects.filter(user__date_joined__lt=end).aggregate(
+        students=Count('id', filter=Q(role='STUDENT')), therapists=Count('id', filter=Q(role='THERAPIST'))
+    )
+    values = {
+        'student_signups': joined.filter(profile__role='STUDENT').count(),
+        'therapist_signups': joined.filter(profile__role='THERAPIST').count(),
+        'journal_entries': JournalEntry.objects.filter(created_at__gte=start, created_at__lt=end).count(),
+        'mood_entries': moods_today['count'],
+        'tasks_created': Task.objects.filter(created_at__gte=start, created_at__lt=end).count(),
+        'chat_messages': ChatMessage.objects.filter(created_at__gte=start, created_at__lt=end).count(),
+        'mood_sum': moods_today['mood'] or 0,
+        'energy_sum': moods_today['energy'] or 0,
+        'total_students': roles['students'],
+        'total_therapists': roles['therapists'],
+        'total_journal_entries': JournalEntry.objects.filter(created_at__lt=end).count(),
+        'total_mood_entries': moods_total['count'],
+        'total_tasks': Task.objects.filter(created_at__lt=end).count(),
+        'total_chat_messages': ChatMessage.objects.filter(created_at__lt=end).count(),
+        'total_mood_sum': moods_total['mood'] or 0,
+        'total_energy_sum': moods_total['energy'] or 0,
+    }
+    if day == timezone.localdate():
+        # Inactivity is a current-state figure, so it is only recomputed for today
+        values['inactive_students'] = UserProfile.objects.filter(role='STUDENT').exclude(
+            Q(user__mood_entries__isnull=False) | Q(user__journal_entries__isnull=False)
+        ).count()
+    row, _ = DailyMetrics.objects.update_or_create(date=day, defaults=values)
+    return row
+
+
+def admin_dashboard_metrics(days=7):
+    """Everything the admin dashboard charts, read from the last `days` rollup rows."""
+    _ensure_today(trust_memo=False)
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days - 1)
+    rows = {row.date: row for row in DailyMetrics.objects.filter(date__gte=first_day)}
+    # Read from a replica, today's row may not have arrived yet; fall back to the newest one it has
+    latest = rows.get(today) or DailyMetrics.objects.order_by('-date').first() or DailyMetrics(date=today)
+
+    growth_labels, growth_data = [], []
+    for i in range(days):
+        day = first_day + datetime.timedelta(days=i)
+        growth_labels.append(day.strftime('%b %d'))
+        growth_data.append(rows[day].student_signups if day in rows else 0)
+
+    moods = latest.total_mood_entries
+    students = latest.total_students
+    return {
+        'total_students': students,
+        'total_therapists': latest.total_therapists,
+        'growth_labels': growth_labels,
+        'growth_data': growth_data,
+        'avg_mood': round(latest.total_mood_sum / moods, 1) if moods else 0,
+        'avg_energy': round(latest.total_energy_sum / moods, 1) if moods else 0,
+        'dynamic_page_views': latest.total_journal_entries + moods + latest.total_tasks + latest.total_chat_messages,
+        'bounce_rate': round(latest.inactive_students / students * 100, 1) if students else 0,
+    }
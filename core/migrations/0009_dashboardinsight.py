@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_appointment_sessionnote_therapistprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardInsight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reflection', models.TextField(blank=True, default='')),
+                ('breakthrough', models.TextField(blank=True, null=True)),
+                ('journal_signature', models.CharField(blank=True, default='', max_length=64)),
+                ('is_stale', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_insight', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
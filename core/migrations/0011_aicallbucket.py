@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_aijob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICallBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('method', models.CharField(max_length=50)),
+                ('persona', models.CharField(blank=True, default='', max_length=20)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('prompt_chars', models.PositiveBigIntegerField(default=0)),
+                ('response_chars', models.PositiveBigIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0)),
+                ('response_tokens', models.PositiveBigIntegerField(default=0)),
+                ('latency_ms_total', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+                'constraints': [models.UniqueConstraint(fields=('bucket_start', 'method', 'persona'), name='aicallbucket_unique_slot')],
+            },
+        ),
+    ]
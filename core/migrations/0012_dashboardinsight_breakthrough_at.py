@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_aicallbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardinsight',
+            name='breakthrough_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dashboardinsight',
+            name='breakthrough_signature',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_dashboardinsight_breakthrough_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardinsight',
+            name='rolling_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='dashboardinsight',
+            name='summary_through_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
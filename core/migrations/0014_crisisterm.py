@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:50
+
+from django.db import migrations, models
+
+SEED_TERMS = {
+    'suicide': 10,
+    'suicidal': 10,
+    'kill myself': 10,
+    'end my life': 10,
+    'want to die': 10,
+    'self-harm': 8,
+    'hurt myself': 8,
+    'cut myself': 8,
+    "can't go on": 6,
+    'no reason to live': 9,
+    'die': 5,
+    'kill': 5,
+    'hopeless': 4,
+    'depressed': 3,
+}
+
+
+def seed_terms(apps, schema_editor):
+    CrisisTerm = apps.get_model('core', 'CrisisTerm')
+    CrisisTerm.objects.bulk_create(
+        [CrisisTerm(phrase=phrase, severity=severity) for phrase, severity in SEED_TERMS.items()],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_dashboardinsight_rolling_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrisisTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=200, unique=True)),
+                ('severity', models.PositiveSmallIntegerField(default=5)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-severity', 'phrase'],
+            },
+        ),
+        migrations.RunPython(seed_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_deliveries(apps, schema_editor):
+    # Existing unresolved alerts get deliveries already marked as delivered, so they count on
+    # dashboards without being pushed again as new notifications.
+    CrisisAlert = apps.get_model('core', 'CrisisAlert')
+    AlertDelivery = apps.get_model('core', 'AlertDelivery')
+    User = apps.get_model('auth', 'User')
+    now = timezone.now()
+    admin_ids = list(User.objects.filter(profile__role='ADMIN').values_list('id', flat=True))
+    deliveries = []
+    for alert in CrisisAlert.objects.filter(is_resolved=False):
+        therapist_ids = User.objects.filter(
+            student_connections__student_id=alert.student_id, student_connections__status='ACTIVE'
+        ).values_list('id', flat=True)
+        for recipient_id in set(admin_ids) | set(therapist_ids):
+            deliveries.append(AlertDelivery(alert_id=alert.id, recipient_id=recipient_id, delivered_at=now))
+    AlertDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_crisisterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('IN_APP', 'In-app')], default='IN_APP', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('seen_at', models.DateTimeField(blank=True, null=True)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.crisisalert')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', 'seen_at'], name='alertdelivery_recipient_seen')],
+                'constraints': [models.UniqueConstraint(fields=('alert', 'recipient', 'channel'), name='alertdelivery_unique_recipient')],
+            },
+        ),
+        migrations.RunPython(backfill_deliveries, migrations.RunPython.noop),
+    ]
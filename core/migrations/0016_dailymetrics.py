@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_alertdelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('student_signups', models.PositiveIntegerField(default=0)),
+                ('therapist_signups', models.PositiveIntegerField(default=0)),
+                ('journal_entries', models.PositiveIntegerField(default=0)),
+                ('mood_entries', models.PositiveIntegerField(default=0)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('chat_messages', models.PositiveIntegerField(default=0)),
+                ('mood_sum', models.PositiveIntegerField(default=0)),
+                ('energy_sum', models.PositiveIntegerField(default=0)),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('total_therapists', models.PositiveIntegerField(default=0)),
+                ('total_journal_entries', models.PositiveBigIntegerField(default=0)),
+                ('total_mood_entries', models.PositiveBigIntegerField(default=0)),
+                ('total_tasks', models.PositiveBigIntegerField(default=0)),
+                ('total_chat_messages', models.PositiveBigIntegerField(default=0)),
+                ('total_mood_sum', models.PositiveBigIntegerField(default=0)),
+                ('total_energy_sum', models.PositiveBigIntegerField(default=0)),
+                ('inactive_students', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'daily metrics',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
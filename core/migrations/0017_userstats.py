@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0016_dailymetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('journal_count', models.PositiveIntegerField(default=0)),
+                ('mood_count', models.PositiveIntegerField(default=0)),
+                ('reflection_count', models.PositiveIntegerField(default=0)),
+                ('last_journal_at', models.DateTimeField(blank=True, null=True)),
+                ('last_mood_at', models.DateTimeField(blank=True, null=True)),
+                ('last_active_at', models.DateTimeField(blank=True, null=True)),
+                ('open_alert_count', models.PositiveIntegerField(default=0)),
+                ('assigned_alert_count', models.PositiveIntegerField(default=0)),
+                ('pending_appointment_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['therapist', 'status', '-scheduled_at'], name='appointment_therapist_status'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['sender', 'receiver', 'created_at'], name='chatmessage_thread'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['receiver', 'sender', 'is_read'], name='chatmessage_inbox'),
+        ),
+        migrations.AddIndex(
+            model_name='crisisalert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['student', '-created_at'], name='crisisalert_student_open'),
+        ),
+        migrations.AddIndex(
+            model_name='crisisalert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['-created_at'], name='crisisalert_open_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['user', '-created_at'], name='journalentry_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='moodentry',
+            index=models.Index(fields=['user', '-created_at'], name='moodentry_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'is_completed'], name='task_user_open'),
+        ),
+        migrations.AddIndex(
+            model_name='therapistconnection',
+            index=models.Index(fields=['therapist', 'status'], name='connection_therapist_status'),
+        ),
+        migrations.AddIndex(
+            model_name='therapistconnection',
+            index=models.Index(fields=['student', 'status'], name='connection_student_status'),
+        ),
+    ]
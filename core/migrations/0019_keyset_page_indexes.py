@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='crisisalert',
+            index=models.Index(fields=['-created_at', '-id'], name='crisisalert_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['-created_at', '-id'], name='resource_recent'),
+        ),
+    ]
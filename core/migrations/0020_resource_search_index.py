@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:45
+
+from django.db import migrations
+
+# External-content FTS5 table over core_resource; the triggers keep it in step with every write.
+# resource_type and category_id ride along UNINDEXED so filters run inside the MATCH query.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE core_resource_fts USING fts5(
+        title, content, resource_type UNINDEXED, category_id UNINDEXED,
+        content='core_resource', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER core_resource_fts_ai AFTER INSERT ON core_resource BEGIN
+        INSERT INTO core_resource_fts(rowid, title, content, resource_type, category_id)
+        VALUES (new.id, new.title, new.content, new.resource_type, new.category_id);
+    END
+    """,
+    """
+    CREATE TRIGGER core_resource_fts_ad AFTER DELETE ON core_resource BEGIN
+        INSERT INTO core_resource_fts(core_resource_fts, rowid, title, content, resource_type, category_id)
+        VALUES ('delete', old.id, old.title, old.content, old.resource_type, old.category_id);
+    END
+    """,
+    """
+    CREATE TRIGGER core_resource_fts_au AFTER UPDATE ON core_resource BEGIN
+        INSERT INTO core_resource_fts(core_resource_fts, rowid, title, content, resource_type, category_id)
+        VALUES ('delete', old.id, old.title, old.content, old.resource_type, old.category_id);
+        INSERT INTO core_resource_fts(rowid, title, content, resource_type, category_id)
+        VALUES (new.id, new.title, new.content, new.resource_type, new.category_id);
+    END
+    """,
+    "INSERT INTO core_resource_fts(core_resource_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_resource_fts_au',
+    'DROP TRIGGER IF EXISTS core_resource_fts_ad',
+    'DROP TRIGGER IF EXISTS core_resource_fts_ai',
+    'DROP TABLE IF EXISTS core_resource_fts',
+]
+
+# An expression index needs no triggers: Postgres maintains it on every write. Keep it in step with core/search.py.
+POSTGRES_CREATE = [
+    """
+    CREATE INDEX core_resource_search ON core_resource USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ))
+    """,
+]
+POSTGRES_DROP = ['DROP INDEX IF EXISTS core_resource_search']
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_keyset_page_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
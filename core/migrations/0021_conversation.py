@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    ChatMessage = apps.get_model('core', 'ChatMessage')
+    Conversation = apps.get_model('core', 'Conversation')
+    TherapistConnection = apps.get_model('core', 'TherapistConnection')
+    summaries = {}
+    directions = ChatMessage.objects.values('sender_id', 'receiver_id').annotate(
+        last_id=models.Max('id'), unread=models.Count('id', filter=models.Q(is_read=False)),
+    )
+    for row in directions:
+        sender, receiver = row['sender_id'], row['receiver_id']
+        pair = (min(sender, receiver), max(sender, receiver))
+        summary = summaries.setdefault(pair, {'last_message_id': None, 'low_unread': 0, 'high_unread': 0})
+        summary['last_message_id'] = max(summary['last_message_id'] or 0, row['last_id'])
+        summary['low_unread' if receiver == pair[0] else 'high_unread'] += row['unread']
+    last_times = dict(ChatMessage.objects.filter(
+        id__in=[s['last_message_id'] for s in summaries.values()]
+    ).values_list('id', 'created_at'))
+    for connection in TherapistConnection.objects.filter(status='ACTIVE'):
+        pair = tuple(sorted((connection.student_id, connection.therapist_id)))
+        summaries.setdefault(pair, {'last_message_id': None, 'low_unread': 0, 'high_unread': 0})
+    Conversation.objects.bulk_create([
+        Conversation(
+            user_low_id=low, user_high_id=high, **summary,
+            **({'last_message_at': last_times[summary['last_message_id']]} if summary['last_message_id'] else {}),
+        )
+        for (low, high), summary in summaries.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_resource_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('low_unread', models.PositiveIntegerField(default=0)),
+                ('high_unread', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.chatmessage')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_recent'), models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_recent')],
+                'constraints': [models.UniqueConstraint(fields=('user_low', 'user_high'), name='conversation_unique_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:40
+
+from django.db import migrations
+
+# Inflections the old substring check caught and the word-bounded matcher does not
+SEED_TERMS = {
+    'killing myself': 10,
+    'killed myself': 10,
+    'ending my life': 10,
+    'take my own life': 10,
+    'taking my own life': 10,
+    'wanna die': 10,
+    'wanted to die': 9,
+    'wish i was dead': 10,
+    'self-harming': 8,
+    'hurting myself': 8,
+    'cutting myself': 8,
+    'dies': 5,
+    'died': 5,
+    'dying': 5,
+    'kills': 5,
+    'killed': 5,
+    'killing': 5,
+    'hopelessness': 4,
+    'depression': 3,
+}
+
+
+def seed_terms(apps, schema_editor):
+    CrisisTerm = apps.get_model('core', 'CrisisTerm')
+    CrisisTerm.objects.bulk_create(
+        [CrisisTerm(phrase=phrase, severity=severity) for phrase, severity in SEED_TERMS.items()],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_conversation'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:55
+
+from django.db import migrations
+from django.db.models import Count, Max, Q
+
+COUNTERS = [
+    'journal_count', 'mood_count', 'reflection_count', 'last_journal_at', 'last_mood_at', 'last_active_at',
+    'open_alert_count', 'assigned_alert_count', 'pending_appointment_count',
+]
+
+# core.stats.CANNED_REFLECTIONS as of this migration
+CANNED_REFLECTIONS = (
+    "I'm here for you. Take your time to process these thoughts.",
+    "AI service is currently unavailable. Reflect on your thoughts and breathe deeply.",
+)
+
+
+def backfill_user_stats(apps, schema_editor):
+    """
+    Counts every existing user's row the way core.stats.rebuild_user_stats does, using the
+    historical models and one grouped query per source table.
+    """
+    User = apps.get_model('auth', 'User')
+    UserStats = apps.get_model('core', 'UserStats')
+    JournalEntry = apps.get_model('core', 'JournalEntry')
+    MoodEntry = apps.get_model('core', 'MoodEntry')
+    CrisisAlert = apps.get_model('core', 'CrisisAlert')
+    AlertDelivery = apps.get_model('core', 'AlertDelivery')
+    Appointment = apps.get_model('core', 'Appointment')
+
+    with_reflection = ~Q(ai_reflection__isnull=True) & ~Q(ai_reflection='') & ~Q(ai_reflection__in=CANNED_REFLECTIONS)
+    journals = {
+        row['user_id']: row for row in JournalEntry.objects.values('user_id').annotate(
+            count=Count('id'), reflections=Count('id', filter=with_reflection), latest=Max('created_at'))
+    }
+    moods = {row['user_id']: row for row in MoodEntry.objects.values('user_id').annotate(count=Count('id'), latest=Max('created_at'))}
+    open_alerts = dict(
+        CrisisAlert.objects.filter(is_resolved=False).values('student_id').annotate(count=Count('id')).values_list('student_id', 'count')
+    )
+    assigned = dict(
+        AlertDelivery.objects.filter(alert__is_resolved=False).values('recipient_id')
+        .annotate(count=Count('id')).values_list('recipient_id', 'count')
+    )
+    pending = dict(
+        Appointment.objects.filter(status='PENDING').values('therapist_id').annotate(count=Count('id')).values_list('therapist_id', 'count')
+    )
+
+    existing = {row.user_id: row for row in UserStats.objects.all()}
+    created, updated = [], []
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        journal = journals.get(user_id, {})
+        mood = moods.get(user_id, {})
+        row = existing.get(user_id) or UserStats(user_id=user_id)
+        row.journal_count = journal.get('count', 0)
+        row.mood_count = mood.get('count', 0)
+        row.reflection_count = journal.get('reflections', 0)
+        row.last_journal_at = journal.get('latest')
+        row.last_mood_at = mood.get('latest')
+        row.last_active_at = max([t for t in (row.last_journal_at, row.last_mood_at) if t], default=None)
+        row.open_alert_count = open_alerts.get(user_id, 0)
+        row.assigned_alert_count = assigned.get(user_id, 0)
+        row.pending_appointment_count = pending.get(user_id, 0)
+        (updated if user_id in existing else created).append(row)
+    UserStats.objects.bulk_create(created, batch_size=500)
+    UserStats.objects.bulk_update(updated, COUNTERS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_crisisterm_inflections'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def start_from_created_at(apps, schema_editor):
+    JournalEntry = apps.get_model('core', 'JournalEntry')
+    JournalEntry.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_backfill_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(start_from_created_at, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,11 @@ class MoodEntry(models.Model):
     note = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='moodentry_user_recent'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.created_at.date()} - Mood: {self.mood_score}"
 
@@ -20,6 +25,12 @@ class JournalEntry(models.Model):
     detected_emotion = models.CharField(max_length=100, blank=True, null=True)
     is_flagged = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)  # part of the breakthrough signature, so edits are re-analysed
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='journalentry_user_recent'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.created_at.date()} - {self.content[:30]}..."
@@ -56,16 +67,23 @@ class TherapistConnection(models.Model):
     status = models.CharField(max_length=20, default='ACTIVE')  # PENDING, ACTIVE, COMPLETED
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['therapist', 'status'], name='connection_therapist_status'),
+            models.Index(fields=['student', 'status'], name='connection_student_status'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} connected to {self.therapist.username}"
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save, pre_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.get_or_create(user=instance)
+        UserStats.objects.get_or_create(user=instance)
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
@@ -81,6 +99,11 @@ class Task(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     deadline = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_completed'], name='task_user_open'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
@@ -110,6 +133,11 @@ class Resource(models.Model):
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='resource_recent'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -120,9 +148,53 @@ class CrisisAlert(models.Model):
     is_resolved = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Partial: Django filters is_resolved=False as "NOT is_resolved", which a plain boolean index can't serve
+            models.Index(fields=['student', '-created_at'], condition=models.Q(is_resolved=False), name='crisisalert_student_open'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_resolved=False), name='crisisalert_open_recent'),
+            models.Index(fields=['-created_at', '-id'], name='crisisalert_recent'),
+        ]
+
     def __str__(self):
         return f"CRISIS: {self.student.username} - {self.created_at.date()}"
 
+class AlertDelivery(models.Model):
+    """One crisis alert delivered to one therapist/admin, with delivery and read tracking."""
+    CHANNEL_CHOICES = [
+        ('IN_APP', 'In-app'),
+    ]
+    alert = models.ForeignKey(CrisisAlert, on_delete=models.CASCADE, related_name='deliveries')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alert_deliveries')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default='IN_APP')
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)  # pushed over the live stream
+    seen_at = models.DateTimeField(null=True, blank=True)  # recipient opened the crisis page
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['alert', 'recipient', 'channel'], name='alertdelivery_unique_recipient'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', 'seen_at'], name='alertdelivery_recipient_seen'),
+        ]
+
+    def __str__(self):
+        return f"Alert #{self.alert_id} -> {self.recipient.username} ({self.channel})"
+
+class CrisisTerm(models.Model):
+    """A phrase in the clinically managed crisis lexicon used by core.crisis."""
+    phrase = models.CharField(max_length=200, unique=True)
+    severity = models.PositiveSmallIntegerField(default=5)  # 1-10 weight added to the crisis score
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-severity', 'phrase']
+
+    def __str__(self):
+        return f"{self.phrase} ({self.severity})"
+
 class ChatMessage(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
@@ -132,11 +204,48 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Both directions of a conversation are (sender, receiver) lookups ordered by time
+            models.Index(fields=['sender', 'receiver', 'created_at'], name='chatmessage_thread'),
+            models.Index(fields=['receiver', 'sender', 'is_read'], name='chatmessage_inbox'),
+        ]
 
     def __str__(self):
         return f"From {self.sender.username} to {self.receiver.username}"
 
 
+class Conversation(models.Model):
+    """
+    Inbox row for a pair of users (user_low has the smaller id): the latest message and each
+    side's unread count, kept current by core.chat as messages are sent and read.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(ChatMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(default=timezone.now)  # creation time until the first message
+    low_unread = models.PositiveIntegerField(default=0)  # messages from user_high that user_low hasn't read
+    high_unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='conversation_unique_pair'),
+        ]
+        indexes = [
+            # The inbox is "either side is me, newest first"; the unique pair index covers user_low
+            models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_recent'),
+            models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_recent'),
+        ]
+
+    def other(self, user):
+        return self.user_high if user.id == self.user_low_id else self.user_low
+
+    def unread_for(self, user):
+        return self.low_unread if user.id == self.user_low_id else self.high_unread
+
+    def __str__(self):
+        return f"Conversation {self.user_low_id}-{self.user_high_id}"
+
+
 class TherapistProfile(models.Model):
     """Extended professional profile for therapists."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='therapist_profile')
@@ -169,6 +278,9 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['-scheduled_at']
+        indexes = [
+            models.Index(fields=['therapist', 'status', '-scheduled_at'], name='appointment_therapist_status'),
+        ]
 
     def __str__(self):
         return f"Appt: {self.student.username} w/ {self.therapist.username} @ {self.scheduled_at}"
@@ -188,3 +300,239 @@ class SessionNote(models.Model):
 
     def __str__(self):
         return f"Note by {self.therapist.username} on {self.student.username} [{self.risk_level}]"
+
+
+class DashboardInsight(models.Model):
+    """
+    Per-user AI summary row: the stored dashboard reflection and breakthrough (recomputed only when
+    journals change) and a rolling journal summary that keeps prompt size bounded.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dashboard_insight')
+    reflection = models.TextField(blank=True, default='')
+    breakthrough = models.TextField(blank=True, null=True)
+    journal_signature = models.CharField(max_length=64, blank=True, default='')
+    breakthrough_signature = models.CharField(max_length=64, blank=True, default='')
+    breakthrough_at = models.DateTimeField(blank=True, null=True)
+    rolling_summary = models.TextField(blank=True, default='')
+    summary_through_id = models.PositiveBigIntegerField(default=0)  # newest JournalEntry id folded into rolling_summary
+    is_stale = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Insight: {self.user.username} ({'stale' if self.is_stale else 'fresh'})"
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+def invalidate_dashboard_insight(sender, instance, **kwargs):
+    DashboardInsight.objects.filter(user_id=instance.user_id).update(is_stale=True)
+
+
+class AIJob(models.Model):
+    """Database-backed unit of background AI work, processed by `manage.py run_ai_worker`."""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('DEAD', 'Dead Letter'),
+    ]
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    dedupe_key = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='aijob_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f"AIJob #{self.id} {self.kind} [{self.status}]"
+
+
+class AICallBucket(models.Model):
+    """Aggregated AIService call telemetry for one time bucket, method and persona."""
+    bucket_start = models.DateTimeField()
+    method = models.CharField(max_length=50)
+    persona = models.CharField(max_length=20, blank=True, default='')
+    calls = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+    prompt_chars = models.PositiveBigIntegerField(default=0)
+    response_chars = models.PositiveBigIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    response_tokens = models.PositiveBigIntegerField(default=0)
+    latency_ms_total = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=list)  # counts per core.ai_telemetry.LATENCY_BOUNDS_MS bin
+
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket_start', 'method', 'persona'], name='aicallbucket_unique_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.bucket_start:%Y-%m-%d %H:%M} {self.method} [{self.persona or '-'}] x{self.calls}"
+
+
+class DailyMetrics(models.Model):
+    """
+    One row per day of platform activity for the admin dashboard. The day's counters and the
+    running totals are bumped by signals as rows are created; rollup_daily_metrics rebuilds them exactly.
+    """
+    date = models.DateField(unique=True)
+    # Activity that happened on this day
+    student_signups = models.PositiveIntegerField(default=0)
+    therapist_signups = models.PositiveIntegerField(default=0)
+    journal_entries = models.PositiveIntegerField(default=0)
+    mood_entries = models.PositiveIntegerField(default=0)
+    tasks_created = models.PositiveIntegerField(default=0)
+    chat_messages = models.PositiveIntegerField(default=0)
+    mood_sum = models.PositiveIntegerField(default=0)
+    energy_sum = models.PositiveIntegerField(default=0)
+    # Running totals as of the end of this day
+    total_students = models.PositiveIntegerField(default=0)
+    total_therapists = models.PositiveIntegerField(default=0)
+    total_journal_entries = models.PositiveBigIntegerField(default=0)
+    total_mood_entries = models.PositiveBigIntegerField(default=0)
+    total_tasks = models.PositiveBigIntegerField(default=0)
+    total_chat_messages = models.PositiveBigIntegerField(default=0)
+    total_mood_sum = models.PositiveBigIntegerField(default=0)
+    total_energy_sum = models.PositiveBigIntegerField(default=0)
+    inactive_students = models.PositiveIntegerField(default=0)  # students with no mood or journal entries
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily metrics'
+
+    def __str__(self):
+        return f"Metrics {self.date}"
+
+
+class UserStats(models.Model):
+    """
+    Denormalized per-user counters, kept current with F() updates by core.stats signal handlers
+    and rebuilt from the source tables by rebuild_user_stats.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    journal_count = models.PositiveIntegerField(default=0)
+    mood_count = models.PositiveIntegerField(default=0)
+    reflection_count = models.PositiveIntegerField(default=0)  # journal entries with an AI reflection
+    last_journal_at = models.DateTimeField(null=True, blank=True)
+    last_mood_at = models.DateTimeField(null=True, blank=True)
+    last_active_at = models.DateTimeField(null=True, blank=True)
+    open_alert_count = models.PositiveIntegerField(default=0)  # unresolved crisis alerts about this student
+    assigned_alert_count = models.PositiveIntegerField(default=0)  # unresolved alerts delivered to this therapist/admin
+    pending_appointment_count = models.PositiveIntegerField(default=0)  # PENDING appointments with this therapist
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+
+    def __str__(self):
+        return f"Stats for {self.user.username}"
+
+
+@receiver(post_save, sender=CrisisTerm)
+@receiver(post_delete, sender=CrisisTerm)
+def reload_crisis_lexicon(sender, **kwargs):
+    from .crisis import detector
+    detector.invalidate()
+
+
+@receiver(post_save, sender=CrisisAlert)
+def fan_out_crisis_alert(sender, instance, created, **kwargs):
+    # Recipients are resolved by the job worker, so the crisis POST costs one insert however many there are
+    if created:
+        from .jobs import enqueue
+        enqueue('crisis_alert_fanout', {'alert_id': instance.id}, dedupe_key=f"alert:{instance.id}")
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_save, sender=MoodEntry)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=ChatMessage)
+def count_daily_activity(sender, instance, created, **kwargs):
+    # Connected before count_user_entry on purpose: the first-activity check reads UserStats before it counts the entry
+    if created:
+        from .metrics import record_activity
+        record_activity(instance)
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_save, sender=MoodEntry)
+def count_user_entry(sender, instance, created, **kwargs):
+    if created:
+        from . import stats
+        stats.entry_created(instance)
+
+
+@receiver(post_delete, sender=JournalEntry)
+@receiver(post_delete, sender=MoodEntry)
+def uncount_user_entry(sender, instance, **kwargs):
+    from . import stats
+    stats.entry_deleted(instance)
+
+
+@receiver(pre_save, sender=CrisisAlert)
+@receiver(pre_save, sender=Appointment)
+def remember_previous_state(sender, instance, **kwargs):
+    from . import stats
+    stats.remember_previous(instance)
+
+
+@receiver(post_save, sender=CrisisAlert)
+def count_crisis_alert(sender, instance, created, **kwargs):
+    from . import stats
+    stats.alert_saved(instance, created)
+
+
+@receiver(pre_delete, sender=CrisisAlert)
+def uncount_crisis_alert(sender, instance, **kwargs):
+    # pre_delete: the alert's deliveries still exist, so their recipients can be found
+    from . import stats
+    stats.alert_deleted(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment(sender, instance, created, **kwargs):
+    from . import stats
+    stats.appointment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Appointment)
+def uncount_appointment(sender, instance, **kwargs):
+    from . import stats
+    stats.appointment_deleted(instance)
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_conversation(sender, instance, created, **kwargs):
+    if created:
+        from .chat import message_created
+        message_created(instance)
+
+
+@receiver(post_save, sender=TherapistConnection)
+def open_conversation(sender, instance, **kwargs):
+    # Connected pairs show up in the inbox before their first message
+    if instance.status == 'ACTIVE':
+        from .chat import conversation_for
+        conversation_for(instance.student_id, instance.therapist_id)
+
+
+@receiver(post_save, sender=TherapistConnection)
+def deliver_alerts_on_connect(sender, instance, **kwargs):
+    # Alerts still open from before the connection reach the new therapist too
+    if instance.status == 'ACTIVE':
+        from .notifications import deliver_open_alerts
+        deliver_open_alerts(instance.student_id, instance.therapist_id)
@@ -0,0 +1,156 @@
+import datetime
+
+import numpy as np
+from django.utils import timezone
+
+from .models import MoodEntry
+
+ROLLING_WINDOW = 7  # check-ins in the moving average
+HISTORY_DAYS = 90  # caseload view looks this far back
+DECLINE_PER_WEEK = -0.5  # mood slope (points/week) that counts as declining
+VOLATILITY_LIMIT = 2.5  # RMS check-in-to-check-in mood change that counts as volatile
+ANOMALY_Z = 2.0  # latest mood this many standard deviations off the student's mean
+MIN_ENTRIES_FOR_FLAGS = 5
+WEEK_SECONDS = 7 * 24 * 3600
+
+SCORE_FIELDS = ('mood_score', 'energy_score', 'stress_score')
+MOOD, ENERGY, STRESS = range(3)
+
+
+def _columns(rows):
+    """(user_id, created_at, mood, energy, stress) rows -> user id, timestamp and score arrays."""
+    count = len(rows)
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    times = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=count)
+    scores = np.array([row[2:] for row in rows], dtype=np.float64).reshape(count, len(SCORE_FIELDS))
+    return user_ids, times, scores
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Trailing moving average; the first points average over what exists so far."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def _summaries(user_ids, times, scores):
+    """
+    Per-student stats for rows sorted by (user, time), computed for every student at once:
+    segment boundaries plus reduceat/cumsum instead of a Python loop over entries.
+    """
+    if not len(user_ids):
+        return {}
+    starts = np.flatnonzero(np.concatenate(([True], user_ids[1:] != user_ids[:-1])))
+    ends = np.concatenate((starts[1:], [len(user_ids)])) - 1
+    counts = (ends - starts + 1).astype(np.float64)
+    mood = scores[:, MOOD]
+
+    # Moving averages over each student's last ROLLING_WINDOW check-ins
+    sums = np.vstack((np.zeros(scores.shape[1]), np.cumsum(scores, axis=0)))
+    window_starts = np.maximum(starts, ends - ROLLING_WINDOW + 1)
+    averages = (sums[ends + 1] - sums[window_starts]) / (ends - window_starts + 1)[:, None]
+
+    # Least-squares mood slope in points per week (time measured from each student's first check-in)
+    t = (times - np.repeat(times[starts], counts.astype(np.int64))) / WEEK_SECONDS
+    sum_t, sum_y = np.add.reduceat(t, starts), np.add.reduceat(mood, starts)
+    sum_tt, sum_ty = np.add.reduceat(t * t, starts), np.add.reduceat(t * mood, starts)
+    denominator = counts * sum_tt - sum_t ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(denominator > 1e-12, (counts * sum_ty - sum_t * sum_y) / denominator, 0.0)
+
+    # Volatility: RMS of successive changes, ignoring the step between two students
+    steps = np.diff(mood, prepend=mood[0]) ** 2
+    steps[starts] = 0.0
+    volatility = np.sqrt(np.add.reduceat(steps, starts) / np.maximum(counts - 1, 1))
+
+    # Anomaly: how far the latest check-in sits from the student's own mean
+    means = sum_y / counts
+    spread = np.sqrt(np.maximum(np.add.reduceat(mood ** 2, starts) / counts - means ** 2, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(spread > 0, (mood[ends] - means) / spread, 0.0)
+    enough = counts >= MIN_ENTRIES_FOR_FLAGS
+    anomalies = enough & (np.abs(z) >= ANOMALY_Z)
+    declining = enough & (slopes <= DECLINE_PER_WEEK)
+    volatile = enough & (volatility >= VOLATILITY_LIMIT)
+
+    summaries = {}
+    for i, user_id in enumerate(user_ids[starts].tolist()):
+        if declining[i] or (anomalies[i] and z[i] < 0):
+            status = 'AT RISK'
+        elif volatile[i] or anomalies[i]:
+            status = 'WATCH'
+        else:
+            status = 'HEALTHY'
+        latest = scores[ends[i]]
+        summaries[user_id] = {
+            'entries': int(counts[i]),
+            'last_checkin': datetime.datetime.fromtimestamp(times[ends[i]], tz=datetime.timezone.utc),
+            'latest_mood': int(latest[MOOD]),
+            'latest_energy': int(latest[ENERGY]),
+            'latest_stress': int(latest[STRESS]),
+            'mood_avg': round(float(averages[i, MOOD]), 1),
+            'energy_avg': round(float(averages[i, ENERGY]), 1),
+            'stress_avg': round(float(averages[i, STRESS]), 1),
+            'mood_trend': round(float(slopes[i]), 2),
+            'volatility': round(float(volatility[i]), 2),
+            'anomaly': bool(anomalies[i]),
+            'status': status,
+        }
+    return summaries
+
+
+def _empty_summary():
+    return {'entries': 0, 'status': 'NO DATA'}
+
+
+def caseload_summary(student_ids, days=HISTORY_DAYS):
+    """
+    {student_id: summary} for a therapist's caseload from one values_list query over the last
+    `days` days. Students without check-ins in that span get a 'NO DATA' summary.
+    """
+    student_ids = list(student_ids)
+    rows = list(
+        MoodEntry.objects.filter(user_id__in=student_ids, created_at__gte=timezone.now() - datetime.timedelta(days=days))
+        .order_by('user_id', 'created_at', 'id')
+        .values_list('user_id', 'created_at', *SCORE_FIELDS)
+    )
+    summaries = _summaries(*_columns(rows))
+    return {student_id: summaries.get(student_id, _empty_summary()) for student_id in student_ids}
+
+
+def caseload_overview(summaries):
+    """Caseload-wide figures for the insights header, from caseload_summary() output."""
+    active = [s for s in summaries.values() if s['entries']]
+    return {
+        'students_with_data': len(active),
+        'avg_mood': round(float(np.mean([s['mood_avg'] for s in active])), 1) if active else None,
+        'avg_energy': round(float(np.mean([s['energy_avg'] for s in active])), 1) if active else None,
+        'at_risk': sum(1 for s in active if s['status'] == 'AT RISK'),
+        'watch': sum(1 for s in active if s['status'] == 'WATCH'),
+    }
+
+
+def student_trend(student_id, limit=30):
+    """
+    A student's last `limit` check-ins, oldest first, each with its moving average, plus the
+    summary for that series. One query.
+    """
+    rows = list(
+        MoodEntry.objects.filter(user_id=student_id).order_by('-created_at', '-id')
+        .values_list('user_id', 'created_at', *SCORE_FIELDS)[:limit]
+    )[::-1]
+    user_ids, times, scores = _columns(rows)
+    mood_avg = rolling_mean(scores[:, MOOD]) if rows else []
+    points = [
+        {
+            'created_at': row[1],
+            'mood_score': row[2],
+            'energy_score': row[3],
+            'stress_score': row[4],
+            'mood_avg': round(float(avg), 1),
+        }
+        for row, avg in zip(rows, mood_avg)
+    ]
+    summary = _summaries(user_ids, times, scores).get(student_id, _empty_summary())
+    return {'points': points, 'summary': summary}
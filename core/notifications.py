@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AlertDelivery, CrisisAlert
+from .stats import alerts_assigned
+
+
+def alert_recipients(student_id):
+    """Therapists actively connected to the student plus all admins, resolved in one query."""
+    return list(
+        User.objects.filter(
+            Q(profile__role='ADMIN')
+            | Q(profile__role='THERAPIST', student_connections__student_id=student_id, student_connections__status='ACTIVE'),
+            is_active=True,
+        ).distinct().values_list('id', flat=True)
+    )
+
+
+def fan_out_alert(alert_id):
+    """Creates one in-app delivery per recipient. Safe to re-run: existing deliveries are kept."""
+    alert = CrisisAlert.objects.filter(id=alert_id).only('id', 'student_id', 'is_resolved').first()
+    if alert is None:
+        return 0
+    already = set(AlertDelivery.objects.filter(alert_id=alert.id).values_list('recipient_id', flat=True))
+    recipient_ids = [recipient_id for recipient_id in alert_recipients(alert.student_id) if recipient_id not in already]
+    AlertDelivery.objects.bulk_create(
+        [AlertDelivery(alert_id=alert.id, recipient_id=recipient_id) for recipient_id in recipient_ids],
+        ignore_conflicts=True,
+    )
+    if not alert.is_resolved:
+        alerts_assigned(recipient_ids)
+    return len(recipient_ids)
+
+
+def deliver_open_alerts(student_id, therapist_id):
+    """
+    Backfills deliveries when a therapist connects: the student's unresolved alerts fired before the
+    connection existed, so fan-out never reached this therapist. Safe to re-run.
+    """
+    alert_ids = list(
+        CrisisAlert.objects.filter(student_id=student_id, is_resolved=False)
+        .exclude(deliveries__recipient_id=therapist_id).values_list('id', flat=True)
+    )
+    AlertDelivery.objects.bulk_create(
+        [AlertDelivery(alert_id=alert_id, recipient_id=therapist_id) for alert_id in alert_ids],
+        ignore_conflicts=True,
+    )
+    if alert_ids:
+        alerts_assigned([therapist_id], count=len(alert_ids))
+    return len(alert_ids)
+
+
+def mark_alerts_seen(user):
+    now = timezone.now()
+    AlertDelivery.objects.filter(recipient=user, seen_at__isnull=True).update(
+        seen_at=now, delivered_at=Coalesce('delivered_at', Value(now))
+    )
+
+
+def next_deliveries(user, after_id=0, limit=20):
+    """
+    Deliveries for the live stream: anything newer than the client's Last-Event-ID, plus older
+    ones that were never pushed (the recipient was offline when the alert fired).
+    """
+    rows = list(
+        AlertDelivery.objects.filter(recipient=user, alert__is_resolved=False)
+        .filter(Q(id__gt=after_id) | Q(delivered_at__isnull=True, seen_at__isnull=True))
+        .select_related('alert__student')
+        .order_by('id')[:limit]
+    )
+    if rows:
+        AlertDelivery.objects.filter(id__in=[row.id for row in rows], delivered_at__isnull=True).update(delivered_at=timezone.now())
+    return [
+        {
+            'id': row.id,
+            'alert_id': row.alert_id,
+            'student': row.alert.student.username,
+            'message': row.alert.message[:200],
+            'created_at': row.alert.created_at.isoformat(),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,70 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PER_PAGE = 20
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (datetime, pk), or None for a missing or tampered cursor (which means: first page)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        value = parse_datetime(value)
+        return (value, int(pk)) if value is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_filter(queryset, cursor=None, field='created_at'):
+    """`queryset` newest first by (field, id), starting after the cursor's row."""
+    queryset = queryset.order_by(f'-{field}', '-id')
+    position = decode_cursor(cursor)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    return queryset
+
+
+def keyset_page(items, per_page=DEFAULT_PER_PAGE, field='created_at'):
+    """Builds the page from up to per_page + 1 rows in keyset order; the extra row only signals a next page."""
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.id)
+    return KeysetPage(items, next_cursor)
+
+
+def keyset_paginate(queryset, cursor=None, per_page=DEFAULT_PER_PAGE, field='created_at'):
+    """
+    Newest-first page of `queryset` ordered by (field, id). Unlike OFFSET, the cursor turns into
+    a range condition on the index, so page 500 costs the same as page 1.
+    """
+    items = list(keyset_filter(queryset, cursor, field)[:per_page + 1])
+    return keyset_page(items, per_page, field)
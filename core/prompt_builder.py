@@ -0,0 +1,64 @@
+import math
+import re
+
+from django.conf import settings
+
+DEFAULT_BUDGETS = {
+    'get_reflection': {'CONTENT': 600, 'HISTORY': 400, 'PER_ENTRY': 150, 'SUMMARY': 200},
+    'get_breakthrough_analysis': {'HISTORY': 1500, 'PER_ENTRY': 250, 'SUMMARY': 300},
+    'update_summary': {'PER_ENTRY': 250, 'SUMMARY': 300},
+}
+
+
+def estimate_tokens(text):
+    """Rough Gemini token estimate (~4 tokens per 3 words); good enough for budgeting."""
+    return max(1, math.ceil(len((text or '').split()) * 4 / 3)) if text else 0
+
+
+def budget(method, part):
+    configured = getattr(settings, 'AI_PROMPT_BUDGETS', {}).get(method, {})
+    return configured.get(part, DEFAULT_BUDGETS.get(method, {}).get(part, 0))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Keeps the beginning of the text within max_tokens, cutting on a word boundary."""
+    text = (text or '').strip()
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    keep = max(1, max_tokens * 3 // 4 - 1)  # one word of the budget goes to the ellipsis
+    return ' '.join(words[:keep]) + ' …'
+
+
+def fit_history(entries, total_tokens, per_entry_tokens):
+    """
+    Takes entries newest-first, caps each one at per_entry_tokens and stops once the
+    total budget is spent, so history size is bounded however much a user writes.
+    """
+    fitted = []
+    spent = 0
+    for entry in entries:
+        text = truncate_to_tokens(entry, per_entry_tokens)
+        cost = estimate_tokens(text)
+        if fitted and spent + cost > total_tokens:
+            break
+        fitted.append(text)
+        spent += cost
+    return fitted
+
+
+def first_sentence(text):
+    match = re.match(r'\s*(.+?[.!?])(\s|$)', text or '', re.S)
+    return (match.group(1) if match else (text or '')).strip()
+
+
+def extractive_summary(previous, new_entries, max_tokens):
+    """
+    Fallback summary used when the model is unavailable: appends the first sentence of each
+    new entry and drops the oldest sentences once the budget is exceeded.
+    """
+    sentences = [s for s in (previous or '').split('\n') if s.strip()]
+    sentences += [truncate_to_tokens(first_sentence(entry), 40) for entry in new_entries if entry.strip()]
+    while len(sentences) > 1 and estimate_tokens('\n'.join(sentences)) > max_tokens:
+        sentences.pop(0)
+    return '\n'.join(sentences)
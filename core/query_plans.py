@@ -0,0 +1,86 @@
+import json
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    AIJob, AlertDelivery, Appointment, ChatMessage, Conversation, CrisisAlert, JournalEntry, MoodEntry, Resource, Task,
+    TherapistConnection,
+)
+
+# Placeholder ids: the plan depends on the query shape, not on whether the rows exist.
+USER_ID, OTHER_ID = 1, 2
+
+
+def _hot_queries():
+    """The app's hot query shapes, as the views and jobs issue them. Keep this in step with new access paths."""
+    return {
+        'latest_mood': MoodEntry.objects.filter(user_id=USER_ID).order_by('-created_at')[:1],
+        'recent_journals': JournalEntry.objects.filter(user_id=USER_ID).order_by('-created_at')[:5],
+        'journal_page': JournalEntry.objects.filter(user_id=USER_ID).order_by('-created_at', '-id')[:21],
+        'open_tasks': Task.objects.filter(user_id=USER_ID, is_completed=False),
+        'therapist_students': TherapistConnection.objects.filter(therapist_id=USER_ID, status='ACTIVE'),
+        'student_therapists': TherapistConnection.objects.filter(student_id=USER_ID, status='ACTIVE'),
+        'students_open_alerts': CrisisAlert.objects.filter(student_id__in=[USER_ID, OTHER_ID], is_resolved=False).order_by('-created_at'),
+        'alert_history_page': CrisisAlert.objects.order_by('-created_at', '-id')[:21],
+        'resource_page': Resource.objects.order_by('-created_at', '-id')[:21],
+        'platform_open_alerts': CrisisAlert.objects.filter(is_resolved=False).order_by('-created_at')[:10],
+        'chat_thread': ChatMessage.objects.filter(
+            Q(sender_id=USER_ID, receiver_id=OTHER_ID) | Q(sender_id=OTHER_ID, receiver_id=USER_ID)
+        ).order_by('created_at'),
+        'chat_window': ChatMessage.objects.filter(sender_id=USER_ID, receiver_id=OTHER_ID).order_by('-created_at', '-id')[:51],
+        'chat_unread': ChatMessage.objects.filter(sender_id=OTHER_ID, receiver_id=USER_ID, is_read=False),
+        'chat_inbox': Conversation.objects.filter(Q(user_low_id=USER_ID) | Q(user_high_id=USER_ID)).order_by('-last_message_at'),
+        'pending_appointments': Appointment.objects.filter(therapist_id=USER_ID, status='PENDING'),
+        'alert_inbox': AlertDelivery.objects.filter(recipient_id=USER_ID, seen_at__isnull=True),
+        'job_claim': AIJob.objects.filter(status='PENDING', run_after__lte=timezone.now()).order_by('run_after', 'id')[:10],
+    }
+
+
+def _sqlite_full_scans(queryset):
+    plan = queryset.explain()
+    # "SCAN core_x" walks the whole table; "SCAN core_x USING (COVERING) INDEX" or "SEARCH" do not
+    scans = re.findall(r'SCAN (\w+)\b(?! USING)', plan)
+    return plan, [table for table in scans if not table.startswith('sqlite_')]
+
+
+def _postgres_full_scans(queryset):
+    # Tiny dev tables make Seq Scan the cheapest plan, so ask which plan exists when it is discouraged
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain(format='json')
+    tables = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            tables.append(node.get('Relation Name'))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    for entry in json.loads(plan):
+        walk(entry['Plan'])
+    return plan, tables
+
+
+EXPLAINERS = {
+    'sqlite': _sqlite_full_scans,
+    'postgresql': _postgres_full_scans,
+}
+
+
+def check_query_plans():
+    """
+    Returns [(name, full_scan_tables, plan)] for every registered hot query, or None when there
+    is no plan checker for the database vendor.
+    """
+    explain = EXPLAINERS.get(connection.vendor)
+    if explain is None:
+        return None
+    results = []
+    for name, queryset in _hot_queries().items():
+        plan, full_scans = explain(queryset)
+        results.append((name, full_scans, plan))
+    return results
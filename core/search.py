@@ -0,0 +1,109 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Resource
+
+FTS_TABLE = 'core_resource_fts'
+RESULT_LIMIT = 50
+# Snippet highlight markers: control characters can't come from stored text, so they survive escaping
+HIT_START, HIT_END = '\x02', '\x03'
+TITLE_WEIGHT = 10.0
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _terms(query):
+    return _WORD.findall(query or '')[:8]
+
+
+def _highlight(snippet):
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(HIT_START, '<mark>').replace(HIT_END, '</mark>')
+    return mark_safe(html)
+
+
+def _sqlite_search(terms, category_slug, resource_type, limit):
+    # Quoted prefix terms: user input can't inject FTS5 syntax, and partial words match while typing
+    match = ' '.join('"%s"*' % term for term in terms)
+    sql = [
+        f"SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, '…', 24) FROM {FTS_TABLE}",
+        f"WHERE {FTS_TABLE} MATCH %s",
+    ]
+    params = [HIT_START, HIT_END, match]
+    if resource_type:
+        sql.append('AND resource_type = %s')
+        params.append(resource_type)
+    if category_slug:
+        sql.append('AND category_id IN (SELECT id FROM core_category WHERE slug = %s)')
+        params.append(category_slug)
+    sql.append(f'ORDER BY bm25({FTS_TABLE}, %s, 1.0) LIMIT %s')
+    params += [TITLE_WEIGHT, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return cursor.fetchall()
+
+
+def _postgres_search(terms, category_slug, resource_type, limit):
+    tsquery = ' & '.join("'%s':*" % term for term in terms)
+    # Must match the expression index created in 0020_resource_search_index
+    document = (
+        "setweight(to_tsvector('english', coalesce(r.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(r.content, '')), 'B')"
+    )
+    sql = [
+        "SELECT r.id, ts_headline('english', coalesce(r.content, ''), q, %s)",
+        f"FROM core_resource r, to_tsquery('english', %s) q WHERE ({document}) @@ q",
+    ]
+    params = [f'StartSel={HIT_START}, StopSel={HIT_END}, MaxWords=24, MinWords=8', tsquery]
+    if resource_type:
+        sql.append('AND r.resource_type = %s')
+        params.append(resource_type)
+    if category_slug:
+        sql.append('AND r.category_id IN (SELECT id FROM core_category WHERE slug = %s)')
+        params.append(category_slug)
+    sql.append(f'ORDER BY ts_rank_cd({document}, q) DESC, r.id DESC LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return cursor.fetchall()
+
+
+def _fallback_search(terms, category_slug, resource_type, limit):
+    resources = Resource.objects.all()
+    for term in terms:
+        resources = resources.filter(Q(title__icontains=term) | Q(content__icontains=term))
+    if category_slug:
+        resources = resources.filter(category__slug=category_slug)
+    if resource_type:
+        resources = resources.filter(resource_type=resource_type)
+    return [(pk, '') for pk in resources.order_by('-created_at').values_list('id', flat=True)[:limit]]
+
+
+def search_resources(query, category_slug=None, resource_type=None, limit=RESULT_LIMIT):
+    """
+    Ranked full-text search over resource titles and content, filtered inside the index query.
+    Each result carries a `snippet` with the matches wrapped in <mark>.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+    if connection.vendor == 'sqlite':
+        search = _sqlite_search
+    elif connection.vendor == 'postgresql':
+        search = _postgres_search
+    else:
+        search = _fallback_search
+    hits = search(terms, category_slug, resource_type, limit)
+    resources = Resource.objects.select_related('category').in_bulk([pk for pk, _ in hits])
+    results = []
+    for pk, snippet in hits:
+        resource = resources.get(pk)
+        if resource is not None:
+            resource.snippet = _highlight(snippet)
+            results.append(resource)
+    return results
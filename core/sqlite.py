@@ -0,0 +1,49 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Applied to every new SQLite connection unless settings.SQLITE_PRAGMAS overrides them.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block the writer (and vice versa)
+    'synchronous': 'NORMAL',  # safe with WAL; fsync at checkpoints instead of every commit
+    'busy_timeout': 5000,  # ms to wait for the write lock before "database is locked"
+    'mmap_size': 134217728,  # 128 MiB of the file read through the page cache
+    'cache_size': -20000,  # negative = KiB, so ~20 MB page cache per connection
+    'temp_store': 'MEMORY',
+}
+
+_SAFE = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+
+def get_pragmas():
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return pragmas
+
+
+def apply_pragmas(connection):
+    with connection.cursor() as cursor:
+        for name, value in get_pragmas().items():
+            if value is None:
+                continue
+            if not _SAFE.match(name) or not _SAFE.match(str(value)):
+                raise ValueError(f"Refusing unsafe SQLite pragma {name}={value!r}")
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created hook: tunes each new SQLite connection for concurrent gunicorn workers."""
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        apply_pragmas(connection)
+    except Exception as e:
+        logger.error(f"Could not apply SQLite pragmas: {str(e)}")
+
+
+def connect_signals():
+    connection_created.connect(configure_sqlite, dispatch_uid='core.sqlite.configure_sqlite')
@@ -0,0 +1,144 @@
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .ai_service import REFLECTION_FALLBACK, REFLECTION_UNAVAILABLE
+from .db_router import primary_reads
+from .models import AlertDelivery, Appointment, CrisisAlert, JournalEntry, MoodEntry, UserStats
+
+# Canned text older journal jobs saved when Gemini failed; it is not a reflection and is never counted as one
+CANNED_REFLECTIONS = (REFLECTION_FALLBACK, REFLECTION_UNAVAILABLE)
+
+
+@primary_reads()
+def rebuild_user_stats(user_id):
+    """Recounts one user's stats row from the source tables, read on the primary."""
+    journals = JournalEntry.objects.filter(user_id=user_id)
+    moods = MoodEntry.objects.filter(user_id=user_id)
+    last_journal = journals.order_by('-created_at').values_list('created_at', flat=True).first()
+    last_mood = moods.order_by('-created_at').values_list('created_at', flat=True).first()
+    values = {
+        'journal_count': journals.count(),
+        'mood_count': moods.count(),
+        'reflection_count': journals.filter(_with_reflection()).count(),
+        'last_journal_at': last_journal,
+        'last_mood_at': last_mood,
+        'last_active_at': max([t for t in (last_journal, last_mood) if t], default=None),
+        'open_alert_count': CrisisAlert.objects.filter(student_id=user_id, is_resolved=False).count(),
+        'assigned_alert_count': AlertDelivery.objects.filter(recipient_id=user_id, alert__is_resolved=False).count(),
+        'pending_appointment_count': Appointment.objects.filter(therapist_id=user_id, status='PENDING').count(),
+    }
+    row, _ = UserStats.objects.update_or_create(user_id=user_id, defaults=values)
+    return row
+
+
+def _with_reflection():
+    return ~Q(ai_reflection__isnull=True) & ~Q(ai_reflection='') & ~Q(ai_reflection__in=CANNED_REFLECTIONS)
+
+
+def _counts_as_reflection(entry):
+    return bool(entry.ai_reflection) and entry.ai_reflection not in CANNED_REFLECTIONS
+
+
+def stats_for(user):
+    """The user's stats row; counted from scratch the first time it is needed."""
+    return UserStats.objects.filter(user=user).first() or rebuild_user_stats(user.id)
+
+
+def _add(field, amount):
+    if amount >= 0:
+        return F(field) + amount
+    return Greatest(F(field) + amount, Value(0))
+
+
+def _apply(user_ids, heal=True, **deltas):
+    """
+    Adds deltas to the users' rows in one UPDATE. Users without a row yet get one counted from
+    source instead (heal=False on deletes, where the user itself may be mid-cascade).
+    """
+    user_ids = set(user_ids)
+    if not user_ids or not deltas:
+        return
+    updates = {}
+    for field, value in deltas.items():
+        if field.startswith('last_'):
+            updates[field] = Greatest(Coalesce(F(field), Value(value)), Value(value))
+        else:
+            updates[field] = _add(field, value)
+    updated = UserStats.objects.filter(user_id__in=user_ids).update(**updates)
+    if heal and updated < len(user_ids):
+        existing = set(UserStats.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        for user_id in user_ids - existing:
+            rebuild_user_stats(user_id)
+
+
+def remember_previous(instance):
+    """pre_save hook: keeps the stored state so post_save can tell what changed."""
+    if instance.pk is None:
+        instance._previous = None
+    elif isinstance(instance, CrisisAlert):
+        instance._previous = CrisisAlert.objects.filter(pk=instance.pk).values_list('is_resolved', flat=True).first()
+    elif isinstance(instance, Appointment):
+        instance._previous = Appointment.objects.filter(pk=instance.pk).values('status', 'therapist_id').first()
+
+
+def entry_created(instance):
+    field = 'journal_count' if isinstance(instance, JournalEntry) else 'mood_count'
+    last_field = 'last_journal_at' if isinstance(instance, JournalEntry) else 'last_mood_at'
+    deltas = {field: 1, last_field: instance.created_at, 'last_active_at': instance.created_at}
+    if isinstance(instance, JournalEntry) and _counts_as_reflection(instance):
+        deltas['reflection_count'] = 1
+    _apply([instance.user_id], **deltas)
+
+
+def entry_deleted(instance):
+    if isinstance(instance, JournalEntry):
+        deltas = {'journal_count': -1}
+        if _counts_as_reflection(instance):
+            deltas['reflection_count'] = -1
+    else:
+        deltas = {'mood_count': -1}
+    _apply([instance.user_id], heal=False, **deltas)
+
+
+def reflection_added(user_id):
+    _apply([user_id], reflection_count=1)
+
+
+def alerts_assigned(recipient_ids, count=1):
+    """Called after fan-out creates deliveries for still-unresolved alerts (`count` of them per recipient)."""
+    _apply(recipient_ids, assigned_alert_count=count)
+
+
+def _alert_open_changed(alert, delta, heal=True):
+    recipients = AlertDelivery.objects.filter(alert_id=alert.id).values_list('recipient_id', flat=True)
+    _apply([alert.student_id], heal=heal, open_alert_count=delta)
+    _apply(recipients, heal=heal, assigned_alert_count=delta)
+
+
+def alert_saved(alert, created):
+    previous = getattr(alert, '_previous', None)
+    if created:
+        if not alert.is_resolved:
+            _apply([alert.student_id], open_alert_count=1)
+    elif previous is not None and previous != alert.is_resolved:
+        _alert_open_changed(alert, -1 if alert.is_resolved else 1)
+
+
+def alert_deleted(alert):
+    if not alert.is_resolved:
+        _alert_open_changed(alert, -1, heal=False)
+
+
+def appointment_saved(appointment, created):
+    previous = getattr(appointment, '_previous', None)
+    was_pending = previous is not None and previous['status'] == 'PENDING'
+    if was_pending and (appointment.status != 'PENDING' or previous['therapist_id'] != appointment.therapist_id):
+        _apply([previous['therapist_id']], pending_appointment_count=-1)
+        was_pending = False
+    if appointment.status == 'PENDING' and (created or not was_pending):
+        _apply([appointment.therapist_id], pending_appointment_count=1)
+
+
+def appointment_deleted(appointment):
+    if appointment.status == 'PENDING':
+        _apply([appointment.therapist_id], heal=False, pending_appointment_count=-1)
@@ -0,0 +1,43 @@
+from django.db.models import Case, Value, When
+
+from .models import MoodEntry, Task
+
+# Open tasks needing at most this much more energy than the student last reported are suggested first
+SUGGESTION_MARGIN = 2
+COMPLETED_LIMIT = 10
+DEFAULT_ENERGY = 5
+
+
+def current_energy(user):
+    energy = MoodEntry.objects.filter(user=user).order_by('-created_at').values_list('energy_score', flat=True).first()
+    return DEFAULT_ENERGY if energy is None else energy
+
+
+def open_tasks(user):
+    return list(Task.objects.filter(user=user, is_completed=False).order_by('created_at', 'id'))
+
+
+def task_board(user, completed_limit=COMPLETED_LIMIT):
+    """
+    The tasks page in three queries however many tasks there are: energy, open tasks (split into
+    suggested/other in memory) and the most recent completed ones, capped.
+    """
+    energy = current_energy(user)
+    tasks = open_tasks(user)
+    suggested = [task for task in tasks if task.energy_level_required <= energy + SUGGESTION_MARGIN]
+    suggested_ids = {task.id for task in suggested}
+    return {
+        'energy_level': energy,
+        'suggested_tasks': suggested,
+        'other_tasks': [task for task in tasks if task.id not in suggested_ids],
+        'completed_tasks': list(
+            Task.objects.filter(user=user, is_completed=True).order_by('-created_at', '-id')[:completed_limit]
+        ),
+    }
+
+
+def toggle_task(user, task_id):
+    """Flips is_completed in one UPDATE, with no read-modify-write for concurrent toggles to lose. Returns rows changed."""
+    return Task.objects.filter(id=task_id, user=user).update(
+        is_completed=Case(When(is_completed=True, then=Value(False)), default=Value(True))
+    )
@@ -1,3 +1,1249 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import importlib
+import io
+import json
+import tempfile
+import time
+import weakref
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from google import genai
+from google.genai import types
+
+from .ai_backends import FAKE_BREAKTHROUGHS, FAKE_REFLECTIONS, FAKE_SUGGESTIONS, FakeBackendError, FakeClient, build_client
+from .ai_cache import LocMemBackend, ResponseCache, make_key
+from .ai_resilience import AIUnavailable, CircuitBreaker, Resilience
+from .ai_service import REFLECTION_FALLBACK, REFLECTION_UNAVAILABLE, ai_service
+from .ai_telemetry import TelemetryRecorder, _flush_at_exit, summarize
+from .models import (
+    AICallBucket, AIJob, AlertDelivery, Appointment, Category, ChatMessage, CrisisAlert, DailyMetrics, DashboardInsight, JournalEntry, MoodEntry, Resource,
+    Task, TherapistConnection, UserStats,
+)
+from .chat import inbox as chat_inbox, mark_read, messages_since, send_message
+from .chat_ws import chat_socket
+from .crisis import detector, scan_text
+from .db_router import PIN_COOKIE, PrimaryPinMiddleware, PrimaryReplicaRouter, primary_reads, replica_reads
+from .insights import journal_signature, refresh_breakthrough, refresh_dashboard_insight, students_needing_breakthrough, update_rolling_summary
+from .metrics import admin_dashboard_metrics, rebuild_day, record_activity, record_signup
+from .jobs import HANDLERS, claim_and_run, claim_next, enqueue, release_stale_locks
+from .notifications import fan_out_alert
+from .mood_analytics import caseload_summary, student_trend
+from .pagination import keyset_paginate
+from .prompt_builder import estimate_tokens, extractive_summary, fit_history, truncate_to_tokens
+from .search import search_resources
+from .stats import rebuild_user_stats, stats_for
+from .task_board import COMPLETED_LIMIT, task_board, toggle_task
+
+
+def make_user(username, role='STUDENT'):
+    user = User.objects.create_user(username)
+    user.profile.role = role
+    user.profile.save()
+    return user
+
+
+def ai_backend(**options):
+    """Points the shared AIService at a fresh fake backend and breaker, uncached, for the duration of a test."""
+    return mock.patch.multiple(
+        ai_service, client=FakeClient(**options), resilience=Resilience(),
+        cache=ResponseCache(LocMemBackend(), enabled=False),
+    )
+
+
+class QueryBudgetMixin:
+    """
+    Guards list views against N+1 regressions: seeds rows in steps and asserts the view's
+    query count stays the same however many rows it renders.
+    """
+    budget_sizes = (3, 12)
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, f"GET {url} returned {response.status_code}")
+        return len(ctx)
+
+    def assertConstantQueries(self, client, url, seed):
+        """seed(n) must add n more of the rows the view lists."""
+        client.get(url)  # warm-up: sessions and first-use rows (daily metrics, user stats)
+        counts = []
+        seeded = 0
+        for size in self.budget_sizes:
+            seed(size - seeded, seeded)
+            seeded = size
+            counts.append(self.count_queries(client, url))
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"{url} issued {counts} queries for {list(self.budget_sizes)} rows; expected a fixed count",
+        )
+
+
+class AdminListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', 'ADMIN')
+        self.client.force_login(self.admin)
+
+    def seed_students_with_alerts(self, n, offset):
+        for i in range(offset, offset + n):
+            CrisisAlert.objects.create(student=make_user(f'student{i}'), message='alert')
+
+    def test_dashboard(self):
+        self.assertConstantQueries(self.client, '/', self.seed_students_with_alerts)
+
+    def test_user_management(self):
+        self.assertConstantQueries(self.client, '/admin-users/', self.seed_students_with_alerts)
+
+    def test_moderation(self):
+        self.assertConstantQueries(self.client, '/admin-moderation/', self.seed_students_with_alerts)
+
+    def test_security(self):
+        self.assertConstantQueries(self.client, '/admin-security/', self.seed_students_with_alerts)
+
+    def test_cms(self):
+        def seed(n, offset):
+            for i in range(offset, offset + n):
+                category = Category.objects.create(name=f'Category {i}', slug=f'category-{i}')
+                Resource.objects.create(title=f'Resource {i}', resource_type='ARTICLE', category=category, content='text')
+
+        self.assertConstantQueries(self.client, '/admin-cms/', seed)
+
+
+class TherapistListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.therapist = make_user('therapist', 'THERAPIST')
+        self.client.force_login(self.therapist)
+
+    def seed_connected_students(self, n, offset):
+        for i in range(offset, offset + n):
+            student = make_user(f'student{i}')
+            TherapistConnection.objects.create(student=student, therapist=self.therapist)
+            CrisisAlert.objects.create(student=student, message='alert')
+            Appointment.objects.create(student=student, therapist=self.therapist, scheduled_at=timezone.now())
+            ChatMessage.objects.create(sender=student, receiver=self.therapist, content='hello')
+
+    def test_dashboard(self):
+        self.assertConstantQueries(self.client, '/', self.seed_connected_students)
+
+    def test_insights(self):
+        self.assertConstantQueries(self.client, '/therapist/insights/', self.seed_connected_students)
+
+    def test_crisis(self):
+        self.assertConstantQueries(self.client, '/therapist/crisis/', self.seed_connected_students)
+
+    def test_appointments(self):
+        self.assertConstantQueries(self.client, '/therapist/appointments/', self.seed_connected_students)
+
+    def test_messages_list(self):
+        self.assertConstantQueries(self.client, '/messages/', self.seed_connected_students)
+
+
+class StudentListQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.client.force_login(self.student)
+
+    def test_find_therapist(self):
+        def seed(n, offset):
+            for i in range(offset, offset + n):
+                make_user(f'therapist{i}', 'THERAPIST')
+
+        self.assertConstantQueries(self.client, '/find-therapist/', seed)
+
+    def test_messages_list(self):
+        def seed(n, offset):
+            for i in range(offset, offset + n):
+                ChatMessage.objects.create(sender=make_user(f'peer{i}', 'THERAPIST'), receiver=self.student, content='hi')
+
+        self.assertConstantQueries(self.client, '/messages/', seed)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.client.force_login(self.student)
+
+    def test_pages_cover_every_row_once(self):
+        # Shared timestamps force the id tiebreak to do its job
+        stamp = timezone.now()
+        entries = [JournalEntry.objects.create(user=self.student, content=f'entry {i}', created_at=stamp) for i in range(7)]
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(JournalEntry.objects.filter(user=self.student), cursor, per_page=3)
+            seen.extend(entry.id for entry in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, sorted((e.id for e in entries), reverse=True))
+
+    def test_bad_cursor_starts_over(self):
+        JournalEntry.objects.create(user=self.student, content='entry')
+        self.assertEqual(len(keyset_paginate(JournalEntry.objects.all(), 'not-a-cursor')), 1)
+
+    def test_fragment_holds_only_the_next_rows(self):
+        for i in range(25):
+            JournalEntry.objects.create(user=self.student, content=f'entry {i}', ai_reflection='ok')
+        first = self.client.get('/journal/')
+        cursor = first.context['journals'].next_cursor
+        fragment = self.client.get('/journal/', {'cursor': cursor, 'fragment': 1})
+        self.assertNotContains(fragment, '<html')
+        self.assertEqual(len(fragment.context['journals']), 5)
+        self.assertFalse(fragment.context['journals'].has_next)
+
+    def test_insight_box_shows_the_newest_reflection(self):
+        for i in range(25):
+            JournalEntry.objects.create(user=self.student, content=f'entry {i}', ai_reflection=f'stored reflection {i}')
+        first = self.client.get('/journal/')
+        self.assertContains(first, '"stored reflection 24"')
+        self.assertNotContains(first, 'AI service is currently unavailable')
+        later = self.client.get('/journal/', {'cursor': first.context['journals'].next_cursor})
+        self.assertContains(later, '"stored reflection 24"')
+
+    def test_insight_box_waits_for_a_pending_reflection(self):
+        entry = JournalEntry.objects.create(user=self.student, content='just written')
+        response = self.client.get('/journal/')
+        self.assertContains(response, f'data-entry-id="{entry.id}">Your AI Mentor is reflecting&hellip;</span>')
+
+    def test_member_filters_apply_before_paging(self):
+        self.client.force_login(make_user('admin', 'ADMIN'))
+        for i in range(25):
+            make_user(f'pupil{i}')
+        for i in range(3):
+            make_user(f'counsellor{i}', 'THERAPIST')
+
+        therapists = self.client.get('/admin-users/', {'role': 'THERAPIST'})
+        self.assertEqual({u.username for u in therapists.context['users']}, {'counsellor0', 'counsellor1', 'counsellor2'})
+
+        searched = self.client.get('/admin-users/', {'q': 'PUPIL1'})
+        self.assertEqual(len(searched.context['users']), 11)  # pupil1, pupil10-19
+
+        students = self.client.get('/admin-users/', {'role': 'STUDENT'})
+        page = students.context['users']
+        self.assertEqual(len(page), 20)
+        self.assertContains(students, f'data-next-page="?role=STUDENT&amp;cursor={page.next_cursor}"')
+        rest = self.client.get('/admin-users/', {'role': 'STUDENT', 'cursor': page.next_cursor, 'fragment': 1})
+        # 25 pupils and the student from setUp, no therapists or admins
+        self.assertEqual(len(rest.context['users']), 6)
+        self.assertTrue(all(u.profile.role == 'STUDENT' for u in list(page) + list(rest.context['users'])))
+
+
+class ResourceSearchTests(TestCase):
+    def setUp(self):
+        self.calm = Category.objects.create(name='Calm', slug='calm')
+        self.sleep = Category.objects.create(name='Sleep', slug='sleep')
+        self.titled = Resource.objects.create(title='Breathing basics', resource_type='ARTICLE', category=self.calm, content='A short guide.')
+        self.mentioned = Resource.objects.create(title='Evening routine', resource_type='AUDIO', category=self.sleep, content='Slow breathing before bed helps.')
+
+    def test_title_matches_rank_first_with_prefix_terms(self):
+        results = search_resources('breath')
+        self.assertEqual(results, [self.titled, self.mentioned])
+        self.assertIn('<mark>breathing</mark>', results[1].snippet)
+
+    def test_filters_apply_inside_the_query(self):
+        self.assertEqual(search_resources('breathing', category_slug='sleep'), [self.mentioned])
+        self.assertEqual(search_resources('breathing', resource_type='ARTICLE'), [self.titled])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.mentioned.content = 'Stretch before bed.'
+        self.mentioned.save()
+        self.titled.delete()
+        self.assertEqual(search_resources('breathing'), [])
+        self.assertEqual(search_resources('stretch'), [self.mentioned])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search_resources('breathing" OR (NEAR'), [])
+        self.assertEqual(search_resources('<script>'), [])
+
+
+@override_settings(CHAT={'POLL_INTERVAL': 0.01, 'STREAM_SECONDS': 0.05})
+class ChatTransportTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.therapist = make_user('therapist', 'THERAPIST')
+        self.client.force_login(self.student)
+        self.earlier = ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='earlier')
+
+    def test_live_send_returns_the_message_instead_of_a_redirect(self):
+        response = self.client.post(
+            f'/chat/{self.therapist.id}/', {'content': 'hi'}, headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['content'], 'hi')
+
+    def test_delta_holds_only_newer_messages_and_marks_them_read(self):
+        newer = ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='newer')
+        with CaptureQueriesContext(connection) as ctx:
+            delta = messages_since(self.student.id, self.therapist.id, self.earlier.id)
+        self.assertEqual([m['id'] for m in delta], [newer.id])
+        # The select, then the read flag and unread counter updated in one savepoint: none of it per message
+        self.assertEqual(len(ctx), 5)
+        newer.refresh_from_db()
+        self.earlier.refresh_from_db()
+        self.assertTrue(newer.is_read)
+        self.assertFalse(self.earlier.is_read)
+
+    async def test_stream_resumes_after_last_event_id(self):
+        newer = await ChatMessage.objects.acreate(sender=self.therapist, receiver=self.student, content='newer')
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        response = await client.get(f'/chat/{self.therapist.id}/stream/', headers={'Last-Event-ID': str(self.earlier.id)})
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'id: {newer.id}\n', body)
+        self.assertNotIn(f'id: {self.earlier.id}\n', body)
+
+    def test_failed_crisis_alert_rolls_back_the_message(self):
+        with mock.patch('core.chat.CrisisAlert.objects.create', side_effect=DatabaseError('insert failed')):
+            with self.assertRaises(DatabaseError):
+                send_message(self.student, self.therapist, 'I want to die')
+        self.assertFalse(ChatMessage.objects.filter(content='I want to die').exists())
+        self.assertEqual(chat_inbox(self.student)[0].last_message_id, self.earlier.id)
+
+    def test_wsgi_stream_answers_one_poll(self):
+        newer = ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='newer')
+        response = self.client.get(f'/chat/{self.therapist.id}/stream/', {'since': self.earlier.id})
+        self.assertFalse(response.is_async)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'id: {newer.id}\nevent: message\n', body)
+        self.assertNotIn(f'id: {self.earlier.id}\n', body)
+        self.assertNotIn('keepalive', body)
+
+    async def test_websocket_sends_and_receives(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        inbound = asyncio.Queue()
+        for event in ({'type': 'websocket.connect'}, {'type': 'websocket.receive', 'text': '{"content": "hello"}'}):
+            inbound.put_nowait(event)
+        sent = []
+
+        async def send(event):
+            sent.append(event)
+            if len(sent) == 3:  # accept, the earlier message, then the one just sent
+                inbound.put_nowait({'type': 'websocket.disconnect'})
+
+        scope = {
+            'type': 'websocket', 'path': f'/ws/chat/{self.therapist.id}/', 'query_string': b'',
+            'headers': [(b'cookie', cookie.encode()), (b'host', b'testserver'), (b'origin', b'http://testserver')],
+        }
+        await asyncio.wait_for(chat_socket(scope, inbound.get, send), timeout=5)
+        self.assertEqual(sent[0]['type'], 'websocket.accept')
+        self.assertEqual([json.loads(e['text'])['content'] for e in sent[1:]], ['earlier', 'hello'])
+
+    async def test_websocket_refuses_foreign_origin(self):
+        inbound = asyncio.Queue()
+        inbound.put_nowait({'type': 'websocket.connect'})
+        sent = []
+
+        async def send(event):
+            sent.append(event)
+
+        scope = {
+            'type': 'websocket', 'path': f'/ws/chat/{self.therapist.id}/', 'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'origin', b'https://evil.example')],
+        }
+        await chat_socket(scope, inbound.get, send)
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4403}])
+
+
+class ConversationSummaryTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.therapist = make_user('therapist', 'THERAPIST')
+        self.client.force_login(self.student)
+
+    def test_connection_opens_an_empty_conversation(self):
+        TherapistConnection.objects.create(student=self.student, therapist=self.therapist)
+        [conversation] = chat_inbox(self.student)
+        self.assertEqual((conversation.contact, conversation.unread, conversation.last_message), (self.therapist, 0, None))
+
+    def test_counts_follow_sends_and_reads(self):
+        ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='one')
+        last = ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='two')
+        [conversation] = chat_inbox(self.student)
+        self.assertEqual((conversation.unread, conversation.last_message), (2, last))
+        self.assertEqual(chat_inbox(self.therapist)[0].unread, 0)
+
+        mark_read(self.student.id, self.therapist.id, [last.id])
+        self.assertEqual(chat_inbox(self.student)[0].unread, 1)
+        self.client.get(f'/chat/{self.therapist.id}/')
+        self.assertEqual(chat_inbox(self.student)[0].unread, 0)
+
+    def test_inbox_is_ordered_by_latest_message(self):
+        other = make_user('other', 'THERAPIST')
+        ChatMessage.objects.create(sender=other, receiver=self.student, content='older')
+        ChatMessage.objects.create(sender=self.therapist, receiver=self.student, content='newer')
+        self.assertEqual([c.contact for c in chat_inbox(self.student)], [self.therapist, other])
+
+
+@override_settings(CHAT={'WINDOW': 5})
+class ChatWindowTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.therapist = make_user('therapist', 'THERAPIST')
+        self.client.force_login(self.student)
+        self.sent = []
+        for i in range(8):
+            sender, receiver = (self.therapist, self.student) if i % 2 else (self.student, self.therapist)
+            self.sent.append(ChatMessage.objects.create(sender=sender, receiver=receiver, content=f'm{i}'))
+
+    def test_opens_on_the_latest_window_and_reads_only_that(self):
+        response = self.client.get(f'/chat/{self.therapist.id}/')
+        self.assertEqual([m.content for m in response.context['chat_messages']], ['m3', 'm4', 'm5', 'm6', 'm7'])
+        unread = ChatMessage.objects.filter(receiver=self.student, is_read=False).values_list('content', flat=True)
+        self.assertEqual(sorted(unread), ['m1'])
+        self.assertEqual(chat_inbox(self.student)[0].unread, 1)
+
+    def test_scroll_back_fetches_the_rest(self):
+        cursor = self.client.get(f'/chat/{self.therapist.id}/').context['page'].next_cursor
+        fragment = self.client.get(f'/chat/{self.therapist.id}/', {'cursor': cursor, 'fragment': 1})
+        self.assertEqual([m.content for m in fragment.context['chat_messages']], ['m0', 'm1', 'm2'])
+        self.assertFalse(fragment.context['page'].has_next)
+        self.assertNotContains(fragment, 'next-page')
+
+
+class TaskBoardTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.client.force_login(self.student)
+
+    def seed_tasks(self, n, offset):
+        for i in range(offset, offset + n):
+            Task.objects.create(user=self.student, title=f'task {i}', energy_level_required=i % 10)
+            Task.objects.create(user=self.student, title=f'done {i}', is_completed=True)
+
+    def test_tasks_page(self):
+        self.assertConstantQueries(self.client, '/tasks/', self.seed_tasks)
+
+    def test_focus_timer(self):
+        self.assertConstantQueries(self.client, '/focus-timer/', self.seed_tasks)
+
+    def test_partition_and_completed_cap(self):
+        MoodEntry.objects.create(user=self.student, energy_score=3)
+        self.seed_tasks(12, 0)
+        board = task_board(self.student)
+        self.assertEqual({t.energy_level_required for t in board['suggested_tasks']}, {0, 1, 2, 3, 4, 5})
+        self.assertEqual(len(board['suggested_tasks']) + len(board['other_tasks']), 12)
+        self.assertEqual(len(board['completed_tasks']), COMPLETED_LIMIT)
+
+    def test_toggle_is_one_update_and_owner_only(self):
+        task = Task.objects.create(user=self.student, title='task')
+        other = Task.objects.create(user=make_user('other'), title='not mine')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(toggle_task(self.student, task.id), 1)
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(toggle_task(self.student, other.id), 0)
+        task.refresh_from_db()
+        other.refresh_from_db()
+        self.assertTrue(task.is_completed)
+        self.assertFalse(other.is_completed)
+        toggle_task(self.student, task.id)
+        task.refresh_from_db()
+        self.assertFalse(task.is_completed)
+
+
+class MoodAnalyticsTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.therapist = make_user('therapist', 'THERAPIST')
+        self.start = timezone.now() - datetime.timedelta(days=30)
+
+    def seed_moods(self, student, moods):
+        for day, mood in enumerate(moods):
+            MoodEntry.objects.create(user=student, mood_score=mood, energy_score=5, stress_score=5,
+                                     created_at=self.start + datetime.timedelta(days=day))
+
+    def test_caseload_summaries_from_one_query(self):
+        steady, sinking, silent = make_user('steady'), make_user('sinking'), make_user('silent')
+        self.seed_moods(steady, [6, 7, 6, 7, 6, 7, 6, 7])
+        self.seed_moods(sinking, [9, 8, 8, 7, 6, 5, 4, 3])
+        with CaptureQueriesContext(connection) as ctx:
+            summaries = caseload_summary([steady.id, sinking.id, silent.id])
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(summaries[steady.id]['status'], 'HEALTHY')
+        self.assertEqual(summaries[sinking.id]['status'], 'AT RISK')
+        self.assertEqual(summaries[silent.id]['status'], 'NO DATA')
+        self.assertEqual(summaries[sinking.id]['mood_trend'], -6.0)  # least-squares -0.857 points a day
+        self.assertEqual(summaries[steady.id]['volatility'], 1.0)
+        self.assertEqual(summaries[sinking.id]['mood_avg'], round(sum([8, 8, 7, 6, 5, 4, 3]) / 7, 1))
+
+    def test_sudden_drop_is_flagged(self):
+        student = make_user('student')
+        self.seed_moods(student, [7, 7, 7, 7, 7, 7, 7, 7, 7, 1])
+        summary = caseload_summary([student.id])[student.id]
+        self.assertTrue(summary['anomaly'])
+        self.assertEqual(summary['status'], 'AT RISK')
+
+    def test_student_trend_points_carry_the_moving_average(self):
+        student = make_user('student')
+        self.seed_moods(student, [2, 4, 6])
+        trend = student_trend(student.id)
+        self.assertEqual([p['mood_score'] for p in trend['points']], [2, 4, 6])
+        self.assertEqual([p['mood_avg'] for p in trend['points']], [2.0, 3.0, 4.0])
+        self.assertEqual(trend['summary']['entries'], 3)
+
+    def test_insights_page_cost_does_not_grow_with_the_caseload(self):
+        self.client.force_login(self.therapist)
+
+        def seed(n, offset):
+            for i in range(offset, offset + n):
+                student = make_user(f'student{i}')
+                TherapistConnection.objects.create(student=student, therapist=self.therapist)
+                self.seed_moods(student, [5, 6, 7])
+
+        self.assertConstantQueries(self.client, '/therapist/insights/', seed)
+
+
+class DashboardInsightTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        for i in range(3):
+            JournalEntry.objects.create(user=self.student, content=f'Dashboard entry {i}')
+        DashboardInsight.objects.create(user=self.student, reflection='earlier reflection', breakthrough='earlier breakthrough')
+
+    def test_fallback_keeps_the_last_reflection_and_stays_stale(self):
+        with ai_backend(error_rate=1.0):
+            refresh_dashboard_insight(self.student)
+        insight = DashboardInsight.objects.get(user=self.student)
+        self.assertEqual(insight.reflection, 'earlier reflection')
+        self.assertEqual(insight.breakthrough, 'earlier breakthrough')
+        self.assertEqual(insight.breakthrough_signature, '')
+        self.assertTrue(insight.is_stale)
+
+    def test_answer_is_stored_fresh(self):
+        with ai_backend():
+            refresh_dashboard_insight(self.student)
+        insight = DashboardInsight.objects.get(user=self.student)
+        self.assertIn(insight.reflection, FAKE_REFLECTIONS)
+        self.assertFalse(insight.is_stale)
+
+
+@override_settings(AI_JOBS={'MAX_ATTEMPTS': 2, 'BACKOFF_BASE': 5})
+class AIJobQueueTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+        self.entry = JournalEntry.objects.create(user=self.student, content='Queue entry about a long week')
+
+    def test_failures_back_off_then_dead_letter(self):
+        job = enqueue('always_fails')
+        with mock.patch.dict(HANDLERS, {'always_fails': mock.Mock(side_effect=ValueError('boom'))}):
+            self.assertFalse(claim_and_run(job.id, 'test'))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('PENDING', 1))
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertIsNone(claim_next('test'))  # not due until the backoff passes
+
+            AIJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            self.assertFalse(claim_and_run(job.id, 'test'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('DEAD', 2))
+        self.assertIn('boom', job.last_error)
+
+    def test_fallback_reflection_is_retried_not_saved(self):
+        job = enqueue('journal_reflection', {'entry_id': self.entry.id})
+        with ai_backend(error_rate=1.0):
+            claim_and_run(job.id, 'test')
+        job.refresh_from_db()
+        self.entry.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertIsNone(self.entry.ai_reflection)
+
+        AIJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        with ai_backend():
+            self.assertTrue(claim_and_run(job.id, 'test'))
+        self.entry.refresh_from_db()
+        self.assertIn(self.entry.ai_reflection, FAKE_REFLECTIONS)
+
+    def test_unconfigured_client_is_final_not_retried(self):
+        job = enqueue('journal_reflection', {'entry_id': self.entry.id})
+        with mock.patch.object(ai_service, 'client', None):
+            self.assertTrue(claim_and_run(job.id, 'test'))
+        job.refresh_from_db()
+        self.entry.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('DONE', 1))
+        self.assertEqual(self.entry.ai_reflection, REFLECTION_UNAVAILABLE)
+
+    def test_priority_kinds_are_claimed_first(self):
+        enqueue('journal_reflection', {'entry_id': self.entry.id})
+        urgent = enqueue('crisis_alert_fanout', {'alert_id': 0})
+        self.assertEqual(claim_next('test').id, urgent.id)
+
+    def test_stale_lock_counts_as_an_attempt(self):
+        expired = timezone.now() - datetime.timedelta(hours=1)
+        first = AIJob.objects.create(kind='journal_reflection', status='RUNNING', locked_at=expired, max_attempts=2)
+        last = AIJob.objects.create(kind='journal_reflection', status='RUNNING', locked_at=expired, max_attempts=2, attempts=1)
+        self.assertEqual(release_stale_locks(), 1)
+        first.refresh_from_db()
+        last.refresh_from_db()
+        self.assertEqual((first.status, first.attempts, first.locked_by), ('PENDING', 1, ''))
+        self.assertEqual((last.status, last.attempts), ('DEAD', 2))
+
+
+class AIServiceConcurrencyTests(TestCase):
+    def test_gather_sync_falls_back_for_calls_past_the_deadline(self):
+        results = ai_service.gather_sync({
+            'fast': (lambda: 'answer', 'fast fallback'),
+            'slow': (lambda: time.sleep(0.5) or 'late', 'slow fallback'),
+            'broken': (mock.Mock(side_effect=ValueError('boom')), 'broken fallback'),
+        }, deadline=0.1)
+        self.assertEqual(results, {'fast': 'answer', 'slow': 'slow fallback', 'broken': 'broken fallback'})
+
+    def test_each_event_loop_gets_its_own_async_client(self):
+        async def twice():
+            return ai_service._aio(), ai_service._aio()
+
+        with mock.patch.multiple(ai_service, api_key='test', client=genai.Client(api_key='test'),
+                                 _loop_clients=weakref.WeakKeyDictionary()):
+            first, same_loop = asyncio.run(twice())
+            next_loop, _ = asyncio.run(twice())
+        self.assertIs(first, same_loop)
+        self.assertIsNot(first, next_loop)
+
+
+class AIStreamTests(TestCase):
+    def setUp(self):
+        self.student = make_user('student')
+
+    def test_wsgi_streams_from_a_sync_iterator(self):
+        self.client.force_login(self.student)
+        with ai_backend():
+            response = self.client.post('/ai-chat/stream/', {'message': 'A stressful exam week'})
+            self.assertFalse(response.is_async)
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertIn(b''.join(chunks).decode().strip(), FAKE_REFLECTIONS)
+
+    async def test_ai_chat_awaits_the_async_reflection(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        with ai_backend():
+            response = await client.post('/ai-chat/', {'message': 'A stressful exam week'})
+        self.assertIn(response.context['ai_response'], FAKE_REFLECTIONS)
+
+    async def test_asgi_streams_from_the_async_client(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        with ai_backend():
+            response = await client.post('/ai-chat/stream/', {'message': 'A stressful exam week'})
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(body.decode().strip(), FAKE_REFLECTIONS)
+
+
+class CircuitBreakerTests(TestCase):
+    def trip(self, breaker):
+        for _ in range(breaker.failure_threshold):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure(ValueError('boom'))
+
+    def expire(self, breaker):
+        breaker.opened_at -= breaker.reset_timeout
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_success()  # a success resets the count
+        self.trip(breaker)
+        self.assertEqual(breaker.state, 'OPEN')
+        self.assertFalse(breaker.allow())
+        self.assertGreater(breaker.retry_in(), 0)
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        self.trip(breaker)
+        self.expire(breaker)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, 'HALF_OPEN')
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.failures), ('CLOSED', 0))
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        self.trip(breaker)
+        self.expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure(ValueError('still down'))
+        self.assertEqual(breaker.state, 'OPEN')
+        self.assertFalse(breaker.allow())
+
+    def test_guard_fails_fast_while_open(self):
+        resilience = Resilience(failure_threshold=1)
+        with self.assertRaises(ValueError):
+            with resilience.guard():
+                raise ValueError('boom')
+        called = mock.Mock()
+        with self.assertRaises(AIUnavailable):
+            with resilience.guard():
+                called()
+        called.assert_not_called()
+        self.assertEqual(resilience.snapshot()['rejected'], 1)
+
+    def test_guard_limits_calls_in_flight(self):
+        resilience = Resilience(max_concurrency=1, acquire_timeout=0)
+        with resilience.guard():
+            self.assertEqual(resilience.snapshot()['in_flight'], 1)
+            with self.assertRaises(AIUnavailable):
+                with resilience.guard():
+                    pass
+        self.assertEqual(resilience.snapshot()['in_flight'], 0)
+        self.assertEqual(resilience.breaker.state, 'CLOSED')  # rejections are not failures
+        with resilience.guard():
+            pass
+
+    def test_rejected_half_open_trial_is_given_back(self):
+        resilience = Resilience(max_concurrency=1, acquire_timeout=0, failure_threshold=1)
+        with self.assertRaises(ValueError):
+            with resilience.guard():
+                raise ValueError('boom')
+        self.expire(resilience.breaker)
+        resilience._semaphore.acquire()
+        with self.assertRaises(AIUnavailable):
+            with resilience.guard():
+                pass
+        resilience._semaphore.release()
+        with resilience.guard():
+            pass
+        self.assertEqual(resilience.breaker.state, 'CLOSED')
+
+
+    def test_cancelled_half_open_trial_is_given_back(self):
+        resilience = Resilience(failure_threshold=1)
+        with self.assertRaises(ValueError):
+            with resilience.guard():
+                raise ValueError('boom')
+        self.expire(resilience.breaker)
+
+        async def trial():
+            async with resilience.aguard():
+                await asyncio.sleep(1)
+
+        async def cancel_at_deadline():
+            task = asyncio.ensure_future(trial())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_at_deadline())
+        self.assertEqual(resilience.breaker.state, 'HALF_OPEN')
+        with resilience.guard():
+            pass
+        self.assertEqual(resilience.breaker.state, 'CLOSED')
+
+    def test_closed_stream_gives_back_the_half_open_trial(self):
+        resilience = Resilience(failure_threshold=1)
+        with self.assertRaises(ValueError):
+            with resilience.guard():
+                raise ValueError('boom')
+        self.expire(resilience.breaker)
+
+        def stream():
+            with resilience.guard():
+                yield 'first chunk'
+                yield 'second chunk'
+
+        chunks = stream()
+        next(chunks)
+        chunks.close()  # the client went away mid-reply
+        with resilience.guard():
+            pass
+        self.assertEqual(resilience.breaker.state, 'CLOSED')
+
+class AITelemetryTests(TestCase):
+    def test_failed_flush_keeps_the_interval(self):
+        recorder = TelemetryRecorder(flush_interval=3600)
+        recorder.record('get_reflection', 'ZEN', 100, 50, 120.0)
+        with mock.patch.object(AICallBucket.objects, 'select_for_update', side_effect=DatabaseError('down')):
+            with self.assertRaises(DatabaseError):
+                recorder.flush()
+        recorder.record('get_reflection', 'ZEN', 100, 50, 80.0)
+        self.assertEqual(recorder.flush(), 1)
+        row = AICallBucket.objects.get()
+        self.assertEqual((row.calls, row.prompt_chars, row.latency_ms_total), (2, 200, 200.0))
+        self.assertEqual(sum(row.latency_histogram), 2)
+
+    def test_monitor_shows_the_mean_latency(self):
+        recorder = TelemetryRecorder(flush_interval=3600)
+        for latency_ms in (40.0, 60.0, 500.0):
+            recorder.record('get_reflection', 'ZEN', 100, 50, latency_ms)
+        recorder.flush()
+        self.client.force_login(make_user('admin', 'ADMIN'))
+        response = self.client.get('/admin-ai-monitor/')
+        self.assertEqual(response.context['avg_latency'], '200ms')
+
+
+    def test_cache_hits_stay_out_of_the_latency_figures(self):
+        recorder = TelemetryRecorder(flush_interval=3600)
+        recorder.record('get_reflection', 'ZEN', 100, 50, 900.0)
+        recorder.record('get_reflection', 'ZEN', 100, 50, 0.1, cache_hit=True)
+        recorder.flush()
+        overall = summarize()['overall']
+        self.assertEqual((overall['calls'], overall['cache_hits']), (2, 1))
+        self.assertEqual((overall['avg_latency'], overall['p50']), (900, 1000))
+
+    def test_exit_flush_logs_instead_of_raising(self):
+        recorder = TelemetryRecorder(flush_interval=3600)
+        recorder.record('get_reflection', 'ZEN', 100, 50, 120.0)
+        with mock.patch.object(recorder, 'flush', side_effect=DatabaseError('gone')):
+            with self.assertLogs('core.ai_telemetry', 'ERROR'):
+                _flush_at_exit(recorder)
+
+class CrisisScanTests(TestCase):
+    def setUp(self):
+        detector.invalidate()
+
+    def test_flags_crisis_language(self):
+        for text in [
+            "I can't sleep I want to die",
+            "I'm not ok I want to die",
+            "I have no hope and no reason to live",
+            "no I want to die",
+            "I'm thinking about killing myself",
+            "I keep cutting myself when it gets bad",
+            "Not okay, I want to end my life",
+            "I can't live without thinking about suicide",
+            "I feel so depressed and hopeless",
+        ]:
+            with self.subTest(text=text):
+                self.assertTrue(scan_text(text).is_crisis)
+
+    def test_governed_negation_is_not_flagged(self):
+        for text in [
+            "I'm not going to kill myself",
+            "I would never hurt myself",
+            "I'm not feeling suicidal anymore",
+            "I don't want to die, I just want to rest",
+        ]:
+            with self.subTest(text=text):
+                scan = scan_text(text)
+                self.assertFalse(scan.is_crisis)
+                self.assertTrue(all(negated for _, _, negated in scan.matches))
+
+    def test_words_inside_other_words_do_not_match(self):
+        self.assertEqual(scan_text("Working on my skills and a new diet").score, 0)
+
+    def test_single_everyday_words_do_not_alert(self):
+        for text in ["Killing it at my diet this week", "I'm dying to see the new film", "Feeling a bit depressed today"]:
+            with self.subTest(text=text):
+                scan = scan_text(text)
+                self.assertGreater(scan.score, 0)
+                self.assertFalse(scan.is_crisis)
+
+    def test_repeated_phrases_count_once(self):
+        self.assertEqual(scan_text("hopeless, hopeless, hopeless").score, 4)
+
+
+@override_settings(CRISIS_ALERTS={'POLL_INTERVAL': 0.01, 'STREAM_SECONDS': 0.05})
+class CrisisAlertStreamTests(TestCase):
+    def setUp(self):
+        self.therapist = make_user('therapist', 'THERAPIST')
+        student = make_user('student')
+        TherapistConnection.objects.create(student=student, therapist=self.therapist)
+        fan_out_alert(CrisisAlert.objects.create(student=student, message='I want to die').id)
+        self.delivery = AlertDelivery.objects.get(recipient=self.therapist)
+
+    def test_wsgi_answers_one_poll_and_closes(self):
+        self.client.force_login(self.therapist)
+        response = self.client.get('/crisis-alerts/stream/')
+        self.assertFalse(response.is_async)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('retry: 10\n', body)
+        self.assertIn(f'id: {self.delivery.id}\nevent: crisis\n', body)
+        self.assertNotIn('keepalive', body)
+
+        response = self.client.get('/crisis-alerts/stream/', headers={'Last-Event-ID': str(self.delivery.id)})
+        self.assertNotIn('event: crisis', b''.join(response.streaming_content).decode())
+
+    async def test_asgi_holds_the_stream_open(self):
+        client = AsyncClient()
+        await client.aforce_login(self.therapist)
+        response = await client.get('/crisis-alerts/stream/')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.count('event: crisis'), 1)
+        self.assertIn('keepalive', body)
+
+    def test_therapist_who_connects_later_gets_the_open_alerts(self):
+        late = make_user('late', 'THERAPIST')
+        connection = TherapistConnection.objects.create(student=self.delivery.alert.student, therapist=late, status='PENDING')
+        self.assertFalse(AlertDelivery.objects.filter(recipient=late).exists())
+        connection.status = 'ACTIVE'
+        connection.save()
+        connection.save()  # re-saving an active connection adds nothing
+        self.assertEqual(AlertDelivery.objects.filter(recipient=late, alert=self.delivery.alert).count(), 1)
+        self.assertEqual(UserStats.objects.get(user=late).assigned_alert_count, 1)
+        self.assertEqual(rebuild_user_stats(late.id).assigned_alert_count, 1)
+
+    def test_students_are_refused(self):
+        self.client.force_login(make_user('other'))
+        self.assertEqual(self.client.get('/crisis-alerts/stream/').status_code, 403)
+
+
+class UserStatsBackfillTests(TestCase):
+    def test_backfill_matches_a_rebuild(self):
+        student = make_user('student')
+        therapist = make_user('therapist', 'THERAPIST')
+        TherapistConnection.objects.create(student=student, therapist=therapist)
+        JournalEntry.objects.create(user=student, content='first', ai_reflection='A reflection')
+        JournalEntry.objects.create(user=student, content='second')
+        JournalEntry.objects.create(user=student, content='third', ai_reflection=REFLECTION_FALLBACK)
+        MoodEntry.objects.create(user=student, mood_score=4)
+        fan_out_alert(CrisisAlert.objects.create(student=student, message='alert').id)
+        Appointment.objects.create(student=student, therapist=therapist, scheduled_at=timezone.now())
+        users = (student, therapist)
+        expected = {user.id: model_to_dict(rebuild_user_stats(user.id)) for user in users}
+
+        UserStats.objects.filter(user=student).delete()
+        UserStats.objects.filter(user=therapist).update(assigned_alert_count=0, pending_appointment_count=0)
+        backfill = importlib.import_module('core.migrations.0023_backfill_userstats')
+        backfill.backfill_user_stats(apps, None)
+        self.assertEqual({user.id: model_to_dict(UserStats.objects.get(user=user)) for user in users}, expected)
+        self.assertEqual(expected[student.id]['reflection_count'], 1)
+        self.assertEqual(expected[therapist.id]['pending_appointment_count'], 1)
+
+
+class QueryPlanCheckTests(TestCase):
+    def test_hot_queries_use_an_index(self):
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('All hot queries use an index.', out.getvalue())
+
+    def test_unknown_vendor_is_a_command_error(self):
+        with mock.patch.object(connection, 'vendor', 'oracle'):
+            with self.assertRaisesMessage(CommandError, "No plan checker for database vendor 'oracle'"):
+                call_command('check_query_plans', stdout=io.StringIO())
+
+
+@mock.patch('core.db_router.replica_configured', return_value=True)
+class PrimaryReplicaRouterTests(TestCase):
+    router = PrimaryReplicaRouter()
+
+    def read_alias(self):
+        return self.router.db_for_read(JournalEntry)
+
+    def through_middleware(self, request):
+        seen = []
+
+        def view(request):
+            with replica_reads():
+                seen.append(self.read_alias())
+            return HttpResponse()
+
+        response = PrimaryPinMiddleware(view)(request)
+        return seen[0], response
+
+    def test_reads_use_the_replica_only_when_asked(self, _):
+        self.assertEqual(self.read_alias(), 'default')
+        with replica_reads():
+            self.assertEqual(self.read_alias(), 'replica')
+            self.assertEqual(self.router.db_for_write(JournalEntry), 'default')
+            with primary_reads():
+                self.assertEqual(self.read_alias(), 'default')
+        self.assertEqual(self.read_alias(), 'default')
+
+    def test_post_pins_the_client_to_the_primary(self, _):
+        factory = RequestFactory()
+        alias, response = self.through_middleware(factory.post('/journal/'))
+        self.assertEqual(alias, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        factory.cookies[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        alias, response = self.through_middleware(factory.get('/admin-ai-monitor/'))
+        self.assertEqual(alias, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        alias, _ = self.through_middleware(RequestFactory().get('/admin-ai-monitor/'))
+        self.assertEqual(alias, 'replica')
+
+    def test_rebuilds_read_the_primary_inside_replica_reads(self, _):
+        # The test case may only touch 'default', so a rebuild read routed to the replica would raise here
+        student = make_user('student')
+        JournalEntry.objects.create(user=student, content='entry')
+        with replica_reads():
+            self.assertEqual(rebuild_user_stats(student.id).journal_count, 1)
+            self.assertEqual(rebuild_day(timezone.localdate()).journal_entries, 1)
+
+
+class ResponseCacheTests(TestCase):
+    def test_evicts_the_least_recently_used_entry(self):
+        backend = LocMemBackend(max_entries=2)
+        backend.set('a', 1, ttl=60)
+        backend.set('b', 2, ttl=60)
+        backend.get('a')
+        backend.set('c', 3, ttl=60)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (1, None, 3))
+
+    def test_entries_expire_after_their_ttl(self):
+        backend = LocMemBackend()
+        with mock.patch('core.ai_cache.time.monotonic', return_value=1000.0):
+            backend.set('key', 'value', ttl=60)
+        with mock.patch('core.ai_cache.time.monotonic', return_value=1059.0):
+            self.assertEqual(backend.get('key'), 'value')
+        with mock.patch('core.ai_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(backend.get('key'))
+
+    def test_key_ignores_prompt_whitespace_only(self):
+        key = make_key('get_reflection', 'gemini', 'ZEN', 'Reflect on:\n    a hard day')
+        self.assertEqual(key, make_key('get_reflection', 'gemini', 'ZEN', '  Reflect on: a   hard day '))
+        self.assertNotEqual(key, make_key('get_reflection', 'gemini', 'ZEN', 'Reflect on: a hard week'))
+        self.assertNotEqual(key, make_key('get_reflection', 'gemini', 'COACH', 'Reflect on: a hard day'))
+        self.assertNotEqual(key, make_key('get_mood_suggestion', 'gemini', 'ZEN', 'Reflect on: a hard day'))
+
+    def test_counts_hits_and_misses_per_method(self):
+        cache = ResponseCache(LocMemBackend())
+        self.assertIsNone(cache.get('get_reflection', 'gemini', 'ZEN', 'prompt'))
+        cache.set('get_reflection', 'gemini', 'ZEN', 'prompt', 'reply')
+        self.assertEqual(cache.get('get_reflection', 'gemini', 'ZEN', 'prompt'), 'reply')
+        cache.get('get_mood_suggestion', 'gemini', 'ZEN', 'prompt')
+        self.assertEqual(cache.stats(), {
+            'get_reflection': {'hits': 1, 'misses': 1},
+            'get_mood_suggestion': {'hits': 0, 'misses': 1},
+        })
+
+
+class FakeBackendTests(TestCase):
+    def test_replies_are_deterministic_and_shaped_like_each_prompt(self):
+        with ai_backend():
+            reflection = ai_service.get_reflection('A long week of exams')
+            self.assertEqual(ai_service.get_reflection('A long week of exams'), reflection)
+            journals = [JournalEntry(content='Slept badly'), JournalEntry(content='Took a rest day')]
+            breakthrough = ai_service.get_breakthrough_analysis(journals)
+            suggestion = ai_service.get_mood_suggestion(3, 2, 4)
+        self.assertIn(reflection, FAKE_REFLECTIONS)
+        self.assertIn(breakthrough, FAKE_BREAKTHROUGHS)
+        self.assertRegex(breakthrough, r'^BREAKTHROUGH: .+\nMILESTONE: .+$')
+        self.assertIn(suggestion, FAKE_SUGGESTIONS)
+
+    def test_streamed_chunks_join_to_the_full_reply(self):
+        models = FakeClient(stream_chunk_words=3).models
+        reply = models.generate_content('fake', 'Reflect on this').text
+        chunks = [chunk.text for chunk in models.generate_content_stream('fake', 'Reflect on this')]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks).strip(), reply)
+
+    def test_honours_fixed_latency_and_the_call_timeout(self):
+        models = FakeClient(latency={'DISTRIBUTION': 'fixed', 'MS': 50}).models
+        started = time.perf_counter()
+        models.generate_content('fake', 'prompt')
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        config = types.GenerateContentConfig(http_options=types.HttpOptions(timeout=10))
+        with self.assertRaises(TimeoutError):
+            models.generate_content('fake', 'prompt', config=config)
+
+    def test_injected_failures_repeat_for_a_seed(self):
+        def outcomes(seed):
+            models = FakeClient(error_rate=0.5, seed=seed).models
+            results = []
+            for _ in range(20):
+                try:
+                    models.generate_content('fake', 'prompt')
+                    results.append(True)
+                except FakeBackendError:
+                    results.append(False)
+            return results
+
+        self.assertEqual(outcomes(7), outcomes(7))
+        self.assertIn(True, outcomes(7))
+        self.assertIn(False, outcomes(7))
+        with self.assertRaises(FakeBackendError):
+            FakeClient(error_rate=1.0).models.generate_content('fake', 'prompt')
+
+    @override_settings(AI_BACKEND='fake', AI_FAKE_BACKEND={'ERROR_RATE': 0.25, 'SEED': 3})
+    def test_settings_select_the_fake_backend(self):
+        client = build_client()
+        self.assertIsInstance(client, FakeClient)
+        self.assertEqual((client.models.error_rate, client.models.stream_chunk_words), (0.25, 4))
+
+
+class BreakthroughBatchTests(TransactionTestCase):
+    # The batch command analyses students on pool threads, which only see committed rows
+    serialized_rollback = True
+
+    def setUp(self):
+        self.student = make_user('student')
+        self.entries = [JournalEntry.objects.create(user=self.student, content=f'Batch entry {i}') for i in range(3)]
+
+    def test_only_changed_journal_sets_need_analysis(self):
+        few = make_user('few')
+        JournalEntry.objects.create(user=few, content='only one')
+        therapist = make_user('therapist', 'THERAPIST')
+        for i in range(3):
+            JournalEntry.objects.create(user=therapist, content=f'Therapist entry {i}')
+        pending = students_needing_breakthrough()
+        self.assertEqual(list(pending), [self.student.id])
+
+        DashboardInsight.objects.create(user=self.student, breakthrough_signature=pending[self.student.id])
+        self.assertEqual(students_needing_breakthrough(), {})
+        self.entries[0].content = 'Edited entry'
+        self.entries[0].save()
+        self.assertEqual(list(students_needing_breakthrough()), [self.student.id])
+
+    def test_batch_stores_results_and_skips_them_next_run(self):
+        out = io.StringIO()
+        with ai_backend():
+            call_command('run_breakthrough_batch', '--rpm', '0', stdout=out)
+        self.assertIn('Breakthroughs updated: 1, skipped/failed: 0', out.getvalue())
+        insight = DashboardInsight.objects.get(user=self.student)
+        self.assertIn(insight.breakthrough, FAKE_BREAKTHROUGHS)
+        self.assertEqual(insight.breakthrough_signature, journal_signature(self.student))
+
+        out = io.StringIO()
+        call_command('run_breakthrough_batch', stdout=out)
+        self.assertIn('0 student(s) with changed journals', out.getvalue())
+
+    def test_dashboard_refresh_keeps_a_breakthrough_written_meanwhile(self):
+        def batch_finishes_first(calls, deadline=None):
+            refresh_breakthrough(self.student.id, journal_signature(self.student))
+            return {'reflection': 'fresh reflection'}
+
+        DashboardInsight.objects.create(user=self.student)
+        with ai_backend(), mock.patch.object(ai_service, 'gather_sync', side_effect=batch_finishes_first):
+            refresh_dashboard_insight(self.student)
+        insight = DashboardInsight.objects.get(user=self.student)
+        self.assertEqual(insight.reflection, 'fresh reflection')
+        self.assertIn(insight.breakthrough, FAKE_BREAKTHROUGHS)
+
+
+class PromptBudgetTests(TestCase):
+    def words(self, count, prefix='word'):
+        return ' '.join(f'{prefix}{i}' for i in range(count))
+
+    def test_truncation_stays_within_the_budget(self):
+        for max_tokens in (4, 40, 150, 601):
+            text = truncate_to_tokens(self.words(1000), max_tokens)
+            self.assertLessEqual(estimate_tokens(text), max_tokens)
+            self.assertTrue(text.startswith('word0 word1 '))
+            self.assertTrue(text.endswith(' …'))
+        self.assertEqual(truncate_to_tokens('  short entry ', 40), 'short entry')
+
+    def test_history_keeps_the_newest_entries_within_the_budget(self):
+        newest_first = [self.words(300, f'e{n}_') for n in range(10)]
+        fitted = fit_history(newest_first, total_tokens=400, per_entry_tokens=150)
+        self.assertLessEqual(sum(estimate_tokens(entry) for entry in fitted), 400)
+        self.assertEqual([entry.split()[0] for entry in fitted], ['e0_0', 'e1_0'])
+
+    def test_reflection_prompt_is_bounded_however_long_the_history(self):
+        short, _ = ai_service._reflection_prompt('today', history=['a day'] * 3)
+        long, _ = ai_service._reflection_prompt(self.words(5000), history=[self.words(5000)] * 50, summary=self.words(5000))
+        overhead = estimate_tokens(short)
+        self.assertLessEqual(estimate_tokens(long), overhead + 600 + 400 + 200 + 50)
+
+    def test_extractive_summary_drops_the_oldest_sentences(self):
+        previous = '\n'.join(f'Old sentence {i}.' for i in range(50))
+        summary = extractive_summary(previous, ['Newest thought today. More detail here.'], max_tokens=30)
+        self.assertLessEqual(estimate_tokens(summary), 30)
+        self.assertEqual(summary.split('\n')[-1], 'Newest thought today.')
+        self.assertNotIn('Old sentence 0.', summary)
+
+    def test_rolling_summary_falls_back_and_catches_up_in_batches(self):
+        student = make_user('student')
+        entries = [JournalEntry.objects.create(user=student, content=f'Entry {i} about the week. Detail.') for i in range(7)]
+        with ai_backend(error_rate=1.0), mock.patch('core.insights.SUMMARY_BATCH', 3):
+            with mock.patch.object(ai_service, 'update_summary', wraps=ai_service.update_summary) as update_summary:
+                insight = update_rolling_summary(student.id)
+        self.assertEqual(update_summary.call_count, 3)
+        self.assertEqual(insight.summary_through_id, entries[-1].id)
+        self.assertLessEqual(estimate_tokens(insight.rolling_summary), 300)
+        self.assertEqual(insight.rolling_summary.split('\n')[-1], 'Entry 6 about the week.')
+
+
+class DailyMetricsTests(TestCase):
+    def signup(self, username, role='STUDENT'):
+        user = make_user(username, role)
+        record_signup(role)  # as the register view does
+        return user
+
+    def test_counters_match_a_rebuild_after_a_day_of_activity(self):
+        active = make_user('active')
+        therapist = make_user('therapist', 'THERAPIST')
+        JournalEntry.objects.create(user=active, content='first of the day')  # counts today's row from scratch
+        counted = self.signup('counted')
+        stats_for(counted)  # first activity read from the UserStats counters
+        uncounted = self.signup('uncounted')  # no counters yet: read from the source tables
+        self.signup('idle')
+        self.signup('colleague', 'THERAPIST')
+        MoodEntry.objects.create(user=counted, mood_score=7, energy_score=4)
+        JournalEntry.objects.create(user=counted, content='second entry, no longer inactive')
+        JournalEntry.objects.create(user=uncounted, content='first entry')
+        MoodEntry.objects.create(user=active, mood_score=3, energy_score=6)
+        Task.objects.create(user=counted, title='Walk')
+        ChatMessage.objects.create(sender=counted, receiver=therapist, content='hello')
+
+        def fields(row):
+            return {k: v for k, v in model_to_dict(row).items() if k not in ('id', 'date')}
+
+        today = timezone.localdate()
+        live = fields(DailyMetrics.objects.get(date=today))
+        self.assertEqual(live, fields(rebuild_day(today)))
+        self.assertEqual((live['inactive_students'], live['total_students'], live['journal_entries']), (1, 4, 3))
+
+        metrics = admin_dashboard_metrics()
+        self.assertEqual((metrics['total_students'], metrics['avg_mood'], metrics['avg_energy']), (4, 5.0, 5.0))
+        self.assertEqual(metrics['bounce_rate'], 25.0)
+        self.assertEqual(metrics['dynamic_page_views'], 3 + 2 + 1 + 1)
+
+    def test_entries_reuse_the_known_row(self):
+        student = make_user('student')
+        JournalEntry.objects.create(user=student, content='creates the row')
+        with CaptureQueriesContext(connection) as ctx:
+            record_activity(Task(user=student, title='Walk'))
+        # Just the UPDATE of today's row: no existence check once the process has seen it
+        self.assertEqual(len(ctx), 1)
+
+    def test_a_missing_row_is_recreated(self):
+        student = make_user('student')
+        JournalEntry.objects.create(user=student, content='creates the row')
+        DailyMetrics.objects.all().delete()
+        Task.objects.create(user=student, title='Walk')
+        row = DailyMetrics.objects.get(date=timezone.localdate())
+        self.assertEqual((row.journal_entries, row.tasks_created), (1, 1))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite tuning only applies to SQLite databases')
+class SQLiteTuningTests(TestCase):
+    def file_connection(self):
+        """A fresh connection to a throwaway database file; the test database is in memory, where WAL doesn't apply."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        default = connections['default']
+        wrapper = default.__class__(dict(default.settings_dict, NAME=f'{directory.name}/tuning.sqlite3'), alias='tuning')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_new_connections_get_the_configured_pragmas(self):
+        wrapper = self.file_connection()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    def test_maintenance_checkpoints_the_wal(self):
+        wrapper = self.file_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE note (body TEXT)')
+            cursor.execute("INSERT INTO note VALUES ('x')")
+        out = io.StringIO()
+        with mock.patch('core.management.commands.sqlite_maintenance.connection', wrapper):
+            call_command('sqlite_maintenance', stdout=out)
+        self.assertRegex(out.getvalue(), r'Checkpointed \d+/\d+ WAL frames \(TRUNCATE\)')
+        self.assertIn('SQLite maintenance complete.', out.getvalue())
+
+    def test_maintenance_runs_on_the_test_database(self):
+        out = io.StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('SQLite maintenance complete.', out.getvalue())
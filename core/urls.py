@@ -5,8 +5,10 @@ urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('mood-checkin/', views.mood_checkin, name='mood_checkin'),
     path('journal/', views.journal, name='journal'),
+    path('journal/<int:entry_id>/reflection/', views.journal_reflection_status, name='journal_reflection_status'),
     path('tasks/', views.tasks, name='tasks'),
     path('ai-chat/', views.ai_chat, name='ai_chat'),
+    path('ai-chat/stream/', views.ai_chat_stream, name='ai_chat_stream'),
     path('find-therapist/', views.find_therapist, name='find_therapist'),
     path('find-resources/', views.find_resources, name='find_resources'),
     path('self-help/', views.self_help, name='self_help'),
@@ -14,9 +16,11 @@ urlpatterns = [
     path('clinical-progress/<int:student_id>/', views.clinical_progress, name='clinical_progress'),
     path('messages/', views.messages_list, name='messages_list'),
     path('chat/<int:user_id>/', views.chat_session, name='chat_session'),
+    path('chat/<int:user_id>/stream/', views.chat_stream, name='chat_stream'),
     path('settings/', views.settings, name='settings'),
     path('focus-timer/', views.focus_timer, name='focus_timer'),
     path('ai-mentor/', views.ai_mentor, name='ai_mentor'),
+    path('ai-mentor/stream/', views.ai_mentor_stream, name='ai_mentor_stream'),
     path('register/', views.register, name='register'),
     
     # Admin Management
@@ -32,4 +36,5 @@ urlpatterns = [
     path('therapist/records/<int:student_id>/', views.therapist_student_records, name='therapist_records'),
     path('therapist/insights/', views.therapist_insights, name='therapist_insights'),
     path('therapist/crisis/', views.therapist_crisis, name='therapist_crisis'),
+    path('crisis-alerts/stream/', views.crisis_alert_stream, name='crisis_alert_stream'),
 ]
@@ -1,13 +1,33 @@
 from django.shortcuts import render, redirect
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+import asyncio
+import json
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.models import User
-from .models import MoodEntry, JournalEntry, Task, TherapistConnection, UserProfile, CrisisAlert, Resource, ChatMessage, Category, TherapistProfile, Appointment, SessionNote
+from .models import MoodEntry, JournalEntry, Task, TherapistConnection, UserProfile, CrisisAlert, Resource, ChatMessage, Category, TherapistProfile, Appointment, SessionNote, AIJob, DashboardInsight, UserStats
 from .ai_service import ai_service
+from .insights import get_dashboard_insight
+from .jobs import enqueue
+from .ai_telemetry import summarize as summarize_telemetry
+from .crisis import scan_text
+from .notifications import mark_alerts_seen, next_deliveries
+from .metrics import admin_dashboard_metrics, record_signup
+from .stats import stats_for
+from .db_router import replica_reads, use_replica
+from .pagination import keyset_paginate
+from .search import search_resources
+from .task_board import open_tasks, task_board, toggle_task
+from .mood_analytics import caseload_overview, caseload_summary, student_trend
+from .chat import inbox as chat_inbox, mark_read, messages_since, send_message, serialize as serialize_message, window as chat_window
 from django.utils import timezone
+from django.conf import settings as django_settings  # the name "settings" is taken by the settings view
 import datetime
+from urllib.parse import urlencode
 from django.db import models
 
 @login_required
@@ -20,40 +40,16 @@ def dashboard(request):
         
     
     if user.profile.role == 'ADMIN':
-        total_students = UserProfile.objects.filter(role='STUDENT').count()
-        total_therapists = UserProfile.objects.filter(role='THERAPIST').count()
-        unresolved_alerts = CrisisAlert.objects.filter(is_resolved=False).count()
-        
-        # 1. Student Growth Data (Last 7 Days)
-        from django.db.models.functions import TruncDate
-        from django.db.models import Count, Avg
-        import datetime
-        
-        today = timezone.now().date()
-        seven_days_ago = today - datetime.timedelta(days=6)
-        
-        growth_qs = User.objects.filter(
-            date_joined__date__gte=seven_days_ago,
-            profile__role='STUDENT'
-        ).annotate(date=TruncDate('date_joined')).values('date').annotate(count=Count('id')).order_by('date')
-        
-        # Fill in gaps with zero
-        growth_data = []
-        growth_labels = []
-        growth_map = {item['date']: item['count'] for item in growth_qs}
-        
-        for i in range(7):
-            curr_date = seven_days_ago + datetime.timedelta(days=i)
-            growth_labels.append(curr_date.strftime('%b %d'))
-            growth_data.append(growth_map.get(curr_date, 0))
-
-        # 2. Wellness Distribution (Overall Averages)
-        avg_mood = MoodEntry.objects.aggregate(Avg('mood_score'))['mood_score__avg'] or 0
-        avg_energy = MoodEntry.objects.aggregate(Avg('energy_score'))['energy_score__avg'] or 0
-        
-        # 3. Recent Activity (Consolidated Feed)
-        recent_users = User.objects.all().order_by('-date_joined')[:5]
-        recent_alerts = CrisisAlert.objects.all().order_by('-created_at')[:5]
+        with replica_reads():
+            unresolved_alerts = CrisisAlert.objects.filter(is_resolved=False).count()
+
+            # Counts, wellness averages, growth and bounce rate come from the daily rollup rows,
+            # so this page costs the same however many entries the platform has
+            metrics = admin_dashboard_metrics(days=7)
+
+            # Recent Activity (Consolidated Feed)
+            recent_users = list(User.objects.select_related('profile').order_by('-date_joined')[:5])
+            recent_alerts = list(CrisisAlert.objects.select_related('student').order_by('-created_at')[:5])
         
         activity_feed = []
         for u in recent_users:
@@ -63,78 +59,53 @@ def dashboard(request):
         
         activity_feed = sorted(activity_feed, key=lambda x: x['time'], reverse=True)[:10]
 
-        # 4. Databasically Correct Metrics (Phase 11)
-        # Dynamic Engagement proxy (Total interactions)
-        total_journals = JournalEntry.objects.count()
-        total_moods = MoodEntry.objects.count()
-        total_tasks = Task.objects.count()
-        total_messages = ChatMessage.objects.count()
-        dynamic_page_views = total_journals + total_moods + total_tasks + total_messages
-
-        # Bounce Rate approximation (% of users with 0 active entries)
-        total_all_students = total_students # total_students is student count from earlier
-        inactive_students = UserProfile.objects.filter(
-            role='STUDENT',
-            user__mood_entries__isnull=True,
-            user__journal_entries__isnull=True
-        ).distinct().count()
-        
-        bounce_rate = round((inactive_students / total_all_students * 100), 1) if total_all_students > 0 else 0
-
         context = {
             'user': user,
-            'total_students': total_students,
-            'total_therapists': total_therapists,
             'unresolved_alerts': unresolved_alerts,
-            'growth_data': growth_data,
-            'growth_labels': growth_labels,
-            'avg_mood': round(avg_mood, 1),
-            'avg_energy': round(avg_energy, 1),
             'activity_feed': activity_feed,
-            'dynamic_page_views': dynamic_page_views,
-            'bounce_rate': bounce_rate,
             'greeting': get_greeting(),
+            **metrics,
         }
     elif user.profile.role == 'THERAPIST':
-        connections = TherapistConnection.objects.filter(therapist=user, status='ACTIVE')
-        pending_appt_count = Appointment.objects.filter(therapist=user, status='PENDING').count()
-        student_ids = TherapistConnection.objects.filter(therapist=user).values_list('student_id', flat=True)
-        alert_count = CrisisAlert.objects.filter(student_id__in=student_ids, is_resolved=False).count()
+        connections = TherapistConnection.objects.filter(therapist=user, status='ACTIVE').select_related('student__profile')
+        user_stats = stats_for(user)
         
         context = {
             'user': user,
             'connections': connections,
             'greeting': get_greeting(),
-            'pending_appt_count': pending_appt_count,
-            'alert_count': alert_count,
+            'pending_appt_count': user_stats.pending_appointment_count,
+            'alert_count': user_stats.assigned_alert_count,
         }
     elif user.profile.role == 'STUDENT': # Explicitly handle STUDENT role
         latest_mood = MoodEntry.objects.filter(user=user).order_by('-created_at').first()
         recent_journals = JournalEntry.objects.filter(user=user).order_by('-created_at')[:3]
         
-        # AI Mentor Insight for Dashboard (short reflection)
-        ai_mentor_insight = ""
-        if recent_journals:
-            history = [j.content for j in recent_journals[1:]]
-            mood_ctx = f"Mood: {latest_mood.mood_score}, Energy: {latest_mood.energy_score}" if latest_mood else "None"
-            ai_mentor_insight = ai_service.get_reflection(recent_journals[0].content, user=user, history=history, mood_context=mood_ctx)
-        
-        # Phase 9: Breakthrough Pattern Recognition (Analyzing last 10 entries)
-        breakthrough = None
-        all_recent_journals = JournalEntry.objects.filter(user=user).order_by('-created_at')[:10]
-        if all_recent_journals.count() >= 3:
-            breakthrough = ai_service.get_breakthrough_analysis(all_recent_journals)
+        # AI Mentor Insight + Phase 9 breakthrough, stored and only regenerated when journals change
+        insight = get_dashboard_insight(user)
 
         context = {
             'user': user,
             'latest_mood': latest_mood,
             'recent_journals': recent_journals,
-            'ai_mentor_insight': ai_mentor_insight,
-            'breakthrough': breakthrough,
+            'ai_mentor_insight': insight.reflection if insight else "",
+            'breakthrough': insight.breakthrough if insight else None,
+            'insight_pending': insight is None or insight.is_stale,
             'greeting': get_greeting(),
         }
     return render(request, 'core/dashboard.html', context)
 
+def _render_page(request, template, fragment_template, context, page_extras=None):
+    """
+    Infinite scroll fetches later pages with ?fragment=1 and gets just the rows to append;
+    page_extras() (header stats and the like) only runs for the full page.
+    """
+    if request.GET.get('fragment'):
+        return render(request, fragment_template, context)
+    if page_extras:
+        context.update(page_extras())
+    return render(request, template, context)
+
 def get_greeting():
     hour = timezone.now().hour
     if hour < 12:
@@ -159,6 +130,13 @@ def mood_checkin(request):
             stress_score=stress_score,
             note=note
         )
+
+        crisis = scan_text(note)
+        if crisis.is_crisis:
+            CrisisAlert.objects.create(
+                student=request.user,
+                message=f"Crisis language detected in mood check-in note (score {crisis.score}: {', '.join(crisis.phrases)}): {note[:100]}..."
+            )
         
         # Get AI suggestion
         suggestion = ai_service.get_mood_suggestion(mood_score, energy_score, stress_score)
@@ -172,39 +150,51 @@ def journal(request):
     if request.method == 'POST':
         content = request.POST.get('content')
         if content:
-            # Crisis detection
-            crisis_keywords = ['suicide', 'self-harm', 'hurt myself', 'die', 'depressed', 'kill']
-            is_flagged = any(keyword in content.lower() for keyword in crisis_keywords)
-
-            # Fetch context for the AI
-            past_journals = JournalEntry.objects.filter(user=request.user).order_by('-created_at')[:3]
-            history = [j.content for j in past_journals]
-            latest_mood = MoodEntry.objects.filter(user=request.user).order_by('-created_at').first()
-            mood_ctx = f"Mood: {latest_mood.mood_score}, Energy: {latest_mood.energy_score}" if latest_mood else "Unknown"
-
-            # Get AI reflection with memory and persona
-            reflection = ai_service.get_reflection(content, user=request.user, history=history, mood_context=mood_ctx)
-            
+            # Crisis detection (compiled, DB-managed lexicon)
+            crisis = scan_text(content)
+            is_flagged = crisis.is_crisis
+
             entry = JournalEntry.objects.create(
                 user=request.user,
                 content=content,
-                ai_reflection=reflection,
                 is_flagged=is_flagged
             )
-            
+            # Reflection and dashboard insight are generated by the AI worker (manage.py run_ai_worker)
+            enqueue('journal_reflection', {'entry_id': entry.id})
+            enqueue('dashboard_insight', {'user_id': request.user.id}, dedupe_key=f"user:{request.user.id}")
+            enqueue('journal_summary', {'user_id': request.user.id}, dedupe_key=f"user:{request.user.id}")
+
             if is_flagged:
                 CrisisAlert.objects.create(
                     student=request.user,
                     journal_entry=entry,
-                    message=f"Crisis keywords detected in journal entry: {content[:100]}..."
+                    message=f"Crisis language detected in journal entry (score {crisis.score}: {', '.join(crisis.phrases)}): {content[:100]}..."
                 )
                 messages.warning(request, "Your entry has been saved. We've noticed you might be going through a tough time—please reach out to a professional if you need immediate help.")
             else:
-                messages.success(request, "Journal entry saved. Your AI Companion has reflected on your thoughts.")
+                messages.success(request, "Journal entry saved. Your AI Companion is reflecting on your thoughts.")
             return redirect('journal')
             
-    journals = JournalEntry.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'core/journal.html', {'journals': journals})
+    journals = keyset_paginate(JournalEntry.objects.filter(user=request.user), request.GET.get('cursor'))
+
+    def latest_journal():
+        # The AI Insights box shows the newest entry: the first row, unless a cursor paged past it
+        if journals.items and not request.GET.get('cursor'):
+            return {'latest_journal': journals.items[0]}
+        return {'latest_journal': JournalEntry.objects.filter(user=request.user).order_by('-created_at', '-id').first()}
+
+    return _render_page(request, 'core/journal.html', 'core/partials/journal_entries.html', {'journals': journals}, latest_journal)
+
+@login_required
+def journal_reflection_status(request, entry_id):
+    """Polled by the journal page while a reflection is still being generated."""
+    entry = JournalEntry.objects.filter(id=entry_id, user=request.user).values('ai_reflection').first()
+    if entry is None:
+        return JsonResponse({'error': 'not found'}, status=404)
+    if entry['ai_reflection']:
+        return JsonResponse({'ready': True, 'reflection': entry['ai_reflection']})
+    failed = AIJob.objects.filter(kind='journal_reflection', payload__entry_id=entry_id, status='DEAD').exists()
+    return JsonResponse({'ready': False, 'failed': failed, 'reflection': ''})
 
 @login_required
 def tasks(request):
@@ -216,38 +206,32 @@ def tasks(request):
             energy = request.POST.get('energy_level_required', 5)
             Task.objects.create(user=user, title=title, energy_level_required=energy)
         elif action == 'toggle':
-            task_id = request.POST.get('task_id')
-            task = Task.objects.get(id=task_id, user=user)
-            task.is_completed = not task.is_completed
-            task.save()
+            toggle_task(user, request.POST.get('task_id'))
         return redirect('tasks')
 
     # Suggest tasks based on energy
-    latest_mood = MoodEntry.objects.filter(user=user).order_by('-created_at').first()
-    energy_level = latest_mood.energy_score if latest_mood else 5
-    
-    suggested_tasks = Task.objects.filter(user=user, is_completed=False, energy_level_required__lte=energy_level + 2)
-    other_tasks = Task.objects.filter(user=user, is_completed=False).exclude(id__in=suggested_tasks.values_list('id', flat=True))
-    completed_tasks = Task.objects.filter(user=user, is_completed=True)
-    
-    context = {
-        'suggested_tasks': suggested_tasks,
-        'other_tasks': other_tasks,
-        'completed_tasks': completed_tasks,
-        'energy_level': energy_level,
-    }
-    return render(request, 'core/tasks.html', context)
+    return render(request, 'core/tasks.html', task_board(user))
 
 @login_required
-def ai_chat(request):
+async def ai_chat(request):
     if request.method == 'POST':
         user_message = request.POST.get('message')
         if user_message:
             # We'll use the get_reflection logic or similar for chat
-            ai_response = ai_service.get_reflection(f"User ranted or asked: {user_message}")
-            return render(request, 'core/ai_chat.html', {'ai_response': ai_response, 'user_message': user_message})
+            ai_response = await ai_service.aget_reflection(f"User ranted or asked: {user_message}")
+            return await sync_to_async(render)(request, 'core/ai_chat.html', {'ai_response': ai_response, 'user_message': user_message})
             
-    return render(request, 'core/ai_chat.html')
+    return await sync_to_async(render)(request, 'core/ai_chat.html')
+
+@login_required
+async def ai_chat_stream(request):
+    """Streaming twin of ai_chat's POST, used by the chat page when JavaScript is available."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    user_message = request.POST.get('message', '').strip()
+    if not user_message:
+        return HttpResponseBadRequest("Empty message")
+    return _stream_reflection(request, f"User ranted or asked: {user_message}")
 
 def register(request):
     if request.method == 'POST':
@@ -259,6 +243,7 @@ def register(request):
             if hasattr(user, 'profile'):
                 user.profile.role = role
                 user.profile.save()
+                record_signup(role)
             
             login(request, user)
             return redirect('dashboard')
@@ -268,7 +253,7 @@ def register(request):
 
 @login_required
 def find_therapist(request):
-    therapists = User.objects.filter(profile__role='THERAPIST').exclude(id=request.user.id)
+    therapists = User.objects.filter(profile__role='THERAPIST').exclude(id=request.user.id).select_related('profile')
     # Check current connections to avoid duplicates
     connected_ids = TherapistConnection.objects.filter(student=request.user).values_list('therapist_id', flat=True)
     
@@ -291,25 +276,85 @@ def connect_therapist(request, therapist_id):
         messages.success(request, f"You are now connected with {therapist.username}!")
     return redirect('find_therapist')
 
+def _mentor_context(user):
+    latest_journals = list(JournalEntry.objects.filter(user=user).order_by('-created_at')[:5])
+    latest_mood = MoodEntry.objects.filter(user=user).order_by('-created_at').first()
+    return latest_journals, latest_mood
+
+def _stream_reflection(request, *args, **kwargs):
+    """
+    Streams an AI reflection to the browser as it is generated. A WSGI server drains an async
+    iterator before sending anything, so there the sync client streams instead.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = ai_service.astream_reflection(*args, **kwargs)
+    else:
+        chunks = ai_service.stream_reflection(*args, **kwargs)
+    response = StreamingHttpResponse(chunks, content_type='text/plain; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering the stream
+    return response
+
+def _event_stream(request, fetch, last_id, poll_interval, stream_seconds):
+    """
+    Server-sent events from fetch(after_id) -> [(id, event, data)]. Under ASGI the connection stays
+    open for stream_seconds, polling every poll_interval. A WSGI worker would be pinned for that long
+    and send nothing until the end, so there it answers one poll and closes; EventSource reconnects
+    after `retry` with Last-Event-ID, which makes it short polling.
+    """
+    def frames(rows):
+        for event_id, event, data in rows:
+            yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    retry = f"retry: {int(poll_interval * 1000)}\n\n"
+
+    def poll_once():
+        yield retry
+        yield from frames(fetch(last_id))
+
+    async def events():
+        after_id = last_id
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + stream_seconds
+        yield retry
+        while loop.time() < deadline:
+            rows = await sync_to_async(fetch)(after_id)
+            for frame in frames(rows):
+                yield frame
+            after_id = max([after_id] + [event_id for event_id, _, _ in rows])
+            yield ": keepalive\n\n"
+            await asyncio.sleep(poll_interval)
+
+    response = StreamingHttpResponse(events() if isinstance(request, ASGIRequest) else poll_once(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
-def ai_mentor(request):
-    """A dedicated space for AI mentoring insights."""
-    latest_journals = JournalEntry.objects.filter(user=request.user).order_by('-created_at')[:5]
-    latest_mood = MoodEntry.objects.filter(user=request.user).order_by('-created_at').first()
-    insights = ""
-    if latest_journals:
-        # Generate a unified mentorship insight from recent journals with full context
-        content_summary = latest_journals[0].content
-        history = [j.content for j in latest_journals[1:]]
-        mood_ctx = f"Recent Mood Score: {latest_mood.mood_score if latest_mood else 'N/A'}"
-        
-        insights = ai_service.get_reflection(
-            f"Provide a high-level mentorship perspective on my overall growth trajectory based on my latest thought: {content_summary[:300]}",
-            history=history,
-            mood_context=mood_ctx
-        )
-    
-    return render(request, 'core/ai_mentor.html', {'insights': insights})
+async def ai_mentor(request):
+    """A dedicated space for AI mentoring insights. The insight itself streams in from ai_mentor_stream."""
+    user = await request.auser()
+    has_journals = await JournalEntry.objects.filter(user=user).aexists()
+    return await sync_to_async(render)(request, 'core/ai_mentor.html', {'has_journals': has_journals})
+
+@login_required
+async def ai_mentor_stream(request):
+    user = await request.auser()
+    latest_journals, latest_mood = await sync_to_async(_mentor_context)(user)
+    if not latest_journals:
+        return HttpResponse(status=204)
+
+    # Generate a unified mentorship insight from recent journals with full context
+    content_summary = latest_journals[0].content
+    history = [j.content for j in latest_journals[1:]]
+    mood_ctx = f"Recent Mood Score: {latest_mood.mood_score if latest_mood else 'N/A'}"
+
+    return _stream_reflection(
+        request,
+        f"Provide a high-level mentorship perspective on my overall growth trajectory based on my latest thought: {content_summary[:300]}",
+        history=history,
+        mood_context=mood_ctx
+    )
 
 @login_required
 def find_resources(request):
@@ -317,17 +362,18 @@ def find_resources(request):
     resource_type = request.GET.get('type')
     search_query = request.GET.get('q')
     
-    resources = Resource.objects.all()
     categories = Category.objects.all()
-    
-    if category_slug:
-        resources = resources.filter(category__slug=category_slug)
-    if resource_type:
-        resources = resources.filter(resource_type=resource_type)
+
     if search_query:
-        from django.db.models import Q
-        resources = resources.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
-        
+        # Ranked full-text index (core/search.py); the filters are applied inside the index query
+        resources = search_resources(search_query, category_slug, resource_type)
+    else:
+        resources = Resource.objects.select_related('category')
+        if category_slug:
+            resources = resources.filter(category__slug=category_slug)
+        if resource_type:
+            resources = resources.filter(resource_type=resource_type)
+
     context = {
         'resources': resources,
         'categories': categories,
@@ -351,12 +397,13 @@ def clinical_progress(request, student_id):
         messages.error(request, "You are not connected to this student.")
         return redirect('dashboard')
     
-    mood_history = MoodEntry.objects.filter(user=student).order_by('-created_at')[:30]
+    trend = student_trend(student.id, limit=30)
     journals = JournalEntry.objects.filter(user=student).order_by('-created_at')[:10]
     
     context = {
         'student': student,
-        'mood_history': mood_history,
+        'mood_history': trend['points'],
+        'mood_summary': trend['summary'],
         'journals': journals,
     }
     return render(request, 'core/clinical_progress.html', context)
@@ -367,26 +414,51 @@ def admin_user_management(request):
     if request.user.profile.role != 'ADMIN':
         messages.error(request, "Access denied.")
         return redirect('dashboard')
-    users = User.objects.all().order_by('-date_joined')
-    return render(request, 'core/admin_user_mgmt.html', {'users': users})
+    # Search and role tabs filter the paged queryset itself, so scrolling pages through the matches
+    q = request.GET.get('q', '').strip()
+    role = request.GET.get('role', '')
+    members = User.objects.select_related('profile')
+    if q:
+        match = models.Q(username__icontains=q) | models.Q(email__icontains=q)
+        members = members.filter(match | models.Q(id=int(q)) if q.isdigit() else match)
+    if role in ('STUDENT', 'THERAPIST', 'ADMIN'):
+        members = members.filter(profile__role=role)
+    else:
+        role = ''
+    users = keyset_paginate(members, request.GET.get('cursor'), field='date_joined')
+    filters = {'users': users, 'q': q, 'role': role, 'filter_query': urlencode({k: v for k, v in (('q', q), ('role', role)) if v})}
+
+    def role_counts():
+        return {'counts': UserProfile.objects.aggregate(
+            total=models.Count('id'),
+            students=models.Count('id', filter=models.Q(role='STUDENT')),
+            therapists=models.Count('id', filter=models.Q(role='THERAPIST')),
+        )}
+
+    return _render_page(request, 'core/admin_user_mgmt.html', 'core/partials/user_rows.html', filters, role_counts)
 
 @login_required
 def admin_moderation(request):
     if request.user.profile.role != 'ADMIN':
         messages.error(request, "Access denied.")
         return redirect('dashboard')
-    alerts = CrisisAlert.objects.all().order_by('-created_at')
-    return render(request, 'core/admin_moderation.html', {'alerts': alerts})
+    alerts = keyset_paginate(CrisisAlert.objects.select_related('student'), request.GET.get('cursor'))
+    mark_alerts_seen(request.user)
+    return _render_page(request, 'core/admin_moderation.html', 'core/partials/alert_rows.html', {'alerts': alerts})
 
 @login_required
 def admin_cms(request):
     if request.user.profile.role != 'ADMIN':
         messages.error(request, "Access denied.")
         return redirect('dashboard')
-    resources = Resource.objects.all().order_by('-created_at')
-    return render(request, 'core/admin_cms.html', {'resources': resources})
+    resources = keyset_paginate(Resource.objects.select_related('category'), request.GET.get('cursor'))
+    return _render_page(
+        request, 'core/admin_cms.html', 'core/partials/resource_rows.html', {'resources': resources},
+        lambda: {'resource_count': Resource.objects.count()},
+    )
 
 @login_required
+@use_replica
 def admin_security(request):
     if request.user.profile.role != 'ADMIN':
         messages.error(request, "Access denied.")
@@ -394,7 +466,7 @@ def admin_security(request):
     
     # Aggregate real security-related events
     recent_signups = User.objects.all().order_by('-date_joined')[:10]
-    unresolved_alerts = CrisisAlert.objects.filter(is_resolved=False).order_by('-created_at')[:10]
+    unresolved_alerts = CrisisAlert.objects.filter(is_resolved=False).select_related('student').order_by('-created_at')[:10]
     
     context = {
         'title': 'Security & Compliance',
@@ -407,15 +479,17 @@ def admin_security(request):
     return render(request, 'core/admin_security.html', context)
 
 @login_required
+@use_replica
 def admin_ai_monitor(request):
     if request.user.profile.role != 'ADMIN':
         messages.error(request, "Access denied.")
         return redirect('dashboard')
     
     # Aggregate AI performance metrics
-    total_reflections = JournalEntry.objects.exclude(ai_reflection__isnull=True).count()
-    total_breakthroughs = JournalEntry.objects.filter(is_flagged=True).count() # Flagged often relates to breakthrough detection logic
-    # In a real app we'd track API latency, here we mock some "health"
+    total_reflections = UserStats.objects.aggregate(total=models.Sum('reflection_count'))['total'] or 0
+    total_breakthroughs = DashboardInsight.objects.filter(breakthrough__isnull=False).count()
+    telemetry = summarize_telemetry(hours=24)
+    avg_latency = telemetry['overall']['avg_latency']
     
     context = {
         'title': 'AI Engine Monitor',
@@ -428,49 +502,67 @@ def admin_ai_monitor(request):
             'LISTENER': UserProfile.objects.filter(ai_persona='LISTENER').count(),
             'CATALYST': UserProfile.objects.filter(ai_persona='CATALYST').count(),
         },
-        'avg_latency': '142ms'
+        'avg_latency': f"{avg_latency}ms" if avg_latency is not None else "—",
+        'telemetry': telemetry,
+        'ai_health': ai_service.resilience.snapshot(),
+        'cache_stats': ai_service.cache.stats(),
     }
     return render(request, 'core/admin_ai_monitor.html', context)
 
+@login_required
 def messages_list(request):
-    user = request.user
-    # Get all users the current user has sent messages to or received messages from
-    sent_to = ChatMessage.objects.filter(sender=user).values_list('receiver', flat=True)
-    received_from = ChatMessage.objects.filter(receiver=user).values_list('sender', flat=True)
-    contact_ids = set(list(sent_to) + list(received_from))
-    
-    contacts = User.objects.filter(id__in=contact_ids)
-    
-    # Also include connected therapists/students even if no messages yet
-    if user.profile.role == 'STUDENT':
-        connections = TherapistConnection.objects.filter(student=user, status='ACTIVE').values_list('therapist', flat=True)
-        connected_users = User.objects.filter(id__in=connections)
-    else:
-        connections = TherapistConnection.objects.filter(therapist=user, status='ACTIVE').values_list('student', flat=True)
-        connected_users = User.objects.filter(id__in=connections)
-        
-    all_contacts = set(contacts) | set(connected_users)
-    
-    return render(request, 'core/messages_list.html', {'contacts': all_contacts})
+    # One indexed query over the Conversation summaries, newest first; connected pairs get a row on connection
+    return render(request, 'core/messages_list.html', {'conversations': chat_inbox(request.user)})
 
 @login_required
 def chat_session(request, user_id):
-    other_user = User.objects.get(id=user_id)
+    other_user = User.objects.select_related('profile').get(id=user_id)
     if request.method == 'POST':
         content = request.POST.get('content')
         if content:
-            ChatMessage.objects.create(sender=request.user, receiver=other_user, content=content)
-            return redirect('chat_session', user_id=user_id)
-            
-    messages = ChatMessage.objects.filter(
-        (models.Q(sender=request.user, receiver=other_user)) | 
-        (models.Q(sender=other_user, receiver=request.user))
-    ).order_by('created_at')
-    
-    # Mark messages as read
-    ChatMessage.objects.filter(sender=other_user, receiver=request.user, is_read=False).update(is_read=True)
-    
-    return render(request, 'core/chat_session.html', {'other_user': other_user, 'chat_messages': messages})
+            message = send_message(request.user, other_user, content)
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                # Sent from the live page: no redirect and re-render, just the stored message
+                return JsonResponse(serialize_message(message), status=201)
+        return redirect('chat_session', user_id=user_id)
+
+    # Only the latest window is loaded; older history is fetched by cursor as the user scrolls back
+    config = getattr(django_settings, 'CHAT', {})
+    page = chat_window(request.user.id, other_user.id, request.GET.get('cursor'), config.get('WINDOW', 50))
+    chat_messages = page.items[::-1]
+
+    # Mark messages as read, as far as this window shows them
+    mark_read(request.user.id, other_user.id, [m.id for m in chat_messages if m.receiver_id == request.user.id and not m.is_read])
+
+    return _render_page(request, 'core/chat_session.html', 'core/partials/chat_messages.html', {
+        'other_user': other_user,
+        'chat_messages': chat_messages,
+        'page': page,
+        'last_message_id': max((m.id for m in chat_messages), default=0),
+        'chat_websockets': config.get('WEBSOCKETS', False),
+    })
+
+@login_required
+async def chat_stream(request, user_id):
+    """
+    Server-sent events for an open conversation: pushes only the messages after the client's
+    Last-Event-ID (or ?since=). Held open for STREAM_SECONDS under ASGI, a single poll under WSGI
+    (see _event_stream); either way EventSource reconnects where it left off.
+    """
+    user = await request.auser()
+    if not await User.objects.filter(id=user_id).aexists():
+        return HttpResponse(status=404)
+
+    config = getattr(django_settings, 'CHAT', {})
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('since') or 0)
+    except ValueError:
+        last_id = 0
+
+    def fetch(after_id):
+        return [(message['id'], 'message', message) for message in messages_since(user.id, user_id, after_id)]
+
+    return _event_stream(request, fetch, last_id, config.get('POLL_INTERVAL', 1), config.get('STREAM_SECONDS', 55))
 
 @login_required
 def settings(request):
@@ -489,11 +581,8 @@ def settings(request):
 def focus_timer(request):
     user = request.user
     selected_task_id = request.GET.get('task_id')
-    selected_task = None
-    if selected_task_id:
-        selected_task = Task.objects.filter(user=user, id=selected_task_id).first()
-    
-    tasks = Task.objects.filter(user=user, is_completed=False)
+    tasks = open_tasks(user)
+    selected_task = next((task for task in tasks if str(task.id) == selected_task_id), None)
     return render(request, 'core/focus_timer.html', {
         'tasks': tasks,
         'selected_task': selected_task
@@ -545,7 +634,7 @@ def therapist_appointments(request):
         except Appointment.DoesNotExist:
             pass
         return redirect('therapist_appointments')
-    appointments = Appointment.objects.filter(therapist=request.user)
+    appointments = Appointment.objects.filter(therapist=request.user).select_related('student')
     pending = appointments.filter(status='PENDING')
     confirmed = appointments.filter(status='CONFIRMED')
     context = {
@@ -577,13 +666,14 @@ def therapist_student_records(request, student_id):
             SessionNote.objects.create(therapist=request.user, student=student, content=content, risk_level=risk)
             messages.success(request, "Session note saved.")
         return redirect('therapist_records', student_id=student_id)
-    mood_entries = MoodEntry.objects.filter(user=student).order_by('-created_at')[:10]
+    trend = student_trend(student.id, limit=30)
     journal_entries = JournalEntry.objects.filter(user=student).order_by('-created_at')[:5]
     session_notes = SessionNote.objects.filter(therapist=request.user, student=student)
     crisis_alerts = CrisisAlert.objects.filter(student=student).order_by('-created_at')
     context = {
         'student': student,
-        'mood_entries': mood_entries,
+        'mood_entries': trend['points'][-10:],
+        'mood_summary': trend['summary'],
         'journal_entries': journal_entries,
         'session_notes': session_notes,
         'crisis_alerts': crisis_alerts,
@@ -593,20 +683,25 @@ def therapist_student_records(request, student_id):
 
 
 @login_required
+@use_replica
 def therapist_insights(request):
     if request.user.profile.role != 'THERAPIST':
         messages.error(request, "Access denied.")
         return redirect('dashboard')
-    connections = TherapistConnection.objects.filter(therapist=request.user, status='ACTIVE')
-    student_ids = connections.values_list('student_id', flat=True)
-    # Recent mood data across all clients
-    recent_moods = MoodEntry.objects.filter(user_id__in=student_ids).order_by('-created_at')[:50]
+    connections = TherapistConnection.objects.filter(therapist=request.user, status='ACTIVE').select_related('student__profile')
+    connections = list(connections)
+    # Mood trends for the whole caseload from one query; students needing attention are listed first
+    summaries = caseload_summary(c.student_id for c in connections)
+    status_order = {'AT RISK': 0, 'WATCH': 1, 'HEALTHY': 2, 'NO DATA': 3}
+    for connection in connections:
+        connection.mood = summaries[connection.student_id]
+    connections.sort(key=lambda c: (status_order[c.mood['status']], c.student.username))
     total_sessions = Appointment.objects.filter(therapist=request.user, status='COMPLETED').count()
-    pending_sessions = Appointment.objects.filter(therapist=request.user, status='PENDING').count()
-    total_clients = connections.count()
+    pending_sessions = stats_for(request.user).pending_appointment_count
+    total_clients = len(connections)
     context = {
         'connections': connections,
-        'recent_moods': recent_moods,
+        'caseload': caseload_overview(summaries),
         'total_sessions': total_sessions,
         'pending_sessions': pending_sessions,
         'total_clients': total_clients,
@@ -621,8 +716,8 @@ def therapist_crisis(request):
         return redirect('dashboard')
     connections = TherapistConnection.objects.filter(therapist=request.user)
     student_ids = connections.values_list('student_id', flat=True)
-    active_alerts = CrisisAlert.objects.filter(student_id__in=student_ids, is_resolved=False).order_by('-created_at')
-    resolved_alerts = CrisisAlert.objects.filter(student_id__in=student_ids, is_resolved=True).order_by('-created_at')[:5]
+    active_alerts = CrisisAlert.objects.filter(student_id__in=student_ids, is_resolved=False).select_related('student').order_by('-created_at')
+    resolved_alerts = CrisisAlert.objects.filter(student_id__in=student_ids, is_resolved=True).select_related('student').order_by('-created_at')[:5]
     # Handle resolve action
     if request.method == 'POST':
         alert_id = request.POST.get('alert_id')
@@ -633,6 +728,7 @@ def therapist_crisis(request):
         except CrisisAlert.DoesNotExist:
             pass
         return redirect('therapist_crisis')
+    mark_alerts_seen(request.user)
     context = {
         'active_alerts': active_alerts,
         'resolved_alerts': resolved_alerts,
@@ -641,6 +737,29 @@ def therapist_crisis(request):
     return render(request, 'core/therapist_crisis.html', context)
 
 
+@login_required
+async def crisis_alert_stream(request):
+    """
+    Server-sent events for therapists and admins: pushes each crisis alert delivered to them.
+    Held open for STREAM_SECONDS under ASGI, a single poll under WSGI (see _event_stream).
+    """
+    user = await request.auser()
+    role = await UserProfile.objects.filter(user=user).values_list('role', flat=True).afirst()
+    if role not in ('THERAPIST', 'ADMIN'):
+        return HttpResponse(status=403)
+
+    config = getattr(django_settings, 'CRISIS_ALERTS', {})
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_id') or 0)
+    except ValueError:
+        last_id = 0
+
+    def fetch(after_id):
+        return [(delivery['id'], 'crisis', delivery) for delivery in next_deliveries(user, after_id)]
+
+    return _event_stream(request, fetch, last_id, config.get('POLL_INTERVAL', 2), config.get('STREAM_SECONDS', 55))
+
+
 # Simple logout
 def logout_view(request):
     # Clear all queued messages so they don't bleed onto the login page